@@ -0,0 +1,65 @@
+"""
+Бенчмарк записи CSV: исходная схема Helper3.py (quote_csv_field на каждое поле и
+write на каждую строку) против пакетного rules_helper.csvio.CsvWriter на полном файле.
+
+Запуск из каталога Rules:  python -m benchmarks.bench_csv_writer [rules.csv] [--encoding cp1251]
+"""
+import argparse
+import io
+import os
+import tempfile
+import timeit
+
+from rules_helper.convert import read_csv_rows
+from rules_helper.csvio import DEFAULT_HEADER, CsvWriter, item_to_fields
+from rules_helper.files import CSV_ENCODING, OUTPUT_CSV_ENCODING
+
+from . import legacy
+
+def write_new(rows, outfile):
+    with CsvWriter(outfile) as writer:
+        writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('csv', nargs='?', default='rules.csv')
+    parser.add_argument('--encoding', default=CSV_ENCODING)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--number', type=int, default=3, help="runs per timing sample")
+    args = parser.parse_args()
+
+    items = read_csv_rows(args.csv, args.encoding)
+    rows = [DEFAULT_HEADER] + [f for f in (item_to_fields(i, DEFAULT_HEADER) for i in items) if f is not None]
+    fields = sum(len(r) for r in rows)
+
+    expected, actual = io.StringIO(), io.StringIO()
+    legacy.write_csv_lines(rows, expected)
+    write_new(rows, actual)
+    assert actual.getvalue() == expected.getvalue(), "CsvWriter output differs from legacy quoting"
+    size_mb = len(expected.getvalue().encode(OUTPUT_CSV_ENCODING)) / 1e6
+    print(f"{len(rows)} rows, {fields} fields, {size_mb:.2f} MB output; output byte-identical: OK")
+
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+
+    def to_file(write):
+        def run():
+            with open(path, 'w', encoding=OUTPUT_CSV_ENCODING, newline='') as f:
+                write(rows, f)
+        return run
+
+    try:
+        cases = [
+            ("legacy  quote_csv_field per field", to_file(legacy.write_csv_lines)),
+            ("new     CsvWriter batches", to_file(write_new)),
+        ]
+        base = None
+        for name, func in cases:
+            elapsed = min(timeit.repeat(func, number=args.number, repeat=args.repeat)) / args.number
+            base = base or elapsed
+            print(f"{name:36s} {elapsed * 1000:8.2f} ms  {size_mb / elapsed:7.1f} MB/s  x{base / elapsed:4.2f}")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Микро-бенчмарк разбора/сборки поля options: исходные функции Helper3.py против
+однопроходного парсера rules_helper.options на реальном rules.csv.
+
+Запуск из каталога Rules:  python -m benchmarks.bench_options [rules.csv] [--encoding cp1251]
+"""
+import argparse
+import csv
+import timeit
+
+from rules_helper import options
+from rules_helper.csvio import DEFAULT_HEADER
+from rules_helper.files import CSV_ENCODING, open_text
+
+from . import legacy
+
+def load_option_cells(csv_filepath: str, encoding: str) -> list:
+    idx = DEFAULT_HEADER.index('options')
+    with open_text(csv_filepath, 'r', encoding, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row[idx] for row in reader if len(row) > idx]
+
+def check_round_trip(cells: list):
+    """Новый парсер обязан давать те же объекты, а сборка - исходную строку побайтно."""
+    for cell in cells:
+        parsed = options.parse_options_string(cell)
+        assert parsed == legacy.parse_options_string(cell), cell
+        assert options.build_options_string(parsed) == legacy.build_options_string(parsed) == cell, cell
+        assert options.build_option_records(options.parse_option_records(cell)) == cell, cell
+        assert [r.to_dict() for r in options.parse_option_records(cell)] == parsed, cell
+
+def best_of(func, repeat: int, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('csv', nargs='?', default='rules.csv')
+    parser.add_argument('--encoding', default=CSV_ENCODING)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--number', type=int, default=20, help="calls per timing sample")
+    args = parser.parse_args()
+
+    cells = load_option_cells(args.csv, args.encoding)
+    lines = sum(c.count('\n') + 1 for c in cells if c)
+    print(f"{len(cells)} options cells, {lines} option lines")
+    check_round_trip(cells)
+    print("Round trip: OK (byte-identical to legacy functions)")
+
+    parsed = [legacy.parse_options_string(c) for c in cells]
+    records = [options.parse_option_records(c) for c in cells]
+    cases = [
+        ("parse  legacy (2 regex, groupdict)", lambda: [legacy.parse_options_string(c) for c in cells]),
+        ("parse  single-pass -> dict", lambda: [options.parse_options_string(c) for c in cells]),
+        ("parse  single-pass -> OptionRecord", lambda: [options.parse_option_records(c) for c in cells]),
+        ("build  legacy", lambda: [legacy.build_options_string(p) for p in parsed]),
+        ("build  dict", lambda: [options.build_options_string(p) for p in parsed]),
+        ("build  OptionRecord", lambda: [options.build_option_records(r) for r in records]),
+    ]
+    baseline = {}
+    for name, func in cases:
+        elapsed = best_of(func, args.repeat, args.number)
+        kind = name.split()[0]
+        baseline.setdefault(kind, elapsed)
+        print(f"{name:40s} {elapsed * 1000:8.2f} ms  x{baseline[kind] / elapsed:4.2f}")
+
+if __name__ == "__main__":
+    main()
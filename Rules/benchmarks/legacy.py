@@ -0,0 +1,61 @@
+"""
+Исходные (до оптимизации) версии горячих функций из Helper3.py.
+Используются только как точка отсчета в бенчмарках и для проверки побайтного совпадения.
+"""
+import re
+from typing import Any, Dict, List
+
+OPTION_PATTERN_PRIO = re.compile(r"^(?P<priority>\d+):(?P<id>[^:]+):(?P<text>.*)$")
+OPTION_PATTERN_NO_PRIO = re.compile(r"^(?P<id>[^:]+):(?P<text>.*)$")
+
+def parse_options_string(options_str: str) -> List[Dict[str, Any]]:
+    parsed_options = []
+    if not options_str:
+        return parsed_options
+    lines = options_str.split('\n')
+    for line in lines:
+        if line.strip() == "":
+            parsed_options.append({"raw": line})
+            continue
+        match_prio = OPTION_PATTERN_PRIO.match(line)
+        if match_prio:
+            parsed_options.append(match_prio.groupdict())
+            continue
+        match_no_prio = OPTION_PATTERN_NO_PRIO.match(line)
+        if match_no_prio:
+            parsed_options.append(match_no_prio.groupdict())
+            continue
+        parsed_options.append({"raw": line})
+    return parsed_options
+
+def build_options_string(options_list: List[Dict[str, Any]]) -> str:
+    lines = []
+    for option_data in options_list:
+        if "raw" in option_data:
+             if option_data["raw"] or isinstance(option_data["raw"], str):
+                 lines.append(str(option_data["raw"]))
+        elif "priority" in option_data and "id" in option_data and "text" in option_data:
+            lines.append(f"{option_data['priority']}:{option_data['id']}:{option_data['text']}")
+        elif "id" in option_data and "text" in option_data:
+             if "priority" not in option_data:
+                 lines.append(f"{option_data['id']}:{option_data['text']}")
+    return '\n'.join(lines)
+
+def quote_csv_field(field_value: Any) -> str:
+    if field_value is None:
+        return ""
+    field_str = str(field_value)
+    field_str = field_str.replace('“', '"').replace('”', '"')
+    field_str = field_str.replace('‘', "'").replace('’', "'")
+    needs_quoting = ',' in field_str or '"' in field_str or '\n' in field_str or '\r' in field_str
+    if needs_quoting:
+        escaped_str = field_str.replace('"', '""')
+        return f'"{escaped_str}"'
+    else:
+        return field_str
+
+def write_csv_lines(rows, outfile):
+    """Запись как в json_to_csv Helper3.py: quote_csv_field на каждое поле, write на каждую строку."""
+    for fields in rows:
+        quoted_fields = [quote_csv_field(f) for f in fields]
+        outfile.write(','.join(quoted_fields) + '\n')
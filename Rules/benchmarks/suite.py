@@ -0,0 +1,175 @@
+"""
+Набор бенчмарков конвертации на синтетических rules.csv размером 1x/10x/100x.
+
+Для каждого масштаба меряются этапы csv_to_json, json_to_csv (обычный и
+потоковый режимы, параллельный разбор), parse_options_string и quote_csv_field:
+время (лучшее из --repeat), строки/с, МБ/с и пиковая память (tracemalloc,
+отдельным прогоном). Результаты сравниваются с сохраненными базовыми значениями
+в benchmarks/baselines.json; замедление больше --tolerance считается регрессией.
+
+Запуск из каталога Rules:
+    python -m benchmarks.suite [--scales 1 10 100] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from rules_helper import batch, convert
+from rules_helper.csvio import DEFAULT_HEADER, iter_csv_rows, quote_csv_field
+from rules_helper.files import CSV_ENCODING, atomic_write
+from rules_helper.options import parse_options_string
+
+from . import synth
+
+BASELINE_FILE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_SCALES: List[int] = [1, 10]
+DEFAULT_TOLERANCE: float = 0.5
+
+class Stage:
+    """Один измеряемый этап: функция без аргументов и объем входа (строк, байт)."""
+
+    def __init__(self, name: str, func: Callable[[], Any], rows: int, size: int):
+        self.name = name
+        self.func = func
+        self.rows = rows
+        self.size = size
+
+def measure(stage: Stage, repeat: int, memory: bool) -> Dict[str, float]:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage.func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = {"seconds": best, "rows_per_s": stage.rows / best, "mb_per_s": stage.size / 1e6 / best}
+    if memory:
+        tracemalloc.start()
+        try:
+            stage.func()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result
+
+def synthetic_csv(workdir: str, profile: 'synth.RulesProfile', scale: int, seed: int) -> str:
+    """Путь к синтетическому CSV нужного масштаба (генерируется один раз и переиспользуется)."""
+    path = os.path.join(workdir, f"rules_x{scale}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...", flush=True)
+        synth.write_synthetic_rules(profile, path + '.tmp', scale, seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+def build_stages(csv_path: str, workers: Optional[int]) -> List[Stage]:
+    json_path = csv_path[:-4] + '.json'
+    out_csv = csv_path[:-4] + '.out.csv'
+    csv_size = os.path.getsize(csv_path)
+    convert.csv_to_json_stream(csv_path, json_path, CSV_ENCODING)
+    json_size = os.path.getsize(json_path)
+
+    rows = list(iter_csv_rows(csv_path, CSV_ENCODING))
+    options_idx = DEFAULT_HEADER.index('options')
+    option_cells = [r["fields"][options_idx] for r in rows if len(r["fields"]) > options_idx]
+    fields = [f for r in rows for f in r["fields"]]
+    fields_size = sum(len(f) for f in fields)
+    del rows
+    n = len(option_cells)
+
+    return [
+        Stage("csv2json", lambda: convert.csv_to_json(csv_path, json_path, CSV_ENCODING), n, csv_size),
+        Stage("csv2json-stream", lambda: convert.csv_to_json_stream(csv_path, json_path, CSV_ENCODING),
+              n, csv_size),
+        Stage("csv2json-parallel", lambda: batch.csv_to_json_parallel(csv_path, json_path, workers=workers,
+                                                                      csv_encoding=CSV_ENCODING),
+              n, csv_size),
+        Stage("json2csv", lambda: convert.json_to_csv(json_path, out_csv), n, json_size),
+        Stage("json2csv-stream", lambda: convert.json_to_csv_stream(json_path, out_csv), n, json_size),
+        Stage("parse_options_string", lambda: [parse_options_string(c) for c in option_cells],
+              n, sum(len(c) for c in option_cells)),
+        Stage("quote_csv_field", lambda: [quote_csv_field(f) for f in fields], len(fields), fields_size),
+    ]
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"meta": {}, "results": {}}
+
+def compare(result: Dict[str, float], baseline: Optional[Dict[str, float]], tolerance: float) -> str:
+    """Пометка для отчета: изменение времени/памяти против базового значения."""
+    if not baseline:
+        return ''
+    notes = []
+    for key, label in (("seconds", "time"), ("peak_mb", "mem")):
+        if key not in result or key not in baseline:
+            continue
+        change = result[key] / baseline[key] - 1
+        mark = " REGRESSION" if change > tolerance else ''
+        notes.append(f"{label} {change:+.0%}{mark}")
+    return '  ' + ', '.join(notes)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default='rules.csv', help="real rules.csv to take statistics from")
+    parser.add_argument('--encoding', default=CSV_ENCODING)
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--seed', type=int, default=synth.DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, help="processes for csv2json-parallel (default: all cores)")
+    parser.add_argument('--stages', nargs='+', help="run only these stages")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'rules_helper_bench'))
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a stage counts as regressed "
+                             "(0.5 = 50%%; timings on shared machines are noisy)")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    profile = synth.RulesProfile(args.source, args.encoding)
+    baselines = load_baselines(args.baseline)
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    regressions = 0
+
+    for scale in args.scales:
+        csv_path = synthetic_csv(args.workdir, profile, scale, args.seed)
+        stages = build_stages(csv_path, args.workers)
+        key = f"x{scale}"
+        results[key] = {}
+        print(f"\n== x{scale}: {os.path.getsize(csv_path) / 1e6:.1f} MB, {stages[0].rows} rows ==")
+        for stage in stages:
+            if args.stages and stage.name not in args.stages:
+                continue
+            result = measure(stage, args.repeat, not args.no_memory)
+            results[key][stage.name] = result
+            note = compare(result, baselines["results"].get(key, {}).get(stage.name), args.tolerance)
+            regressions += 'REGRESSION' in note
+            memory = f"{result['peak_mb']:8.1f} MB peak" if "peak_mb" in result else ''
+            print(f"{stage.name:22s} {result['seconds'] * 1000:10.1f} ms {result['rows_per_s']:12,.0f} rows/s "
+                  f"{result['mb_per_s']:8.1f} MB/s {memory}{note}", flush=True)
+
+    if args.save_baseline:
+        for key, stages in results.items():
+            baselines["results"].setdefault(key, {}).update(stages)
+        baselines["meta"] = {"python": platform.python_version(), "machine": platform.machine(),
+                             "system": platform.system(), "seed": args.seed,
+                             "saved": time.strftime('%Y-%m-%d')}
+        with atomic_write(args.baseline, 'utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline saved: {args.baseline}")
+    if regressions:
+        print(f"\n{regressions} stage(s) regressed by more than {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Генератор синтетического rules.csv заданного размера.
+
+Статистика снимается с настоящего rules.csv: переходы между типами строк
+(data/comment/empty_separator), распределение trigger, число и состав строк
+в conditions/script, длины абзацев text, число опций и доля опций с приоритетом.
+Текст собирается из словаря реального файла с теми же частотами слов, поэтому
+в нем встречаются $переменные, кавычки и многострочные ячейки в тех же долях.
+
+Запуск из каталога Rules:  python -m benchmarks.synth --scale 10 -o rules_x10.csv
+"""
+import argparse
+import random
+from collections import Counter
+from typing import Dict, List
+
+from rules_helper.csvio import DEFAULT_HEADER, CsvWriter, iter_csv_rows
+from rules_helper.files import CSV_ENCODING
+
+SYNTH_ENCODING: str = 'cp1251'
+DEFAULT_SEED: int = 20240601
+
+class RulesProfile:
+    """Эмпирические распределения, снятые с одного rules.csv."""
+
+    def __init__(self, csv_filepath: str, encoding: str = CSV_ENCODING):
+        self.transitions: Dict[str, Counter] = {}
+        self.triggers: List[str] = []
+        self.ids: List[str] = []
+        self.condition_lines: List[str] = []
+        self.condition_counts: List[int] = []
+        self.script_lines: List[str] = []
+        self.script_counts: List[int] = []
+        self.paragraph_words: List[List[int]] = []
+        self.text_words: List[str] = []
+        self.option_counts: List[int] = []
+        self.option_words: List[str] = []
+        self.option_word_counts: List[int] = []
+        self.option_priority_share = 0.0
+        self.notes: List[str] = []
+        self.comments: List[List[str]] = []
+        self.rows = 0
+        self.source_bytes = 0
+
+        prev = 'start'
+        priorities = options_total = 0
+        for item in iter_csv_rows(csv_filepath, encoding):
+            self.rows += 1
+            kind = item["_type"]
+            self.transitions.setdefault(prev, Counter())[kind] += 1
+            prev = kind
+            fields = item["fields"]
+            self.source_bytes += sum(len(f) for f in fields) + len(fields)
+            if kind == 'comment':
+                self.comments.append(fields)
+                continue
+            if kind != 'data':
+                continue
+            self.ids.append(item['id'])
+            self.triggers.append(item['trigger'])
+            for column, lines, counts in (('conditions', self.condition_lines, self.condition_counts),
+                                          ('script', self.script_lines, self.script_counts)):
+                value_lines = item[column].split('\n') if item[column] else []
+                counts.append(len(value_lines))
+                lines.extend(value_lines)
+            paragraphs = item['text'].split('\n') if item['text'] else []
+            self.paragraph_words.append([len(p.split()) for p in paragraphs])
+            self.text_words.extend(item['text'].split())
+            self.option_counts.append(len(item['options']))
+            for opt in item['options']:
+                if 'text' not in opt:
+                    continue
+                options_total += 1
+                priorities += 'priority' in opt
+                words = opt['text'].split()
+                self.option_word_counts.append(len(words))
+                self.option_words.extend(words)
+            self.notes.append(item['notes'])
+        self.option_priority_share = priorities / options_total if options_total else 0.0
+        if not self.ids:
+            raise ValueError(f"{csv_filepath} has no data rows to profile.")
+
+def _next_kind(rnd: random.Random, transitions: Dict[str, Counter], prev: str) -> str:
+    counter = transitions.get(prev) or transitions['start']
+    kinds = list(counter)
+    return rnd.choices(kinds, weights=[counter[k] for k in kinds])[0]
+
+def _lines(rnd: random.Random, pool: List[str], counts: List[int]) -> str:
+    n = rnd.choice(counts)
+    return '\n'.join(rnd.choices(pool, k=n)) if n and pool else ''
+
+def _text(rnd: random.Random, profile: RulesProfile) -> str:
+    shape = rnd.choice(profile.paragraph_words)
+    words = rnd.choices(profile.text_words, k=sum(shape)) if profile.text_words else []
+    paragraphs, pos = [], 0
+    for n in shape:
+        paragraphs.append(' '.join(words[pos:pos + n]))
+        pos += n
+    return '\n'.join(paragraphs)
+
+def _options(rnd: random.Random, profile: RulesProfile, serial: int) -> str:
+    lines = []
+    for i in range(rnd.choice(profile.option_counts)):
+        n = rnd.choice(profile.option_word_counts) if profile.option_word_counts else 1
+        text = ' '.join(rnd.choices(profile.option_words, k=n)) if profile.option_words else 'Leave'
+        prefix = f"{rnd.randint(0, 20)}:" if rnd.random() < profile.option_priority_share else ''
+        lines.append(f"{prefix}synthOpt{serial}_{i}:{text}")
+    return '\n'.join(lines)
+
+def generate_rows(profile: RulesProfile, rows: int, seed: int = DEFAULT_SEED):
+    """Генератор строк (списков полей) без заголовка."""
+    rnd = random.Random(seed)
+    prev = 'start'
+    for serial in range(rows):
+        kind = _next_kind(rnd, profile.transitions, prev)
+        prev = kind
+        if kind == 'comment':
+            yield list(rnd.choice(profile.comments))
+        elif kind == 'empty_separator':
+            yield [''] * len(DEFAULT_HEADER)
+        else:
+            yield [
+                f"{rnd.choice(profile.ids)}_{serial}",
+                rnd.choice(profile.triggers),
+                _lines(rnd, profile.condition_lines, profile.condition_counts),
+                _lines(rnd, profile.script_lines, profile.script_counts),
+                _text(rnd, profile),
+                _options(rnd, profile, serial),
+                rnd.choice(profile.notes),
+            ]
+
+def write_synthetic_rules(profile: RulesProfile, output_filepath: str, scale: float = 1.0,
+                          seed: int = DEFAULT_SEED, encoding: str = SYNTH_ENCODING) -> int:
+    """Пишет синтетический CSV с числом строк scale * (строк в образце). Возвращает число строк."""
+    rows = max(1, int(profile.rows * scale))
+    with open(output_filepath, 'w', encoding=encoding, newline='') as f, CsvWriter(f) as writer:
+        writer.writerow(DEFAULT_HEADER)
+        writer.writerows(generate_rows(profile, rows, seed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default='rules.csv', help="real rules.csv to take statistics from")
+    parser.add_argument('--encoding', default=CSV_ENCODING)
+    parser.add_argument('--scale', type=float, default=1.0, help="size relative to the source file")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    profile = RulesProfile(args.source, args.encoding)
+    rows = write_synthetic_rules(profile, args.output, args.scale, args.seed)
+    print(f"{args.output}: {rows} rows (x{args.scale:g} of {args.source})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Инструменты перевода rules.csv Starsector: конвертация CSV <-> JSON, инкрементальный
+экспорт, память переводов, компактный формат, пакетная обработка,
+определение кодировки, индекс записей для произвольного доступа,
+проверка токенов перевода, перенос перевода на новую версию игры,
+извлечение текста из колонки script, проверка круговой конвертации,
+машинный перевод через MT-сервер, метрики этапов, симулятор выбора правил,
+граф опций диалогов, деление перевода на части, база проекта в SQLite,
+проверка перевода терминов по глоссарию, извлечение текста из исходников Java,
+отчет о полноте перевода и режим наблюдения с пересборкой CSV при сохранении.
+
+Командная строка: python -m rules_helper --help
+"""
+from .batch import batch_convert, csv_to_json_parallel
+from .compact import compact_to_csv, compact_to_json, csv_to_compact, json_to_compact
+from .convert import csv_to_json, csv_to_json_stream, json_to_csv, json_to_csv_stream
+from .coverage import coverage_report
+from .csvio import DEFAULT_HEADER, iter_csv_rows, make_row_object, quote_csv_field
+from .dialoggraph import DialogGraph
+from .encoding import check_file_encoding, decode_file, detect_encoding
+from .glossary import GlossaryChecker, check_glossary, glossary_seed
+from .incremental import create_fingerprint_index, csv_to_json_delta, merge_delta
+from .javatext import java_strings_to_json
+from .jsonio import iter_json_array
+from .metrics import METRICS, profile_stages
+from .mt import mt_translate
+from .options import build_options_string, parse_options_string
+from .recordindex import RecordIndex
+from .rulecmd import load_signature_table
+from .scripttext import extract_script_strings, splice_script_strings
+from .shards import merge_shards, split_json
+from .simulate import RuleSimulator, walk_paths
+from .store import ProjectStore
+from .tm import TranslationMemory, tm_export_unique, tm_fill, tm_import_unique, tm_learn
+from .upgrade import upgrade_translation
+from .validate import validate_items, validate_translation
+from .verify import verify_round_trip
+from .watch import WatchSession
+
+__all__ = [
+    'DEFAULT_HEADER',
+    'DialogGraph',
+    'GlossaryChecker',
+    'METRICS',
+    'ProjectStore',
+    'RecordIndex',
+    'RuleSimulator',
+    'TranslationMemory',
+    'WatchSession',
+    'batch_convert',
+    'build_options_string',
+    'check_file_encoding',
+    'check_glossary',
+    'compact_to_csv',
+    'compact_to_json',
+    'coverage_report',
+    'create_fingerprint_index',
+    'csv_to_compact',
+    'csv_to_json',
+    'csv_to_json_delta',
+    'csv_to_json_parallel',
+    'csv_to_json_stream',
+    'decode_file',
+    'detect_encoding',
+    'extract_script_strings',
+    'glossary_seed',
+    'iter_csv_rows',
+    'iter_json_array',
+    'java_strings_to_json',
+    'json_to_compact',
+    'json_to_csv',
+    'json_to_csv_stream',
+    'load_signature_table',
+    'make_row_object',
+    'merge_delta',
+    'merge_shards',
+    'mt_translate',
+    'parse_options_string',
+    'profile_stages',
+    'quote_csv_field',
+    'splice_script_strings',
+    'split_json',
+    'tm_export_unique',
+    'tm_fill',
+    'tm_import_unique',
+    'tm_learn',
+    'upgrade_translation',
+    'validate_items',
+    'validate_translation',
+    'verify_round_trip',
+    'walk_paths',
+]
@@ -0,0 +1,225 @@
+"""
+Пакетная и параллельная конвертация.
+
+Много файлов (или каталог) обрабатываются пулом процессов. Большой CSV режется
+на куски по границам записей (перевод строки вне кавычек - по тем же правилам,
+что у csv.reader), куски разбираются параллельно, а результат пишется в
+порядке _row_number - побайтно так же, как csv_to_json.
+"""
+import codecs
+import csv
+import io
+import logging
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .convert import csv_to_json_stream, json_to_csv_stream
+from .csvio import make_row_object
+from .encoding import resolve_encoding
+from .files import CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter
+from .metrics import METRICS, file_size
+from .scripttext import add_script_strings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE: int = 1024 * 1024
+
+# Кавычка, открывающая поле: сразу после разделителя или конца строки
+_FIELD_QUOTE = re.compile(rb'(?<=[,\r\n])"')
+_QUOTED_FIELD = re.compile(rb'"[^"]*(?:""[^"]*)*"')
+
+def _skip_field_quotes(data: bytes, pos: int, end: int, record_start: int) -> int:
+    """
+    Первая позиция >= pos (и <= end), где разбор стоит вне кавычек и до end не
+    открывается ни одно поле в кавычках; поле в кавычках, начатое до end,
+    пропускается целиком, даже если заканчивается после end.
+    """
+    while True:
+        if pos == record_start and data[pos:pos + 1] == b'"':
+            quote = pos
+        else:
+            match = _FIELD_QUOTE.search(data, pos, end)
+            if match is None:
+                return max(pos, end)
+            quote = match.start()
+        match = _QUOTED_FIELD.match(data, quote)
+        # Незакрытая кавычка тянется до конца файла, как у csv.reader
+        pos = match.end() if match else len(data)
+        if pos >= end:
+            return pos
+
+def find_record_boundaries(data: bytes, chunk_size: int, start: int = 0) -> List[int]:
+    """
+    Смещения, по которым можно резать CSV без разрыва записей: сразу после '\\n'
+    вне кавычек. Кавычки учитываются так же, как в csv.reader: '"' открывает поле
+    в кавычках только в начале поля, внутри поля без кавычек это обычный символ
+    (He said 5" long). Работает для cp1251/utf-8 - '"', ',' и '\\n' не
+    встречаются внутри многобайтовых символов. start - начало записи.
+    """
+    boundaries = [start]
+    size = len(data)
+    pos = start
+    target = start + chunk_size
+    while target < size:
+        pos = _skip_field_quotes(data, pos, target, start)
+        while True:
+            nl = data.find(b'\n', pos)
+            if nl == -1:
+                return boundaries + [size]
+            after = _skip_field_quotes(data, pos, nl, start)
+            if after <= nl:
+                break
+            pos = after
+        pos = nl + 1
+        boundaries.append(pos)
+        target = pos + chunk_size
+    if boundaries[-1] != size:
+        boundaries.append(size)
+    return boundaries
+
+def _parse_csv_chunk(args) -> List[Dict[str, Any]]:
+    """Задача пула: разбирает кусок CSV; номера строк считаются от 0 и сдвигаются родителем."""
+    csv_filepath, start, end, header, encoding = args
+    with open(csv_filepath, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    reader = csv.reader(io.StringIO(text, newline=''))
+    return [make_row_object(header, row, i) for i, row in enumerate(reader)]
+
+def csv_to_json_parallel(csv_filepath, json_filepath, executor: Optional[Executor] = None,
+                         workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING,
+                         script_signatures: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """
+    Параллельный csv_to_json для одного файла. Можно передать уже созданный
+    executor, чтобы не поднимать пул заново. Возвращает число записанных объектов.
+    """
+    with open(csv_filepath, 'rb') as f:
+        data = f.read()
+    csv_encoding, bom_length = resolve_encoding(data, csv_encoding)
+    if codecs.lookup(csv_encoding).name in ('utf-16', 'utf-32'):
+        # Границы записей ищутся по байтам ASCII - для UTF-16/32 так нельзя
+        logger.warning(f"{csv_filepath}: {csv_encoding} cannot be split into chunks, converting sequentially.")
+        return csv_to_json_stream(csv_filepath, json_filepath, csv_encoding, json_encoding, script_signatures)
+    header_end = find_record_boundaries(data, 1, bom_length)[1] if len(data) > bom_length else bom_length
+    header = next(csv.reader(io.StringIO(data[bom_length:header_end].decode(csv_encoding), newline='')), None)
+    if header is None:
+        raise ValueError(f"CSV file {csv_filepath} is empty or has no header.")
+    boundaries = find_record_boundaries(data, chunk_size, header_end)
+    del data
+    tasks = [(csv_filepath, boundaries[i], boundaries[i + 1], header, csv_encoding)
+             for i in range(len(boundaries) - 1)]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        with METRICS.stage('csv2json_parallel', bytes_in=file_size(csv_filepath)) as st:
+            # Ошибка в любом куске не оставляет обрезанный JSON на месте результата
+            with atomic_write(json_filepath, json_encoding) as jsonfile:
+                writer = JsonArrayWriter(jsonfile)
+                # map сохраняет порядок кусков, так что строки идут по _row_number
+                for rows in executor.map(_parse_csv_chunk, tasks):
+                    for row_obj in rows:
+                        row_obj["_row_number"] = writer.count + 2
+                        st.count_row(row_obj)
+                        if script_signatures is not None:
+                            add_script_strings(row_obj, script_signatures)
+                        writer.write(row_obj)
+                writer.close()
+            st.rows = writer.count
+            st.bytes_out = file_size(json_filepath)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return writer.count
+
+def _convert_file_task(args) -> Tuple[str, Optional[str]]:
+    """Задача пула: конвертирует один файл целиком. Возвращает (путь, ошибка или None)."""
+    direction, input_path, output_path, csv_encoding, json_encoding, output_encoding = args
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if direction == 'csv2json':
+            csv_to_json_stream(input_path, output_path, csv_encoding, json_encoding)
+        else:
+            json_to_csv_stream(input_path, output_path, json_encoding, output_encoding)
+        return input_path, None
+    except Exception as e:
+        return input_path, str(e)
+
+def collect_batch_inputs(inputs: List[str], extension: str) -> List[str]:
+    """Разворачивает каталоги в список файлов с нужным расширением (рекурсивно)."""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(extension))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logger.warning(f"Warning: Batch input not found: {path}")
+    return files
+
+def batch_output_paths(files: List[str], output_dir: str, extension: str) -> List[str]:
+    """
+    Пути результатов: структура каталогов входа повторяется в output_dir, чтобы
+    одноименные rules.csv разных модов не перезаписывали друг друга.
+    """
+    if not files:
+        return []
+    abs_files = [os.path.abspath(p) for p in files]
+    root = os.path.commonpath([os.path.dirname(p) for p in abs_files])
+    return [os.path.join(output_dir, os.path.splitext(os.path.relpath(p, root))[0] + extension)
+            for p in abs_files]
+
+def batch_convert(inputs: List[str], output_dir: str, direction: str = 'csv2json',
+                  workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING,
+                  output_encoding: str = OUTPUT_CSV_ENCODING) -> Dict[str, str]:
+    """
+    Конвертирует много файлов на пуле процессов. Для csv2json файлы крупнее
+    двух кусков дополнительно режутся на куски и разбираются параллельно.
+    Возвращает {входной файл: текст ошибки} для неудавшихся файлов.
+    """
+    if direction == 'csv2json':
+        in_ext, out_ext = '.csv', '.json'
+    elif direction == 'json2csv':
+        in_ext, out_ext = '.json', '.csv'
+    else:
+        raise ValueError(f"Unknown batch direction '{direction}'.")
+    files = collect_batch_inputs(inputs, in_ext)
+    if not files:
+        raise FileNotFoundError("No input files found for batch conversion.")
+    outputs = batch_output_paths(files, output_dir, out_ext)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Batch {direction}: {len(files)} files, {workers} workers -> {output_dir}")
+
+    large, small = [], []
+    for input_path, output_path in zip(files, outputs):
+        if direction == 'csv2json' and os.path.getsize(input_path) > 2 * chunk_size:
+            large.append((input_path, output_path))
+        else:
+            small.append((direction, input_path, output_path, csv_encoding, json_encoding, output_encoding))
+
+    failures: Dict[str, str] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_convert_file_task, task) for task in small]
+        for input_path, output_path in large:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            try:
+                count = csv_to_json_parallel(input_path, output_path, executor=executor, chunk_size=chunk_size,
+                                             csv_encoding=csv_encoding, json_encoding=json_encoding)
+                logger.info(f"  {input_path}: {count} objects written (chunked).")
+            except Exception as e:
+                failures[input_path] = str(e)
+        for future in futures:
+            input_path, error = future.result()
+            if error:
+                failures[input_path] = error
+    for input_path, error in failures.items():
+        logger.error(f"  Error converting {input_path}: {error}")
+    logger.info(f"Batch conversion finished: {len(files) - len(failures)} succeeded, {len(failures)} failed.")
+    return failures
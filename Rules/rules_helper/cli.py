@@ -0,0 +1,609 @@
+"""
+Командная строка: python -m rules_helper <команда> ...
+
+Заменяет старые скрипты Helper*.py с константами MODE/CSV_INPUT_FILE/JSON_FILE.
+Все команды - тонкие обертки над функциями пакета, которые можно вызывать
+напрямую из одного долгоживущего процесса.
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+
+from . import (batch, compact, convert, coverage, dialoggraph, encoding, glossary, incremental, javatext,
+               metrics, mt, rulecmd, shards, simulate, store, tm, upgrade, validate, verify, watch)
+from .recordindex import RecordIndex
+from .files import CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, atomic_write
+
+# Имена файлов по умолчанию (как в старых Helper*.py)
+CSV_INPUT_FILE: str = 'rules.csv'
+JSON_FILE: str = 'rules_for_translation.json'
+CSV_OUTPUT_FILE: str = 'translated_rules.csv'
+FINGERPRINT_INDEX_FILE: str = 'rules_fingerprints.json'
+DELTA_JSON_FILE: str = 'rules_delta.json'
+TM_FILE: str = 'translation_memory.json'
+TM_UNIQUE_FILE: str = 'rules_unique_strings.json'
+COMPACT_FILE: str = 'rules_for_translation.compact.json.gz'
+BATCH_OUTPUT_DIR: str = 'batch_output'
+RECORD_INDEX_FILE: str = 'rules_index.json'
+UPGRADE_CONFLICTS_FILE: str = 'rules_upgrade_conflicts.json'
+PROFILE_REPORT_FILE: str = 'rules_helper_profile.txt'
+PROJECT_DB_FILE: str = 'rules_project.db'
+COVERAGE_REPORT_FILE: str = 'rules_coverage.json'
+
+def cmd_csv2json(args) -> int:
+    signatures = None
+    if args.script_strings:
+        signatures = rulecmd.load_signature_table(args.rulecmd_dir, args.signatures_cache)
+    if args.parallel:
+        count = batch.csv_to_json_parallel(args.input, args.output, workers=args.parallel,
+                                           csv_encoding=args.encoding, json_encoding=args.json_encoding,
+                                           script_signatures=signatures)
+        logging.getLogger(__name__).info(f"CSV to JSON conversion successful. {count} objects written.")
+    elif args.stream:
+        convert.csv_to_json_stream(args.input, args.output, args.encoding, args.json_encoding, signatures)
+    else:
+        convert.csv_to_json(args.input, args.output, args.encoding, args.json_encoding, signatures)
+    return 0
+
+def cmd_json2csv(args) -> int:
+    if args.stream:
+        convert.json_to_csv_stream(args.input, args.output, args.json_encoding, args.output_encoding)
+    else:
+        convert.json_to_csv(args.input, args.output, args.json_encoding, args.output_encoding)
+    if not args.no_validate:
+        # Только предупреждения: CSV уже записан, проверка не должна мешать сохранению
+        validate.validate_translation(args.input, args.source, args.encoding, args.json_encoding)
+    return 0
+
+def cmd_validate(args) -> int:
+    issues = validate.validate_translation(args.input, args.source, args.encoding, args.json_encoding)
+    return 1 if issues else 0
+
+def cmd_verify(args) -> int:
+    if args.save_hashes:
+        count = verify.write_record_hashes(verify.iter_csv_records(args.input, args.encoding),
+                                           args.save_hashes, args.json_encoding)
+        logging.getLogger(__name__).info(f"Record hashes written: {args.save_hashes} ({count} records).")
+        return 0
+    mismatch = verify.verify_round_trip(args.input, args.json, args.against, args.hashes, args.encoding, args.json_encoding)
+    return 1 if mismatch else 0
+
+def cmd_upgrade(args) -> int:
+    upgrade.upgrade_translation(args.old_source, args.new_source, args.old_translation, args.output,
+                                args.conflicts, args.encoding, args.output_encoding, args.json_encoding)
+    return 0
+
+def cmd_batch(args) -> int:
+    failures = batch.batch_convert(args.inputs, args.output_dir, args.direction, args.jobs, args.chunk_size,
+                                   args.encoding, args.json_encoding, args.output_encoding)
+    return 1 if failures else 0
+
+def cmd_fingerprint(args) -> int:
+    incremental.create_fingerprint_index(args.input, args.index, args.encoding)
+    return 0
+
+def cmd_delta(args) -> int:
+    incremental.csv_to_json_delta(args.input, args.output, args.index, args.encoding, args.json_encoding)
+    return 0
+
+def cmd_merge_delta(args) -> int:
+    incremental.merge_delta(args.input, args.json, args.delta, args.index, args.encoding, args.json_encoding)
+    return 0
+
+def cmd_tm_learn(args) -> int:
+    tm.tm_learn(args.input, args.tm, args.json_encoding)
+    return 0
+
+def cmd_tm_export(args) -> int:
+    tm.tm_export_unique(args.input, args.tm, args.output, args.threshold, args.json_encoding)
+    return 0
+
+def cmd_tm_import(args) -> int:
+    tm.tm_import_unique(args.input, args.tm, args.json_encoding)
+    return 0
+
+def cmd_tm_fill(args) -> int:
+    tm.tm_fill(args.input, args.tm, args.output or args.input, args.threshold, args.json_encoding)
+    return 0
+
+def cmd_mt(args) -> int:
+    backend = mt.HttpBackend(args.url, args.source_lang, args.target_lang, args.api_key)
+    stats = mt.mt_translate(args.input, args.output or args.input, backend, args.cache, args.concurrency,
+                            args.rate, args.batch_chars, args.batch_items, args.json_encoding)
+    return 1 if stats["failed"] else 0
+
+def cmd_split(args) -> int:
+    shards.split_json(args.input, args.shards, args.output_dir, args.json_encoding)
+    return 0
+
+def cmd_merge(args) -> int:
+    shards.merge_shards(args.manifest, args.output, args.json_encoding)
+    return 0
+
+def cmd_db_import(args) -> int:
+    store.import_files(args.db, args.inputs, args.encoding, args.json_encoding)
+    return 0
+
+def cmd_db_search(args) -> int:
+    with store.ProjectStore.open(args.db) as db:
+        hits = db.search(args.query, args.column, args.file, args.limit, phrase=not args.fts)
+    for hit in hits:
+        where = hit.field if hit.index is None else f"{hit.field}[{hit.index}]"
+        print(f"{hit.file}:{hit.row_number} {hit.rule_id} {where}")
+        print(f"  {hit.source}")
+        if hit.translated:
+            print(f"  -> {hit.target}")
+    print(f"{len(hits)} matches" + (" (limit reached)" if len(hits) == args.limit else ""))
+    return 0 if hits else 1
+
+def cmd_db_edit(args) -> int:
+    with store.ProjectStore.open(args.db) as db:
+        db.set_translation(args.file, args.row, args.field, args.index, args.text)
+    return 0
+
+def cmd_db_export(args) -> int:
+    with store.ProjectStore.open(args.db) as db:
+        file = args.file or _single_store_file(db)
+        if args.output.lower().endswith('.json'):
+            db.export_json(file, args.output, args.json_encoding)
+        else:
+            db.export_csv(file, args.output, args.output_encoding)
+    return 0
+
+def _single_store_file(db: store.ProjectStore) -> str:
+    names = db.file_names()
+    if len(names) != 1:
+        raise ValueError(f"The project store holds {len(names)} files, pick one with --file: {', '.join(names)}")
+    return names[0]
+
+def cmd_glossary_seed(args) -> int:
+    glossary.glossary_seed(args.input, args.glossary, args.ids_dir, args.classes, args.json_encoding)
+    return 0
+
+def cmd_glossary_check(args) -> int:
+    issues = glossary.check_glossary(args.input, args.glossary, args.json_encoding)
+    return 1 if issues else 0
+
+def cmd_java_strings(args) -> int:
+    javatext.java_strings_to_json(args.api_dir, args.output, None if args.no_cache else args.cache,
+                                  args.workers, args.json_encoding)
+    return 0
+
+def cmd_coverage(args) -> int:
+    report = coverage.coverage_report(args.inputs, args.source, args.encoding, args.json_encoding)
+    total = report["total"]
+    print(f"Translated {total['translated']} of {total['units']} units ({total['percent']}%)")
+    for row in report["files"]:
+        print(f"  {row['file']}: {row['translated']}/{row['units']} ({row['percent']}%)")
+    sections = sorted(report["sections"], key=lambda r: (r["percent"], -r["units"]))
+    incomplete = [r for r in sections if r["percent"] < 100]
+    print(f"Sections not fully translated: {len(incomplete)} of {len(sections)}")
+    for row in incomplete[:args.limit]:
+        print(f"  {row['percent']:5.1f}% {row['translated']:5d}/{row['units']:<5d} {row['file']} {row['section']}")
+    print(f"Untranslated units: {len(report['untranslated'])}, length outliers: {len(report['length_outliers'])}")
+    if args.output:
+        coverage.write_coverage_report(report, args.output)
+        logging.getLogger(__name__).info(f"Coverage report written: {args.output}")
+    return 0
+
+def cmd_watch(args) -> int:
+    session = watch.WatchSession(args.input, args.output, args.source or None, args.json_encoding,
+                                 args.output_encoding, args.encoding, check_tokens=not args.no_validate)
+    try:
+        session.run(args.interval)
+    except KeyboardInterrupt:
+        logging.getLogger(__name__).info("Stopped watching.")
+    return 0
+
+def cmd_to_compact(args) -> int:
+    if args.input.lower().endswith('.csv'):
+        compact.csv_to_compact(args.input, args.output, args.encoding)
+    else:
+        compact.json_to_compact(args.input, args.output, args.json_encoding)
+    return 0
+
+def cmd_from_compact(args) -> int:
+    if args.output.lower().endswith('.csv'):
+        compact.compact_to_csv(args.input, args.output, args.output_encoding)
+    else:
+        compact.compact_to_json(args.input, args.output, args.json_encoding)
+    return 0
+
+def cmd_detect_encoding(args) -> int:
+    log = logging.getLogger(__name__)
+    mixed = 0
+    for filepath in args.inputs:
+        guess, anomalies = encoding.check_file_encoding(filepath, args.limit)
+        log.info(f"{filepath}: {guess.encoding} ({guess.reason})")
+        for a in anomalies:
+            what = "not valid" if a.kind == 'invalid' else "UTF-8 sequence in single-byte text,"
+            log.warning(f"  byte {a.offset} (line {a.line}): {what} {a.data!r}")
+        if anomalies:
+            mixed += 1
+            log.warning(f"  {filepath}: {len(anomalies)} mixed-encoding spot(s)"
+                        f"{' (limit reached)' if len(anomalies) >= args.limit else ''}.")
+    return 1 if mixed else 0
+
+def cmd_index(args) -> int:
+    index = RecordIndex.build(args.input, args.encoding)
+    index.save(args.index)
+    logging.getLogger(__name__).info(f"Record index written: {args.index} ({len(index)} records).")
+    return 0
+
+def cmd_lookup(args) -> int:
+    with RecordIndex.open(args.input, args.index, args.encoding) as index:
+        if args.row is not None:
+            row_numbers = [args.row]
+        elif args.id is None and args.trigger is None:
+            raise ValueError("lookup needs --id, --trigger or --row.")
+        else:
+            row_numbers = index.row_numbers(args.id, args.trigger)
+        if args.raw:
+            for row_number in row_numbers:
+                sys.stdout.write(index.record_bytes(row_number).decode(index.encoding))
+        else:
+            rows = [index.get_row(row_number) for row_number in row_numbers]
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+    return 0 if row_numbers else 1
+
+def cmd_signatures(args) -> int:
+    table = rulecmd.load_signature_table(args.rulecmd_dir, args.signatures_cache)
+    for command, signature in sorted(table.items()):
+        params = [str(i) for i in signature["text_params"]]
+        if signature["variadic_from"] is not None:
+            params.append(f"{signature['variadic_from']}..")
+        print(f"{command:28s} text params: {', '.join(params)}")
+    return 0
+
+def _add_rulecmd_arguments(p: argparse.ArgumentParser):
+    p.add_argument('--rulecmd-dir', default=rulecmd.DEFAULT_RULECMD_DIR,
+                   help="directory with the game's rulecmd/*.java sources")
+    p.add_argument('--signatures-cache', default=rulecmd.SIGNATURE_CACHE_FILE,
+                   help="cached command signature table (rebuilt when the sources change)")
+
+def _load_json_arg(path: Optional[str]) -> dict:
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def cmd_simulate(args) -> int:
+    sim = simulate.RuleSimulator.load(args.input, args.encoding, args.json_encoding,
+                                      commands=_load_json_arg(args.commands), seed=args.seed)
+    memory = simulate.flatten_memory(_load_json_arg(args.memory))
+    if args.walk:
+        ends = {}
+        for path in simulate.walk_paths(sim, memory, args.trigger, args.max_depth, args.max_paths):
+            ends[path.end] = ends.get(path.end, 0) + 1
+            if not args.summary:
+                print(f"{' > '.join(path.choices) or '(start)'}  [{path.end}]  {' '.join(path.rules)}")
+        print(f"{sum(ends.values())} paths: " + ', '.join(f"{n} {end}" for end, n in sorted(ends.items())))
+        return 0
+    step = sim.step(args.trigger, memory)
+    steps = [step.to_dict()]
+    for option_id in args.option or []:
+        step = sim.choose_option(option_id, memory, step.options)
+        steps.append(step.to_dict())
+    print(json.dumps(steps, ensure_ascii=False, indent=2))
+    return 0 if steps[-1]["rules"] else 1
+
+def cmd_graph(args) -> int:
+    graph = dialoggraph.DialogGraph(validate.iter_rule_items(args.input, args.encoding, args.json_encoding))
+    orphans = graph.orphaned_options()
+    undeclared = graph.undeclared_handlers()
+    unreachable = graph.unreachable_rules()
+    clusters = graph.clusters(args.hub_threshold)
+    for title, names in (("Options without handlers", orphans),
+                         ("Handled options never declared in rules", undeclared),
+                         ("Unreachable rules", [f"{r.id} (row {r.row_number}, {r.trigger})" for r in unreachable])):
+        print(f"{title}: {len(names)}")
+        for name in names[:args.limit]:
+            print(f"  {name}")
+        if len(names) > args.limit:
+            print(f"  ... {len(names) - args.limit} more")
+    multi = [c for c in clusters if len(c.rules) > 1]
+    largest = max((len(c.rules) for c in clusters), default=0)
+    print(f"Clusters: {len(clusters)} ({len(multi)} with more than one rule, largest {largest} rules)")
+    if args.clusters:
+        with atomic_write(args.clusters, args.json_encoding) as f:
+            json.dump([c._asdict() for c in clusters], f, ensure_ascii=False, indent=1)
+        logging.getLogger(__name__).info(f"Clusters written: {args.clusters}")
+    return 0
+
+def cmd_profile_stages(args) -> int:
+    registry = metrics.profile_stages(args.input, args.encoding)
+    for name, stage in registry.stages.items():
+        row = stage.to_dict()
+        print(f"{name:18s} {row['seconds'] * 1000:9.1f} ms {row['rows_per_s']:12,.0f} rows/s "
+              f"{stage.bytes_in / 1e6:8.2f} MB in {stage.bytes_out / 1e6:8.2f} MB out")
+    if args.output:
+        registry.write(args.output)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='rules_helper',
+                                     description="Starsector rules.csv <-> JSON translation helper.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print warnings and errors")
+    parser.add_argument('--encoding', default=CSV_ENCODING,
+                        help=f"source CSV encoding or 'auto' to detect it (default {CSV_ENCODING})")
+    parser.add_argument('--json-encoding', default=JSON_ENCODING, help=f"JSON encoding (default {JSON_ENCODING})")
+    parser.add_argument('--output-encoding', default=OUTPUT_CSV_ENCODING,
+                        help=f"output CSV encoding (default {OUTPUT_CSV_ENCODING})")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write per-stage metrics (.prom/.txt: Prometheus text, otherwise JSON)")
+    parser.add_argument('--profile', choices=metrics.PROFILE_MODES, help="run the command under a profiler")
+    parser.add_argument('--profile-output', default=PROFILE_REPORT_FILE, help="profiler report file")
+    sub = parser.add_subparsers(dest='command', metavar='command')
+    sub.required = True
+
+    p = sub.add_parser('csv2json', help="convert rules.csv to JSON for translation")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('-o', '--output', default=JSON_FILE)
+    p.add_argument('--stream', action='store_true', help="convert row by row in constant memory")
+    p.add_argument('--parallel', type=int, metavar='N', help="parse record-aligned chunks on N processes")
+    p.add_argument('--script-strings', action='store_true',
+                   help="also extract display text from the script column (AddText \"...\" etc.)")
+    _add_rulecmd_arguments(p)
+    p.set_defaults(func=cmd_csv2json)
+
+    p = sub.add_parser('json2csv', help="build CSV from translated JSON")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-o', '--output', default=CSV_OUTPUT_FILE)
+    p.add_argument('--stream', action='store_true', help="convert row by row in constant memory")
+    p.add_argument('--source', help="check tokens against this CSV/JSON instead of the JSON's own fields")
+    p.add_argument('--no-validate', action='store_true', help="skip the token check after writing")
+    p.set_defaults(func=cmd_json2csv)
+
+    p = sub.add_parser('validate', help="check $vars, %%s, \\nOR\\n and option ids of a translation")
+    p.add_argument('input', nargs='?', default=JSON_FILE, help="translated JSON or CSV")
+    p.add_argument('--source', help="original CSV/JSON (required for CSV input)")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser('verify', help="check that a CSV survives csv2json + json2csv unchanged")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    group = p.add_mutually_exclusive_group()
+    group.add_argument('--json', help="compare with the CSV this JSON would produce instead of a round trip")
+    group.add_argument('--against', help="compare with another CSV record by record")
+    group.add_argument('--hashes', help="compare with record hashes saved by --save-hashes")
+    group.add_argument('--save-hashes', metavar='FILE', help="only store the record hashes of the input")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser('upgrade', help="carry a translation over to a new game version of rules.csv")
+    p.add_argument('old_source', help="rules.csv the translation was made from (CSV or JSON)")
+    p.add_argument('new_source', help="rules.csv of the new game version (CSV or JSON)")
+    p.add_argument('old_translation', help="translated CSV or JSON for old_source")
+    p.add_argument('-o', '--output', default=CSV_OUTPUT_FILE)
+    p.add_argument('--conflicts', default=UPGRADE_CONFLICTS_FILE,
+                   help="JSON list of rows whose English changed after translation")
+    p.set_defaults(func=cmd_upgrade)
+
+    p = sub.add_parser('batch', help="convert many files or directories on a process pool")
+    p.add_argument('direction', choices=['csv2json', 'json2csv'])
+    p.add_argument('inputs', nargs='+', help="files and/or directories (searched recursively)")
+    p.add_argument('-o', '--output-dir', default=BATCH_OUTPUT_DIR)
+    p.add_argument('-j', '--jobs', type=int, help="worker processes (default: all cores)")
+    p.add_argument('--chunk-size', type=int, default=batch.DEFAULT_CHUNK_SIZE,
+                   help="bytes per chunk when splitting one large CSV")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('fingerprint', help="store row fingerprints of the CSV the translation was made from")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('--index', default=FINGERPRINT_INDEX_FILE)
+    p.set_defaults(func=cmd_fingerprint)
+
+    p = sub.add_parser('delta', help="export only new or changed rows to JSON")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('-o', '--output', default=DELTA_JSON_FILE)
+    p.add_argument('--index', default=FINGERPRINT_INDEX_FILE)
+    p.set_defaults(func=cmd_delta)
+
+    p = sub.add_parser('merge-delta', help="merge a translated delta back into the full JSON")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('--json', default=JSON_FILE)
+    p.add_argument('--delta', default=DELTA_JSON_FILE)
+    p.add_argument('--index', default=FINGERPRINT_INDEX_FILE)
+    p.set_defaults(func=cmd_merge_delta)
+
+    p = sub.add_parser('tm-learn', help="add translated pairs from JSON to the translation memory")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('--tm', default=TM_FILE)
+    p.set_defaults(func=cmd_tm_learn)
+
+    p = sub.add_parser('tm-export', help="export unique untranslated strings")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-o', '--output', default=TM_UNIQUE_FILE)
+    p.add_argument('--tm', default=TM_FILE)
+    p.add_argument('--threshold', type=float, default=tm.DEFAULT_FUZZY_THRESHOLD)
+    p.set_defaults(func=cmd_tm_export)
+
+    p = sub.add_parser('tm-import', help="store translated unique strings in the translation memory")
+    p.add_argument('input', nargs='?', default=TM_UNIQUE_FILE)
+    p.add_argument('--tm', default=TM_FILE)
+    p.set_defaults(func=cmd_tm_import)
+
+    p = sub.add_parser('tm-fill', help="fill known translations into JSON")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-o', '--output', help="default: overwrite input")
+    p.add_argument('--tm', default=TM_FILE)
+    p.add_argument('--threshold', type=float, default=tm.DEFAULT_FUZZY_THRESHOLD)
+    p.set_defaults(func=cmd_tm_fill)
+
+    p = sub.add_parser('mt', help="pre-translate untranslated strings of JSON with a machine-translation server")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-o', '--output', help="default: overwrite input")
+    p.add_argument('--url', default=mt.DEFAULT_MT_URL, help="LibreTranslate-style /translate endpoint")
+    p.add_argument('--source-lang', default=mt.DEFAULT_SOURCE_LANG)
+    p.add_argument('--target-lang', default=mt.DEFAULT_TARGET_LANG)
+    p.add_argument('--api-key')
+    p.add_argument('--cache', default=mt.MT_CACHE_FILE, help="translations already received (reruns resume from it)")
+    p.add_argument('--concurrency', type=int, default=mt.DEFAULT_CONCURRENCY, help="requests in flight")
+    p.add_argument('--rate', type=float, default=mt.DEFAULT_RATE, help="max requests per second (0 = no limit)")
+    p.add_argument('--batch-chars', type=int, default=mt.DEFAULT_BATCH_CHARS)
+    p.add_argument('--batch-items', type=int, default=mt.DEFAULT_BATCH_ITEMS)
+    p.set_defaults(func=cmd_mt)
+
+    p = sub.add_parser('split', help="split JSON into N shards balanced by characters to translate")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-n', '--shards', type=int, required=True)
+    p.add_argument('--output-dir', help="default: next to the input")
+    p.set_defaults(func=cmd_split)
+
+    p = sub.add_parser('merge', help="check translated shards against their manifest and join them")
+    p.add_argument('manifest')
+    p.add_argument('-o', '--output', default=JSON_FILE)
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('db-import', help="load CSV or JSON files into the SQLite project store")
+    p.add_argument('inputs', nargs='*', default=[JSON_FILE])
+    p.add_argument('--db', default=PROJECT_DB_FILE)
+    p.set_defaults(func=cmd_db_import)
+
+    p = sub.add_parser('db-search', help="full-text search of source and translation in the project store")
+    p.add_argument('query')
+    p.add_argument('--db', default=PROJECT_DB_FILE)
+    p.add_argument('--column', choices=store.SEARCH_COLUMNS, help="search only the source or only the translation")
+    p.add_argument('--file', help="only this imported file")
+    p.add_argument('--fts', action='store_true', help="query is an FTS5 expression, not a phrase")
+    p.add_argument('--limit', type=int, default=store.DEFAULT_SEARCH_LIMIT)
+    p.set_defaults(func=cmd_db_search)
+
+    p = sub.add_parser('db-edit', help="change the translation of one unit in the project store")
+    p.add_argument('--db', default=PROJECT_DB_FILE)
+    p.add_argument('--file', default=JSON_FILE, help="imported file name")
+    p.add_argument('--row', type=int, required=True, help="_row_number")
+    p.add_argument('--field', choices=('text', 'options', 'script_strings'), default='text')
+    p.add_argument('--index', type=int, help="option or script string index for options/script_strings")
+    p.add_argument('text')
+    p.set_defaults(func=cmd_db_edit)
+
+    p = sub.add_parser('db-export', help="write CSV (or JSON for .json) from the project store")
+    p.add_argument('-o', '--output', default=CSV_OUTPUT_FILE)
+    p.add_argument('--db', default=PROJECT_DB_FILE)
+    p.add_argument('--file', help="imported file name (needed when the store holds several)")
+    p.set_defaults(func=cmd_db_export)
+
+    p = sub.add_parser('glossary-seed', help="add faction/commodity/entity names from the game's ids classes "
+                                             "to the glossary")
+    p.add_argument('input', nargs='?', default=JSON_FILE, help="JSON whose source text the terms must occur in")
+    p.add_argument('--glossary', default=glossary.GLOSSARY_FILE)
+    p.add_argument('--ids-dir', default=glossary.DEFAULT_IDS_DIR, help="directory with api/impl/campaign/ids/*.java")
+    p.add_argument('--classes', nargs='+', default=list(glossary.SEED_CLASSES), help="ids classes to take terms from")
+    p.set_defaults(func=cmd_glossary_seed)
+
+    p = sub.add_parser('glossary-check', help="flag translations that do not use the approved glossary terms")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('--glossary', default=glossary.GLOSSARY_FILE)
+    p.set_defaults(func=cmd_glossary_check)
+
+    p = sub.add_parser('java-strings', help="extract addPara/addTitle/addOption... text from the Java API sources")
+    p.add_argument('api_dir', nargs='?', default=javatext.DEFAULT_API_DIR)
+    p.add_argument('-o', '--output', default=javatext.JAVA_TEXT_FILE)
+    p.add_argument('--cache', default=javatext.JAVA_TEXT_CACHE_FILE, help="per-file results keyed by mtime and hash")
+    p.add_argument('--no-cache', action='store_true', help="parse every file and do not write the cache")
+    p.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    p.set_defaults(func=cmd_java_strings)
+
+    p = sub.add_parser('coverage', help="translation coverage by file/section/trigger, untranslated and odd-length units")
+    p.add_argument('inputs', nargs='*', default=[CSV_OUTPUT_FILE], help="translated JSON or CSV files")
+    p.add_argument('--source', help="source CSV or JSON matched by id (single input only)")
+    p.add_argument('-o', '--output', default=COVERAGE_REPORT_FILE, help="JSON report; empty to skip")
+    p.add_argument('--limit', type=int, default=20, help="max sections listed")
+    p.set_defaults(func=cmd_coverage)
+
+    p = sub.add_parser('watch', help="rebuild the translated CSV whenever the JSON is saved")
+    p.add_argument('input', nargs='?', default=JSON_FILE)
+    p.add_argument('-o', '--output', default=CSV_OUTPUT_FILE)
+    p.add_argument('--source', help=f"source CSV to watch for game updates (e.g. {CSV_INPUT_FILE})")
+    p.add_argument('--interval', type=float, default=watch.DEFAULT_POLL_INTERVAL, help="seconds between checks")
+    p.add_argument('--no-validate', action='store_true', help="do not check tokens of changed rows")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('to-compact', help="convert CSV or JSON to the compact string-table format")
+    p.add_argument('input')
+    p.add_argument('-o', '--output', default=COMPACT_FILE)
+    p.set_defaults(func=cmd_to_compact)
+
+    p = sub.add_parser('from-compact', help="convert the compact format to CSV (.csv) or JSON")
+    p.add_argument('input', nargs='?', default=COMPACT_FILE)
+    p.add_argument('-o', '--output', required=True)
+    p.set_defaults(func=cmd_from_compact)
+
+    p = sub.add_parser('index', help="build the byte-offset record index of a CSV")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('--index', default=RECORD_INDEX_FILE)
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser('lookup', help="print records by id, trigger or row number via the record index")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('--index', default=RECORD_INDEX_FILE, help="rebuilt automatically when the CSV changes")
+    p.add_argument('--id')
+    p.add_argument('--trigger')
+    p.add_argument('--row', type=int, help="_row_number (header is row 1)")
+    p.add_argument('--raw', action='store_true', help="print the CSV records as stored instead of JSON")
+    p.set_defaults(func=cmd_lookup)
+
+    p = sub.add_parser('detect-encoding', help="detect CSV encodings and report mixed-encoding bytes")
+    p.add_argument('inputs', nargs='+')
+    p.add_argument('--limit', type=int, default=encoding.MAX_ANOMALIES, help="max reported spots per file")
+    p.set_defaults(func=cmd_detect_encoding)
+
+    p = sub.add_parser('signatures', help="list script commands with display-text parameters")
+    _add_rulecmd_arguments(p)
+    p.set_defaults(func=cmd_signatures)
+
+    p = sub.add_parser('simulate', help="preview which rules fire and what text they show, without the game")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE, help="rules CSV or (translated) JSON")
+    p.add_argument('--trigger', default=simulate.DEFAULT_START_TRIGGER)
+    p.add_argument('--memory', help="JSON memory map, e.g. {\"global\": {\"x\": 1}, \"tag\": [\"gate\"]}")
+    p.add_argument('--commands', help="JSON results for condition commands, e.g. {\"RepGTE\": true}")
+    p.add_argument('--option', action='append', help="option ids to pick after the trigger, in order")
+    p.add_argument('--seed', type=int, help="seed for tie-breaking and OR variants")
+    p.add_argument('--walk', action='store_true', help="explore every option path from the trigger")
+    p.add_argument('--summary', action='store_true', help="with --walk, print only the path count per ending")
+    p.add_argument('--max-depth', type=int, default=8)
+    p.add_argument('--max-paths', type=int, default=10000)
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser('graph', help="link options to their handler rules; report orphans, dead rules, clusters")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE, help="rules CSV or JSON")
+    p.add_argument('--clusters', metavar='FILE', help="write dialog clusters (whole conversations) to JSON")
+    p.add_argument('--hub-threshold', type=int, default=dialoggraph.HUB_TRIGGER_RULES,
+                   help="FireBest/FireAll triggers with more rules than this do not join clusters")
+    p.add_argument('--limit', type=int, default=20, help="max items listed per report section")
+    p.set_defaults(func=cmd_graph)
+
+    p = sub.add_parser('profile-stages', help="time decoding, csv.reader, option parsing and JSON separately")
+    p.add_argument('input', nargs='?', default=CSV_INPUT_FILE)
+    p.add_argument('-o', '--output', help="also write the stage metrics (JSON or .prom)")
+    p.set_defaults(func=cmd_profile_stages)
+    return parser
+
+def _run_command(args) -> int:
+    with metrics.METRICS.stage(args.command):
+        if args.profile:
+            code = metrics.run_profiled(lambda: args.func(args), args.profile, args.profile_output)
+            logging.getLogger(__name__).info(f"Profile report written: {args.profile_output}")
+        else:
+            code = args.func(args)
+    if args.metrics:
+        metrics.METRICS.write(args.metrics)
+    return code
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
+    try:
+        return _run_command(args)
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename or e}")
+    except UnicodeDecodeError as e:
+        print(f"\n!!! Error: Failed to decode input using encoding '{e.encoding}'. !!!")
+        print(f"!!! Please check the --encoding option. Error: {e} !!!\n")
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON file: {e}")
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+    return 1
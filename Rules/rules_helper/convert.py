@@ -0,0 +1,159 @@
+"""Конвертация rules.csv <-> JSON для перевода (обычный и потоковый режимы)."""
+import csv
+import itertools
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .csvio import (DEFAULT_HEADER, CsvWriter, detect_header, item_to_fields,
+                    iter_csv_rows, make_row_object)
+from .files import (CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, PathOrStream,
+                    describe, open_text)
+from .jsonio import JsonArrayWriter, iter_json_array
+from .metrics import METRICS, file_size
+from .scripttext import add_script_strings
+
+logger = logging.getLogger(__name__)
+
+def read_csv_rows(csv_source: PathOrStream, encoding: str = CSV_ENCODING) -> List[Dict[str, Any]]:
+    """Читает весь CSV в список объектов строк."""
+    logger.info(f"Reading CSV: {describe(csv_source)} with encoding {encoding}")
+    with open_text(csv_source, 'r', encoding, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("CSV file is empty or has no header.")
+        logger.info(f"CSV Header: {header} ({len(header)} columns)")
+        return [make_row_object(header, row, i + 2) for i, row in enumerate(reader)]
+
+def csv_to_json(csv_source: PathOrStream, json_target: PathOrStream,
+                csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING,
+                script_signatures: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """
+    Конвертирует CSV в JSON целиком в памяти. Возвращает число объектов.
+    С таблицей script_signatures (rulecmd) текст из колонки script выносится в script_strings.
+    """
+    with METRICS.stage('csv_read', bytes_in=file_size(csv_source)) as st:
+        json_data = read_csv_rows(csv_source, csv_encoding)
+        for row_obj in json_data:
+            st.count_row(row_obj)
+            if script_signatures is not None:
+                add_script_strings(row_obj, script_signatures)
+        st.rows = len(json_data)
+    logger.info(f"Writing JSON: {describe(json_target)} with encoding {json_encoding}")
+    with METRICS.stage('json_write') as st:
+        with open_text(json_target, 'w', json_encoding) as jsonfile:
+            json.dump(json_data, jsonfile, ensure_ascii=False, indent=2)
+        st.rows = len(json_data)
+        st.bytes_out = file_size(json_target)
+    logger.info(f"CSV to JSON conversion successful. {len(json_data)} objects written.")
+    return len(json_data)
+
+def find_header(items: Iterable[Dict[str, Any]]) -> Optional[List[str]]:
+    for item in items:
+        header = detect_header(item)
+        if header:
+            return header
+    return None
+
+def _warn_header(header: Optional[List[str]]) -> List[str]:
+    if not header:
+        logger.warning("Warning: No data found in JSON to determine header. Using default 7 columns.")
+        return list(DEFAULT_HEADER)
+    if header != DEFAULT_HEADER:
+        logger.warning(f"Warning: Could not determine standard header, using generic field names "
+                       f"based on field count ({len(header)}).")
+    return header
+
+def write_csv_rows(items: Iterable[Dict[str, Any]], header: List[str], outfile) -> int:
+    """Пишет заголовок и строки в открытый CSV. Возвращает число записанных строк данных."""
+    written = 0
+    with CsvWriter(outfile) as writer:
+        writer.writerow(header)
+        for item in items:
+            fields_to_write = item_to_fields(item, header)
+            if fields_to_write is None:
+                continue
+            writer.writerow(fields_to_write)
+            written += 1
+    return written
+
+def json_to_csv(json_source: PathOrStream, csv_target: PathOrStream,
+                json_encoding: str = JSON_ENCODING, csv_encoding: str = OUTPUT_CSV_ENCODING) -> int:
+    """Собирает новый CSV из JSON данных с ручным квотированием. Возвращает число строк."""
+    logger.info(f"Reading processed JSON: {describe(json_source)} with encoding {json_encoding}")
+    with METRICS.stage('json_read', bytes_in=file_size(json_source)) as st:
+        with open_text(json_source, 'r', json_encoding) as jsonfile:
+            json_data_list = json.load(jsonfile)
+        for item in json_data_list:
+            st.count_row(item)
+        st.rows = len(json_data_list)
+    header = _warn_header(find_header(json_data_list))
+
+    logger.info(f"Writing output CSV: {describe(csv_target)} with encoding {csv_encoding}")
+    with METRICS.stage('csv_write') as st:
+        with open_text(csv_target, 'w', csv_encoding, newline='') as outfile:
+            written = write_csv_rows(json_data_list, header, outfile)
+        st.rows = written
+        st.bytes_out = file_size(csv_target)
+    logger.info("JSON to CSV conversion successful.")
+    return written
+
+# --- Потоковый режим ---
+# Строки обрабатываются по одной: память не растет с размером файла,
+# а вывод начинается сразу. Результат побайтно совпадает с обычным режимом.
+
+def csv_to_json_stream(csv_source: PathOrStream, json_target: PathOrStream,
+                       csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING,
+                       script_signatures: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """Потоковая версия csv_to_json: пишет объекты JSON по мере чтения CSV."""
+    logger.info(f"Streaming CSV: {describe(csv_source)} with encoding {csv_encoding} "
+                f"-> JSON: {describe(json_target)}")
+    with METRICS.stage('csv2json_stream', bytes_in=file_size(csv_source)) as st:
+        rows = iter_csv_rows(csv_source, csv_encoding, require_header=True)
+        # Пустой CSV - ValueError еще до создания выходного файла, как в обычном режиме
+        first = next(rows, None)
+        with open_text(json_target, 'w', json_encoding) as jsonfile:
+            writer = JsonArrayWriter(jsonfile)
+            for row_obj in itertools.chain([first] if first is not None else [], rows):
+                st.count_row(row_obj)
+                if script_signatures is not None:
+                    add_script_strings(row_obj, script_signatures)
+                writer.write(row_obj)
+            writer.close()
+        st.rows = writer.count
+        st.bytes_out = file_size(json_target)
+    logger.info(f"CSV to JSON conversion successful. {writer.count} objects written.")
+    return writer.count
+
+def split_header(items: Iterable[Dict[str, Any]]) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """
+    Заголовок по первому объекту data и итератор по всем объектам. В памяти
+    задерживаются только объекты до первого data (обычно пара комментариев).
+    """
+    items = iter(items)
+    pending = []
+    header = None
+    for item in items:
+        pending.append(item)
+        header = detect_header(item)
+        if header:
+            break
+    return _warn_header(header), itertools.chain(pending, items)
+
+def json_to_csv_stream(json_source: PathOrStream, csv_target: PathOrStream,
+                       json_encoding: str = JSON_ENCODING, csv_encoding: str = OUTPUT_CSV_ENCODING) -> int:
+    """
+    Потоковая версия json_to_csv. Заголовок определяется по первому объекту data
+    (см. split_header).
+    """
+    logger.info(f"Streaming JSON: {describe(json_source)} with encoding {json_encoding} "
+                f"-> CSV: {describe(csv_target)}")
+    with METRICS.stage('json2csv_stream', bytes_in=file_size(json_source)) as st:
+        header, items = split_header(iter_json_array(json_source, json_encoding))
+        with open_text(csv_target, 'w', csv_encoding, newline='') as outfile:
+            written = write_csv_rows(items, header, outfile)
+        st.rows = written
+        st.bytes_out = file_size(csv_target)
+    logger.info("JSON to CSV conversion successful.")
+    return written
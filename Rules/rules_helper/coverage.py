@@ -0,0 +1,231 @@
+"""
+Отчет о полноте перевода и подозрительных строках.
+
+Переводимые единицы (tm.iter_translatable_units) всех файлов собираются в
+столбцы: исходник, перевод, файл, раздел (последний комментарий перед
+строкой) и триггер. Дальше все считается над столбцами целиком:
+
+- доля кириллицы среди букв перевода ($переменные не считаются); единица с
+  долей ниже UNTRANSLATED_CYRILLIC_RATIO считается непереведенной
+  ("beaconLeave:Leave");
+- отношение длины перевода к длине исходника; выбросы по робастной оценке
+  (медиана и MAD логарифма отношения) - обрезанный машинный перевод или
+  вставленный не на свое место текст;
+- процент переведенных единиц по файлам, разделам и триггерам.
+
+С NumPy буквы считаются одним проходом по массиву кодов символов всех строк
+сразу, без NumPy - тем же способом построчно на чистом Python (результат
+одинаковый). Отчет пишется в JSON без времени и путей сборки, с
+отсортированными списками, чтобы отчеты двух сборок можно было сравнить diff.
+"""
+import json
+import logging
+import math
+import os
+import re
+import statistics
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .files import CSV_ENCODING, JSON_ENCODING, PathOrStream, atomic_write, describe
+from .incremental import iter_row_keys
+from .tm import iter_translatable_units
+from .validate import iter_rule_items
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+COVERAGE_REPORT_VERSION: int = 1
+UNTRANSLATED_CYRILLIC_RATIO: float = 0.5
+OUTLIER_Z: float = 3.5
+# Короче этого отношение длин слишком шумное ("Да" / "Yes")
+MIN_OUTLIER_CHARS: int = 20
+SNIPPET_CHARS: int = 80
+NO_SECTION: str = '(before first comment)'
+
+_VARIABLE_PATTERN = re.compile(r"\$[\w.]+")
+_CYRILLIC_PATTERN = re.compile(r"[Ѐ-ӿ]")
+_LATIN_PATTERN = re.compile(r"[A-Za-z]")
+# MAD -> стандартное отклонение для нормального распределения
+_MAD_SCALE = 1.4826
+
+class UnitColumns:
+    """Столбцы переводимых единиц всех файлов."""
+
+    def __init__(self):
+        self.files: List[str] = []
+        self.rows: List[int] = []
+        self.ids: List[str] = []
+        self.columns: List[str] = []
+        self.sections: List[str] = []
+        self.triggers: List[str] = []
+        self.sources: List[str] = []
+        self.targets: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def add_items(self, name: str, items: Iterable[Dict[str, Any]]):
+        section = NO_SECTION
+        for item in items:
+            if item.get("_type") == "comment":
+                section = (item.get("fields") or [''])[0].strip()
+                continue
+            fields = item.get("fields") or []
+            trigger = fields[1].strip() if len(fields) > 1 else ''
+            for field, index, source, current in iter_translatable_units(item):
+                self.files.append(name)
+                self.rows.append(item.get("_row_number", 0))
+                self.ids.append(item.get("id", '').strip())
+                self.columns.append(field if index is None else f"{field}:{index}")
+                self.sections.append(section)
+                self.triggers.append(trigger)
+                self.sources.append(source)
+                self.targets.append(current)
+
+def pair_items(translated_items: Iterable[Dict[str, Any]],
+               source_items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Строки перевода с исходником в fields (как в JSON для перевода): пары
+    подбираются по id, как в validate. Строки data без пары в исходнике
+    пропускаются, остальные (комментарии - границы разделов) идут как есть.
+    """
+    sources = {key: item for key, item in iter_row_keys(source_items)}
+    for key, item in iter_row_keys(translated_items):
+        if item.get("_type") != "data":
+            yield item
+            continue
+        source = sources.get(key)
+        if source is None:
+            continue
+        merged = dict(item)
+        merged["fields"] = source.get("fields", [])
+        merged["_row_number"] = item.get("_row_number", 0)
+        yield merged
+
+def letter_counts(texts: List[str]) -> Tuple[List[int], List[int]]:
+    """(кириллических букв, латинских букв) в каждой строке, без $переменных."""
+    texts = [_VARIABLE_PATTERN.sub('', t) for t in texts]
+    if np is None:
+        return ([len(_CYRILLIC_PATTERN.findall(t)) for t in texts],
+                [len(_LATIN_PATTERN.findall(t)) for t in texts])
+    # Все строки подряд одним массивом кодов; суммы по строкам - разности накопленных сумм
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype='<u4')
+    ends = np.cumsum([len(t) for t in texts], dtype=np.int64)
+    starts = ends - np.array([len(t) for t in texts], dtype=np.int64)
+    lower = codes | 0x20
+    counts = []
+    for mask in ((codes >= 0x400) & (codes <= 0x4FF), (lower >= 0x61) & (lower <= 0x7A)):
+        cumulative = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+        counts.append((cumulative[ends] - cumulative[starts]).tolist())
+    return counts[0], counts[1]
+
+def length_z_scores(source_lengths: List[int], target_lengths: List[int],
+                    candidates: List[bool]) -> List[float]:
+    """
+    Робастный z логарифма отношения длин для единиц candidates (остальным 0).
+    Центр и масштаб - медиана и MAD по самим candidates.
+    """
+    if np is not None:
+        src = np.array(source_lengths, dtype=float)
+        tgt = np.array(target_lengths, dtype=float)
+        mask = np.array(candidates, dtype=bool)
+        if not mask.any():
+            return [0.0] * len(source_lengths)
+        log_ratio = np.log(np.maximum(tgt, 1) / np.maximum(src, 1))
+        center = np.median(log_ratio[mask])
+        mad = np.median(np.abs(log_ratio[mask] - center)) * _MAD_SCALE
+        z = np.where(mask, (log_ratio - center) / mad if mad else 0.0, 0.0)
+        return z.tolist()
+    log_ratio = [math.log(max(t, 1) / max(s, 1)) for s, t in zip(source_lengths, target_lengths)]
+    selected = [r for r, m in zip(log_ratio, candidates) if m]
+    if not selected:
+        return [0.0] * len(source_lengths)
+    center = statistics.median(selected)
+    mad = statistics.median(abs(r - center) for r in selected) * _MAD_SCALE
+    return [(r - center) / mad if m and mad else 0.0 for r, m in zip(log_ratio, candidates)]
+
+def group_coverage(keys: List[str], translated: List[bool]) -> Dict[str, Tuple[int, int]]:
+    """{ключ: (единиц, переведено)} в порядке первого появления ключа."""
+    order: Dict[str, int] = {}
+    codes = [order.setdefault(k, len(order)) for k in keys]
+    if np is not None and codes:
+        totals = np.bincount(codes, minlength=len(order)).tolist()
+        done = np.bincount(codes, weights=translated, minlength=len(order)).astype(int).tolist()
+    else:
+        totals, done = [0] * len(order), [0] * len(order)
+        for code, flag in zip(codes, translated):
+            totals[code] += 1
+            done[code] += flag
+    return {key: (totals[code], done[code]) for key, code in order.items()}
+
+def _percent(total: int, done: int) -> float:
+    return round(100.0 * done / total, 1) if total else 100.0
+
+def _snippet(text: str) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS - 3] + '...'
+
+def build_coverage_report(units: UnitColumns) -> Dict[str, Any]:
+    """Считает отчет по собранным столбцам."""
+    cyrillic, latin = letter_counts(units.targets)
+    translated = [not (c + l) or c / (c + l) >= UNTRANSLATED_CYRILLIC_RATIO for c, l in zip(cyrillic, latin)]
+    source_lengths = [len(s) for s in units.sources]
+    target_lengths = [len(t) for t in units.targets]
+    # Выбросы ищутся только среди переведенных, где перевод и правда отличается от исходника
+    candidates = [flag and s >= MIN_OUTLIER_CHARS and src != tgt
+                  for flag, s, src, tgt in zip(translated, source_lengths, units.sources, units.targets)]
+    z_scores = length_z_scores(source_lengths, target_lengths, candidates)
+
+    def unit_ref(i: int) -> Dict[str, Any]:
+        return {"file": units.files[i], "row": units.rows[i], "id": units.ids[i], "column": units.columns[i]}
+
+    untranslated = [dict(unit_ref(i), text=_snippet(units.targets[i]))
+                    for i, flag in enumerate(translated) if not flag]
+    outliers = [dict(unit_ref(i), ratio=round(target_lengths[i] / source_lengths[i], 2),
+                     source_chars=source_lengths[i], target_chars=target_lengths[i], z=round(z, 1))
+                for i, z in enumerate(z_scores) if abs(z) > OUTLIER_Z]
+
+    files = group_coverage(units.files, translated)
+    sections = group_coverage([f"{f}\x00{s}" for f, s in zip(units.files, units.sections)], translated)
+    triggers = group_coverage(units.triggers, translated)
+    done = sum(translated)
+    return {
+        "version": COVERAGE_REPORT_VERSION,
+        "total": {"units": len(units), "translated": done, "percent": _percent(len(units), done)},
+        "files": [{"file": name, "units": total, "translated": ok, "percent": _percent(total, ok)}
+                  for name, (total, ok) in sorted(files.items())],
+        "sections": [{"file": key.split('\x00')[0], "section": key.split('\x00')[1], "units": total,
+                      "translated": ok, "percent": _percent(total, ok)} for key, (total, ok) in sections.items()],
+        "triggers": [{"trigger": name, "units": total, "translated": ok, "percent": _percent(total, ok)}
+                     for name, (total, ok) in sorted(triggers.items())],
+        "untranslated": untranslated,
+        "length_outliers": outliers,
+    }
+
+def coverage_report(inputs: List[PathOrStream], source: Optional[PathOrStream] = None,
+                    csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING) -> Dict[str, Any]:
+    """
+    Отчет по переводам inputs (JSON для перевода, где исходник в fields, или CSV).
+    С source (только для одного input) исходник берется оттуда, по id строк.
+    Без исходника у переведенного CSV отношение длин не считается: там fields - сам перевод.
+    """
+    if source is not None and len(inputs) != 1:
+        raise ValueError("A separate source can only be given for a single translated file.")
+    units = UnitColumns()
+    for path in inputs:
+        items = iter_rule_items(path, csv_encoding, json_encoding)
+        if source is not None:
+            items = pair_items(items, iter_rule_items(source, csv_encoding, json_encoding))
+        units.add_items(os.path.basename(describe(path)), items)
+    logger.info(f"Coverage: {len(units)} translatable units from {len(inputs)} file(s)"
+                f"{'' if np is not None else ' (NumPy not installed, using pure Python)'}.")
+    return build_coverage_report(units)
+
+def write_coverage_report(report: Dict[str, Any], report_filepath: str):
+    with atomic_write(report_filepath, 'utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+        f.write('\n')
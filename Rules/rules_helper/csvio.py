@@ -0,0 +1,193 @@
+"""Модель строк rules.csv: объекты строк (_row_number, _type, fields) и ручное CSV квотирование."""
+import csv
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+from .files import CSV_ENCODING, PathOrStream, open_text
+from .options import parse_options_string, build_options_string
+from .scripttext import splice_script_strings
+
+DEFAULT_HEADER: List[str] = ['id', 'trigger', 'conditions', 'script', 'text', 'options', 'notes']
+# Типы строк, которые пишутся обратно из сохраненного списка fields
+RAW_ROW_TYPES = ("comment", "empty_separator", "potentially_empty", "malformed_row")
+
+# Замена "умных" кавычек на стандартные (заодно и одинарных) одним проходом
+SMART_QUOTES_TABLE = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+# Сколько строк CsvWriter копит перед форматированием и записью одним куском
+CSV_WRITE_BATCH_ROWS: int = 2048
+
+def quote_csv_field(field_value: Any) -> str:
+    """
+    Применяет минимальное CSV квотирование к полю вручную,
+    заменяя умные кавычки и экранируя стандартные.
+    """
+    if field_value is None:
+        return ""
+    field_str = str(field_value).translate(SMART_QUOTES_TABLE)
+
+    # Условия: содержит запятую, стандартную кавычку, \n или \r
+    if ',' in field_str or '"' in field_str or '\n' in field_str or '\r' in field_str:
+        return '"' + field_str.replace('"', '""') + '"'
+    return field_str
+
+def _row_strings(fields: List[Any]) -> List[str]:
+    return ['' if f is None else str(f) for f in fields]
+
+def format_csv_rows(rows: Iterable[List[Any]]) -> str:
+    """
+    Форматирует пачку строк CSV так же, как quote_csv_field по каждому полю,
+    но без вызова функции на поле: умные кавычки ищутся один раз во всей
+    склеенной строке, а квотирование решается прямо в генераторе списка.
+    """
+    lines = []
+    append = lines.append
+    for fields in rows:
+        try:
+            joined = '\x1f'.join(fields)
+        except TypeError:
+            fields = _row_strings(fields)
+            joined = '\x1f'.join(fields)
+        if '’' in joined or '“' in joined or '”' in joined or '‘' in joined:
+            fields = [f.translate(SMART_QUOTES_TABLE) for f in fields]
+        append(','.join([('"' + f.replace('"', '""') + '"')
+                         if (',' in f or '"' in f or '\n' in f or '\r' in f) else f
+                         for f in fields]))
+    if not lines:
+        return ''
+    append('')
+    return '\n'.join(lines)
+
+def format_csv_line(fields: List[Any]) -> str:
+    """Квотирует каждое поле вручную и собирает строку CSV."""
+    return format_csv_rows((fields,))
+
+class CsvWriter:
+    """
+    Буферизованный писатель CSV в минимальном диалекте quote_csv_field:
+    строки копятся пачками и уходят в файл одним write на пачку.
+    """
+
+    def __init__(self, outfile, batch_rows: int = CSV_WRITE_BATCH_ROWS):
+        self.outfile = outfile
+        self.batch_rows = batch_rows
+        self._rows: List[List[Any]] = []
+
+    def writerow(self, fields: List[Any]):
+        self._rows.append(fields)
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def writerows(self, rows: Iterable[List[Any]]):
+        for fields in rows:
+            self.writerow(fields)
+
+    def flush(self):
+        if self._rows:
+            self.outfile.write(format_csv_rows(self._rows))
+            self._rows = []
+
+    def __enter__(self) -> 'CsvWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+def pad_fields(row: List[str], expected_columns: int) -> List[str]:
+    """Копия записи, дополненная пустыми строками или обрезанная до expected_columns."""
+    fields = list(row)
+    if len(fields) < expected_columns:
+        fields.extend([''] * (expected_columns - len(fields)))
+    elif len(fields) > expected_columns:
+        fields = fields[:expected_columns]
+    return fields
+
+def row_type(fields: List[str]) -> str:
+    """_type записи CSV: comment, empty_separator или data."""
+    if fields and fields[0].strip().startswith('#'):
+        return "comment"
+    if not any(f.strip() for f in fields):
+        return "empty_separator"
+    return "data"
+
+def make_row_object(header: List[str], row: List[str], row_number: int) -> Dict[str, Any]:
+    """Превращает одну запись CSV в объект JSON (с _row_number, _type и fields)."""
+    fields = pad_fields(row, len(header))
+    row_obj = {
+        "_row_number": row_number,
+        "fields": fields,
+        "_type": row_type(fields)
+    }
+    if row_obj["_type"] == "data":
+        for idx, field_name in enumerate(header):
+            value = fields[idx]
+            if field_name == 'options':
+                row_obj[field_name] = parse_options_string(value)
+            else:
+                row_obj[field_name] = value
+    return row_obj
+
+def detect_header(item: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Пытается определить заголовок CSV по одному объекту JSON.
+    Возвращает None, если по этому объекту заголовок определить нельзя.
+    """
+    if item.get("_type") != "data":
+        return None
+    temp_header = [k for k in item.keys() if not k.startswith('_') and k != 'fields']
+    if all(f in temp_header for f in DEFAULT_HEADER):
+        return list(DEFAULT_HEADER)
+    if "fields" in item and len(item["fields"]) > 0:
+        return [f"field_{i}" for i in range(len(item["fields"]))]
+    return None
+
+def item_to_fields(item: Dict[str, Any], header: List[str]) -> Optional[List[Any]]:
+    """
+    Собирает список значений полей CSV из объекта JSON.
+    Возвращает None для строк неизвестного типа (их пропускаем).
+    """
+    expected_columns = len(header)
+    row_type = item.get("_type")
+    fields_to_write = []
+
+    if row_type in RAW_ROW_TYPES:
+        fields_to_write = list(item.get("fields", [''] * expected_columns))
+    elif row_type == "data":
+        for field_name in header:
+            if field_name == 'options':
+                options_list = item.get(field_name, [])
+                fields_to_write.append(build_options_string(options_list))
+            elif field_name == 'script' and item.get("script_strings"):
+                fields_to_write.append(splice_script_strings(item.get(field_name, ''), item["script_strings"]))
+            else:
+                fields_to_write.append(item.get(field_name, ''))
+    else:
+        return None # Неизвестные типы безопаснее пропустить
+
+    # Убедимся, что количество полей верное
+    if len(fields_to_write) < expected_columns:
+        fields_to_write.extend([''] * (expected_columns - len(fields_to_write)))
+    elif len(fields_to_write) > expected_columns:
+        fields_to_write = fields_to_write[:expected_columns]
+    return fields_to_write
+
+def read_csv_header(csv_source: PathOrStream, encoding: str = CSV_ENCODING) -> Optional[List[str]]:
+    """Заголовок CSV или None для пустого файла."""
+    with open_text(csv_source, 'r', encoding, newline='') as csvfile:
+        return next(csv.reader(csvfile), None)
+
+def iter_csv_rows(csv_source: PathOrStream, encoding: str = CSV_ENCODING,
+                  require_header: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Генератор объектов строк CSV, по одной записи за раз (_row_number заголовка = 1).
+    Пустой файл дает пустой поток, а с require_header - ValueError, как read_csv_rows.
+    """
+    with open_text(csv_source, 'r', encoding, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        try:
+            header = next(reader)
+        except StopIteration:
+            if require_header:
+                raise ValueError("CSV file is empty or has no header.")
+            return
+        for i, row in enumerate(reader):
+            yield make_row_object(header, row, i + 2)
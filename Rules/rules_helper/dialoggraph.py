@@ -0,0 +1,215 @@
+"""
+Граф диалогов: связи опций с правилами.
+
+Опция объявляется в колонке options ("defaultLeave:Leave"), командой
+AddOption в script или присваиванием "$option = X" перед FireBest
+DialogOptionSelected, а обрабатывается правилами с условием
+"$option == defaultLeave". SetShortcut, SetEnabled и другие команды с id
+опции первым параметром тоже считаются ссылками на нее. Правила связаны еще
+и через FireBest/FireAll <trigger>.
+
+Граф строится за один проход по строкам csv_to_json и отвечает на вопросы:
+какие опции никто не обрабатывает, какие правила недостижимы от триггеров
+игры и какие правила образуют один разговор (кластер) - по кластерам перевод
+делится между переводчиками целыми разговорами.
+"""
+import logging
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from .scripttext import script_tokens
+from .simulate import OPTION_TRIGGER
+
+logger = logging.getLogger(__name__)
+
+# Триггеры и опции, с которыми связано больше правил, чем здесь, - общие точки
+# входа (PopulateOptions, defaultLeave и т.п.); через них разговоры в кластеры не склеиваются
+HUB_TRIGGER_RULES: int = 15
+FIRE_COMMANDS = frozenset(('FireBest', 'FireAll'))
+DECLARE_COMMANDS = frozenset(('AddOption',))
+# Команды, первым параметром которых идет id опции
+REFERENCE_COMMANDS = frozenset(('SetShortcut', 'SetEnabled', 'SetTooltip', 'SetTooltipHighlights',
+                                'SetTooltipHighlightColors', 'SetOptionText', 'SetOptionColor',
+                                'SetStoryOption', 'RemoveOption'))
+
+_HANDLER_PATTERN = re.compile(r"^\$option\s*==\s*(\S+)")
+
+class RuleNode(NamedTuple):
+    row_number: int
+    id: str
+    trigger: str
+    chars: int
+
+class Cluster(NamedTuple):
+    rules: List[int]
+    ids: List[str]
+    options: List[str]
+    chars: int
+
+class DialogGraph:
+    """Индексы опция -> правила и правило -> опции/триггеры."""
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self.rules: List[RuleNode] = []
+        self.declared: Dict[str, List[int]] = {}
+        self.handlers: Dict[str, List[int]] = {}
+        self.references: Dict[str, List[int]] = {}
+        self.rule_options: List[List[str]] = []
+        self.fires: List[List[str]] = []
+        self.by_trigger: Dict[str, List[int]] = {}
+        self.generic_handlers: List[int] = []
+        for item in items:
+            if item.get('_type') == 'data':
+                self._add_rule(item)
+        logger.info(f"Dialog graph: {len(self.rules)} rules, {len(self.declared)} declared options, "
+                    f"{len(self.handlers)} handled options.")
+
+    def _add_rule(self, item: Dict[str, Any]):
+        index = len(self.rules)
+        trigger = item.get('trigger', '').strip()
+        options = item.get('options') or []
+        chars = len(item.get('text', '')) + sum(len(opt.get('text', '')) for opt in options)
+        self.rules.append(RuleNode(item.get('_row_number', 0), item.get('id', '').strip(), trigger, chars))
+        self.by_trigger.setdefault(trigger, []).append(index)
+
+        # "#id:текст" - закомментированная опция, игра ее не показывает
+        added = [opt['id'].strip() for opt in options if 'id' in opt and not opt['id'].lstrip().startswith('#')]
+        fires = []
+        for line in (item.get('script') or '').split('\n'):
+            tokens = script_tokens(line.strip())
+            if len(tokens) >= 3 and tokens[0] == '$option' and tokens[1] == '=':
+                # "$option = X" + "FireBest DialogOptionSelected" - переход к опции X без показа
+                added.append(tokens[2])
+                continue
+            if len(tokens) < 2:
+                continue
+            command, target = tokens[0], tokens[1]
+            if command in DECLARE_COMMANDS:
+                added.append(target)
+            elif command in FIRE_COMMANDS:
+                fires.append(target)
+            elif command in REFERENCE_COMMANDS:
+                self.references.setdefault(target, []).append(index)
+        for option_id in added:
+            self.declared.setdefault(option_id, []).append(index)
+        self.rule_options.append(added)
+        self.fires.append(fires)
+
+        handled = False
+        for line in (item.get('conditions') or '').split('\n'):
+            match = _HANDLER_PATTERN.match(line.strip())
+            if match:
+                self.handlers.setdefault(match.group(1), []).append(index)
+                handled = True
+        if trigger == OPTION_TRIGGER and not handled:
+            self.generic_handlers.append(index)
+
+    def handlers_of(self, option_id: str) -> List[RuleNode]:
+        return [self.rules[i] for i in self.handlers.get(option_id, ())]
+
+    def declarers_of(self, option_id: str) -> List[RuleNode]:
+        return [self.rules[i] for i in self.declared.get(option_id, ())]
+
+    def orphaned_options(self) -> List[str]:
+        """Опции, которые объявлены, но не обрабатываются ни одним правилом."""
+        return sorted(opt for opt in self.declared if opt not in self.handlers)
+
+    def undeclared_handlers(self) -> List[str]:
+        """Опции, у которых есть обработчик, но нет объявления в rules.csv (возможно, их добавляет код игры)."""
+        return sorted(opt for opt in self.handlers if opt not in self.declared and opt not in self.references)
+
+    def root_triggers(self) -> Set[str]:
+        """Триггеры, которые вызывает сама игра: их не запускает ни одно правило."""
+        fired = {trigger for fires in self.fires for trigger in fires}
+        return {t for t in self.by_trigger if t not in fired and t != OPTION_TRIGGER}
+
+    def reachable_rules(self, roots: Optional[Iterable[str]] = None) -> Set[int]:
+        """
+        Индексы правил, достижимых от триггеров roots (по умолчанию - root_triggers).
+        Опции, которые добавляет код игры, а не rules.csv, здесь не видны, поэтому
+        их обработчики попадают в недостижимые.
+        """
+        queue = deque(i for t in (roots if roots is not None else self.root_triggers())
+                      for i in self.by_trigger.get(t, ()))
+        seen = set(queue)
+        generic_done = False
+        while queue:
+            index = queue.popleft()
+            targets: List[int] = []
+            for option_id in self.rule_options[index]:
+                targets.extend(self.handlers.get(option_id, ()))
+                if not generic_done:
+                    # Обработчики без $option срабатывают на любую выбранную опцию
+                    targets.extend(self.generic_handlers)
+                    generic_done = True
+            for trigger in self.fires[index]:
+                # FireBest DialogOptionSelected повторяет выбор текущей опции, а не всех сразу
+                if trigger == OPTION_TRIGGER:
+                    targets.extend(self.generic_handlers)
+                else:
+                    targets.extend(self.by_trigger.get(trigger, ()))
+            for target in targets:
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+
+    def unreachable_rules(self, roots: Optional[Iterable[str]] = None) -> List[RuleNode]:
+        reachable = self.reachable_rules(roots)
+        return [rule for i, rule in enumerate(self.rules) if i not in reachable]
+
+    def clusters(self, hub_threshold: int = HUB_TRIGGER_RULES) -> List[Cluster]:
+        """
+        Связные компоненты: правила, объявляющие, обрабатывающие или упоминающие
+        одну опцию, и правила, вызывающие триггер, вместе с его правилами. Общие
+        опции и триггеры (больше hub_threshold правил вместе с вызывающими)
+        компоненты не связывают.
+        Отсортированы по убыванию объема текста.
+        """
+        parent = list(range(len(self.rules)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(group: Iterable[int]):
+            group = iter(group)
+            first = next(group, None)
+            if first is None:
+                return
+            root = find(first)
+            for i in group:
+                other = find(i)
+                if other != root:
+                    parent[other] = root
+
+        for option_id in set(self.declared) | set(self.handlers) | set(self.references):
+            members = (self.declared.get(option_id, []) + self.handlers.get(option_id, [])
+                       + self.references.get(option_id, []))
+            if len(members) <= hub_threshold:
+                union(members)
+        callers: Dict[str, List[int]] = {}
+        for index, fires in enumerate(self.fires):
+            for trigger in fires:
+                callers.setdefault(trigger, []).append(index)
+        for trigger, indices in callers.items():
+            # Счет идет и по вызывающим: MostLuddicEthosRefresh из одного правила,
+            # но вызывается из сорока разных разговоров
+            members = indices + self.by_trigger.get(trigger, [])
+            if trigger != OPTION_TRIGGER and len(members) <= hub_threshold:
+                union(members)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(self.rules)):
+            groups.setdefault(find(i), []).append(i)
+        clusters = []
+        for members in groups.values():
+            options = sorted({opt for i in members for opt in self.rule_options[i]})
+            clusters.append(Cluster([self.rules[i].row_number for i in members],
+                                    [self.rules[i].id for i in members], options,
+                                    sum(self.rules[i].chars for i in members)))
+        clusters.sort(key=lambda c: (-c.chars, c.rules[0]))
+        return clusters
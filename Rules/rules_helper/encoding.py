@@ -0,0 +1,277 @@
+"""
+Определение кодировки входного CSV.
+
+Файл отображается в память (mmap) один раз: по этим байтам проверяется BOM,
+затем строгий UTF-8 (по кускам); если он не подходит, выбор между
+cp1251/cp1252/latin-1 делается по статистике старших байтов. open_mapped
+декодирует то же отображение потоком, без повторного открытия и чтения файла.
+Для файлов со смешанными кодировками find_encoding_anomalies дает точные
+смещения байтов.
+"""
+import codecs
+import io
+import logging
+import mmap
+import os
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AUTO: str = 'auto'
+# Если старшие байты одинаково читаются в cp1251 и cp1252 (кавычки, тире и т.п.),
+# остаемся на исторической кодировке rules.csv
+DEFAULT_SINGLE_BYTE: str = 'cp1251'
+MAX_ANOMALIES: int = 100
+# Определение идет по кускам - память не зависит от размера файла
+DETECT_CHUNK_SIZE: int = 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+_ASCII = bytes(range(128))
+# Байты, не определенные в кодировке (декодирование с errors='strict' на них падает)
+_UNDEFINED = {
+    'cp1251': {0x98},
+    'cp1252': {0x81, 0x8D, 0x8F, 0x90, 0x9D},
+}
+_LETTERS = frozenset(range(0xC0, 0x100))
+_ASCII_LETTERS = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+# Подряд идущие буквы 0xC0-0xFF: одиночный байт рядом с латинской буквой -
+# акцентированная буква cp1252, все остальное - кириллица cp1251
+_LETTER_RUN = re.compile(rb'[\xC0-\xFF]+')
+_UTF8_RUN = re.compile(rb'(?:[\xC2-\xDF][\x80-\xBF]|[\xE0-\xEF][\x80-\xBF]{2}|[\xF0-\xF4][\x80-\xBF]{3})+')
+
+class EncodingGuess(NamedTuple):
+    encoding: str
+    reason: str
+    bom: bool = False
+    mixed: bool = False
+
+class EncodingAnomaly(NamedTuple):
+    """Участок файла, не соответствующий выбранной кодировке."""
+    offset: int
+    length: int
+    line: int
+    kind: str  # 'invalid' - не декодируется, 'utf8' - UTF-8 последовательность в однобайтовом файле
+    data: bytes
+
+def _letter_stats(data) -> Tuple[int, int]:
+    """(кириллических букв, акцентированных латинских букв) среди байтов 0xC0-0xFF."""
+    cyrillic = latin = 0
+    size = len(data)
+    for m in _LETTER_RUN.finditer(data):
+        start, end = m.span()
+        if end - start == 1 and ((start > 0 and data[start - 1] in _ASCII_LETTERS)
+                                 or (end < size and data[end] in _ASCII_LETTERS)):
+            latin += 1
+        else:
+            # Однобуквенные слова ("я", "в") - тоже кириллица
+            cyrillic += end - start
+    return cyrillic, latin
+
+def detect_encoding(data) -> EncodingGuess:
+    """Определяет кодировку по байтам (bytes, memoryview или mmap)."""
+    head = bytes(data[:4])
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return EncodingGuess(name, f"BOM {bom.hex()}", bom=True)
+    size = len(data)
+    chunks = range(0, size, DETECT_CHUNK_SIZE)
+    try:
+        decoder = codecs.getincrementaldecoder('utf-8')('strict')
+        for pos in chunks:
+            decoder.decode(data[pos:pos + DETECT_CHUNK_SIZE])
+        decoder.decode(b'', final=True)
+        return EncodingGuess('utf-8', "valid UTF-8")
+    except UnicodeDecodeError:
+        pass
+
+    # Старшие байты и те из них, что входят в корректные последовательности UTF-8
+    present = set()
+    high = utf8_bytes = 0
+    decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+    for pos in chunks:
+        chunk = data[pos:pos + DETECT_CHUNK_SIZE]
+        chunk_high = chunk.translate(None, _ASCII)
+        present.update(chunk_high)
+        high += len(chunk_high)
+        utf8_bytes += len(decoder.decode(chunk, pos + DETECT_CHUNK_SIZE >= size).encode('utf-8'))
+        utf8_bytes -= len(chunk) - len(chunk_high)
+    if utf8_bytes * 2 > high:
+        # Файл в основном UTF-8 с вкраплениями другой кодировки: строгое
+        # декодирование упадет, и decode_file покажет смещения вкраплений
+        return EncodingGuess('utf-8', f"mixed encoding: {high - utf8_bytes} of {high} "
+                                      f"non-ASCII bytes are not UTF-8", mixed=True)
+    candidates = [enc for enc in ('cp1251', 'cp1252') if not present & _UNDEFINED[enc]]
+    if not candidates:
+        return EncodingGuess('latin-1', "bytes undefined in both cp1251 and cp1252")
+    if len(candidates) == 1:
+        return EncodingGuess(candidates[0], f"only {candidates[0]} defines all bytes")
+
+    if not present & _LETTERS:
+        return EncodingGuess(DEFAULT_SINGLE_BYTE, "only punctuation-range bytes, identical in cp1251/cp1252")
+    cyrillic, latin = _letter_stats(data)
+    if cyrillic > latin:
+        return EncodingGuess('cp1251', f"{cyrillic} Cyrillic letter bytes vs {latin} Latin accents")
+    if latin > cyrillic:
+        return EncodingGuess('cp1252', f"{latin} Latin accented letters vs {cyrillic} Cyrillic letter bytes")
+    return EncodingGuess(DEFAULT_SINGLE_BYTE, f"{cyrillic} Cyrillic and {latin} Latin letter bytes, "
+                                              f"equally likely")
+
+def find_encoding_anomalies(data, encoding: str, limit: int = MAX_ANOMALIES) -> List[EncodingAnomaly]:
+    """
+    Ищет участки, выдающие смешение кодировок: недекодируемые байты для
+    выбранной кодировки и (для однобайтовых кодировок) корректные многобайтовые
+    последовательности UTF-8.
+    """
+    found: List[Tuple[int, int, str]] = []
+    pos = 0
+    size = len(data)
+    with memoryview(data) as view:
+        while pos < size and len(found) < limit:
+            try:
+                codecs.decode(view[pos:], encoding)
+                break
+            except UnicodeDecodeError as e:
+                start, end = pos + e.start, pos + e.end
+                if found and found[-1][1] == start:
+                    # Соседние недекодируемые байты - один участок
+                    found[-1] = (found[-1][0], end, 'invalid')
+                else:
+                    found.append((start, end, 'invalid'))
+                pos = end
+    if codecs.lookup(encoding).name not in ('utf-8', 'utf-8-sig', 'utf-16', 'utf-32'):
+        for m in _UTF8_RUN.finditer(data):
+            if len(found) >= limit:
+                break
+            found.append((m.start(), m.end(), 'utf8'))
+    found.sort()
+
+    # Номера строк считаются одним проходом по отсортированным смещениям
+    anomalies: List[EncodingAnomaly] = []
+    line, prev = 1, 0
+    for start, end, kind in found[:limit]:
+        line += data[prev:start].count(b'\n')
+        prev = start
+        anomalies.append(EncodingAnomaly(start, end - start, line, kind, bytes(data[start:end])))
+    return anomalies
+
+def read_bytes_mapped(filepath):
+    """Возвращает mmap файла только для чтения (b'' для пустого файла)."""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def check_file_encoding(filepath, limit: int = MAX_ANOMALIES) -> Tuple[EncodingGuess, List[EncodingAnomaly]]:
+    """Определенная кодировка файла и участки, которые ей не соответствуют."""
+    data = read_bytes_mapped(filepath)
+    try:
+        guess = detect_encoding(data)
+        return guess, find_encoding_anomalies(data, guess.encoding, limit)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def _guess_for(data, filepath, encoding: str) -> EncodingGuess:
+    if encoding != AUTO:
+        return EncodingGuess(encoding, "explicit")
+    guess = detect_encoding(data)
+    logger.info(f"Detected encoding {guess.encoding} for {filepath} ({guess.reason}).")
+    return guess
+
+def _decode_all(data, encoding: str) -> str:
+    """Декодирует байты одним вызовом; ошибка дополняется смещениями проблемных байтов."""
+    try:
+        return codecs.decode(data, encoding)
+    except UnicodeDecodeError as e:
+        anomalies = find_encoding_anomalies(data, encoding)
+        where = ', '.join(f"byte {a.offset} (line {a.line}): {a.data!r}" for a in anomalies[:5])
+        e.reason = f"{e.reason}; problem bytes: {where}"
+        raise
+
+def decode_file(filepath, encoding: str = AUTO) -> Tuple[str, EncodingGuess]:
+    """
+    Читает файл через mmap и декодирует одним вызовом. При encoding='auto'
+    кодировка определяется по тем же байтам.
+    """
+    data = read_bytes_mapped(filepath)
+    try:
+        guess = _guess_for(data, filepath, encoding)
+        return _decode_all(data, guess.encoding), guess
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def open_decoded(filepath, encoding: str = AUTO, newline: Optional[str] = None) -> io.StringIO:
+    """Текстовый поток над целиком декодированным файлом (для csv.reader и т.п.)."""
+    text, _ = decode_file(filepath, encoding)
+    return io.StringIO(text, newline=newline)
+
+class _MappedReader(io.RawIOBase):
+    """Бинарный поток над уже отображенными байтами; закрывает mmap вместе с собой."""
+
+    def __init__(self, data):
+        super().__init__()
+        self._data = data
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._data) - self._pos))
+        b[:n] = self._data[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._data)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        super().close()
+
+def open_mapped(filepath, encoding: str = AUTO, newline: Optional[str] = None):
+    """
+    Текстовый поток над mmap файла. Кодировка определяется и текст декодируется по
+    одному отображению: файл не открывается и не читается второй раз, а память не
+    зависит от его размера. Файл со смешанными кодировками декодируется целиком,
+    чтобы ошибка содержала смещения чужих байтов.
+    """
+    data = read_bytes_mapped(filepath)
+    try:
+        guess = _guess_for(data, filepath, encoding)
+        if guess.mixed:
+            return io.StringIO(_decode_all(data, guess.encoding), newline=newline)
+    except BaseException:
+        if isinstance(data, mmap.mmap):
+            data.close()
+        raise
+    return io.TextIOWrapper(io.BufferedReader(_MappedReader(data)), encoding=guess.encoding, newline=newline)
+
+def resolve_encoding(data, encoding: str) -> Tuple[str, int]:
+    """
+    Конкретная кодировка для побайтовой обработки (параллельный разбор) и длина BOM,
+    которую нужно пропустить в начале данных.
+    """
+    if encoding != AUTO:
+        return encoding, 0
+    guess = detect_encoding(data)
+    if guess.encoding == 'utf-8-sig':
+        return 'utf-8', len(codecs.BOM_UTF8)
+    return guess.encoding, 0
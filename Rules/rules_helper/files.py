@@ -0,0 +1,52 @@
+"""Кодировки по умолчанию и открытие файлов, заданных путем или готовым потоком."""
+import contextlib
+import os
+from typing import IO, Iterator, Optional, Union
+
+from .encoding import AUTO, open_mapped
+
+# 'auto' - кодировка CSV определяется по содержимому (BOM, UTF-8, cp1251/cp1252)
+CSV_ENCODING: str = AUTO
+JSON_ENCODING: str = 'utf-8'
+OUTPUT_CSV_ENCODING: str = 'utf-8'
+
+PathOrStream = Union[str, 'os.PathLike[str]', IO]
+
+def is_stream(obj) -> bool:
+    return hasattr(obj, 'read') or hasattr(obj, 'write')
+
+def describe(path_or_stream: PathOrStream) -> str:
+    """Имя файла для сообщений (у потоков - атрибут name, если есть)."""
+    if is_stream(path_or_stream):
+        return str(getattr(path_or_stream, 'name', '<stream>'))
+    return os.fspath(path_or_stream)
+
+@contextlib.contextmanager
+def open_text(path_or_stream: PathOrStream, mode: str, encoding: str,
+              newline: Optional[str] = None) -> Iterator[IO]:
+    """
+    Открывает путь как текстовый файл; переданный поток отдается как есть и не закрывается.
+    Для чтения с encoding='auto' кодировка определяется по mmap файла, и тот же
+    mmap декодируется потоком - файл читается один раз.
+    """
+    if is_stream(path_or_stream):
+        yield path_or_stream
+        return
+    if encoding == AUTO and 'r' in mode:
+        with open_mapped(path_or_stream, newline=newline) as f:
+            yield f
+        return
+    with open(path_or_stream, mode, encoding=encoding, newline=newline) as f:
+        yield f
+
+@contextlib.contextmanager
+def atomic_write(path: str, encoding: str, newline: Optional[str] = None) -> Iterator[IO]:
+    """Пишет во временный файл рядом с path и заменяет path только при успехе."""
+    tmp_path = os.fspath(path) + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding=encoding, newline=newline) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
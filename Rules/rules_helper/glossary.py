@@ -0,0 +1,244 @@
+"""
+Глоссарий: единый перевод названий фракций, товаров, объектов и т.п.
+
+Термины берутся из констант api/impl/campaign/ids/*.java (Factions.PIRATES =
+"pirates" -> "pirates", "luddic_church" -> "luddic church") и из файла
+глоссария, где переводчик задает утвержденные переводы. Перевод задается
+основой слова ("пират"), чтобы засчитывались все падежи ("пиратов", "пиратам").
+
+Все термины собираются в один автомат Ахо-Корасик, поэтому проверка идет
+одним проходом по тексту, сколько бы терминов ни было. Для каждой
+переведенной единицы (tm.iter_translatable_units) исходник прогоняется через
+автомат терминов, перевод - через автомат утвержденных основ; строка
+отмечается, если термин в исходнике есть, а ни одной его основы в переводе нет.
+
+Сравнение без учета регистра, дефисы не учитываются ("Tri-Tachyon" ==
+"tritachyon"), термин должен стоять целым словом (допускается английское
+окончание -s/-es), основа перевода - с начала слова.
+"""
+import json
+import logging
+import os
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from .files import JSON_ENCODING, atomic_write
+from .jsonio import iter_json_array
+from .tm import iter_translatable_units
+
+logger = logging.getLogger(__name__)
+
+GLOSSARY_VERSION: int = 1
+DEFAULT_IDS_DIR: str = os.path.join('..', 'api', 'impl', 'campaign', 'ids')
+GLOSSARY_FILE: str = 'glossary.json'
+# Классы ids, из которых берутся термины; в остальных (Tags, MemFlags, Stats) - служебные ключи
+SEED_CLASSES = ('Factions', 'Commodities', 'Entities', 'Industries')
+PLURAL_SUFFIXES = ('s', 'es')
+# TAG_* - теги рынков и товаров ("military", "expensive"), а не названия
+SKIPPED_CONSTANT_PREFIXES = ('TAG_',)
+
+_CONSTANT_PATTERN = re.compile(r'\bstatic\s+final\s+String\s+(\w+)\s*=\s*"([^"]*)"\s*;')
+_SPACE_PATTERN = re.compile(r"\s+")
+_LETTER_PATTERN = re.compile(r"[^\W\d_]")
+
+class TermIssue(NamedTuple):
+    row_number: int
+    key: str
+    column: str
+    term: str
+    expected: List[str]
+
+def normalize_term(text: str) -> str:
+    """Форма для сравнения: нижний регистр, ё -> е, без дефисов, _ и пробелы - один пробел."""
+    text = text.casefold().replace('ё', 'е').replace('-', '').replace('_', ' ')
+    return _SPACE_PATTERN.sub(' ', text).strip()
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum()
+
+class TermAutomaton:
+    """Автомат Ахо-Корасик над набором строк. find дает все вхождения за один проход по тексту."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str):
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(index)
+
+    def _link(self):
+        # Обход в ширину: ссылка неудачи ведет в самое длинное собственное суффикс-состояние
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(индекс строки, начало, конец) каждого вхождения."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                yield index, i + 1 - len(self.patterns[index]), i + 1
+
+def find_words(automaton: TermAutomaton, text: str, whole: bool) -> Set[int]:
+    """
+    Индексы строк автомата, стоящих в text с начала слова; с whole=True - еще и
+    до конца слова (или до окончания из PLURAL_SUFFIXES).
+    """
+    found = set()
+    for index, start, end in automaton.find(text):
+        if start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if whole and end < len(text) and _is_word_char(text[end]):
+            tail = next((s for s in PLURAL_SUFFIXES if text.startswith(s, end)), None)
+            if tail is None or (end + len(tail) < len(text) and _is_word_char(text[end + len(tail)])):
+                continue
+        found.add(index)
+    return found
+
+def read_id_constants(java_filepath: str) -> List[Tuple[str, str]]:
+    """Пары (имя константы, значение) строковых констант класса ids."""
+    with open(java_filepath, 'r', encoding='utf-8', errors='replace') as f:
+        return _CONSTANT_PATTERN.findall(f.read())
+
+def seed_terms(ids_dir: str = DEFAULT_IDS_DIR, classes: Iterable[str] = SEED_CLASSES) -> List[Dict[str, Any]]:
+    """Термины из констант классов ids (без перевода), по одному на нормализованное значение."""
+    terms: Dict[str, Dict[str, Any]] = {}
+    for class_name in classes:
+        for constant, value in read_id_constants(os.path.join(ids_dir, f"{class_name}.java")):
+            if constant.startswith(SKIPPED_CONSTANT_PREFIXES):
+                continue
+            term = normalize_term(value)
+            if _LETTER_PATTERN.search(term) and term not in terms:
+                terms[term] = {"term": term, "translations": [], "from": f"{class_name}.{constant}"}
+    return list(terms.values())
+
+def load_glossary(glossary_filepath: str) -> List[Dict[str, Any]]:
+    with open(glossary_filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != GLOSSARY_VERSION:
+        raise ValueError(f"{glossary_filepath}: unsupported glossary version {data.get('version')}.")
+    return data["terms"]
+
+def save_glossary(glossary_filepath: str, terms: List[Dict[str, Any]]):
+    with atomic_write(glossary_filepath, 'utf-8') as f:
+        json.dump({"version": GLOSSARY_VERSION, "terms": terms}, f, ensure_ascii=False, indent=1)
+
+class GlossaryChecker:
+    """Автоматы терминов и утвержденных основ перевода одного глоссария."""
+
+    def __init__(self, terms: Iterable[Dict[str, Any]]):
+        self.terms: List[str] = []
+        self.translations: List[List[str]] = []
+        variant_indices: Dict[str, int] = {}
+        self._expected: List[Set[int]] = []
+        for entry in terms:
+            term = normalize_term(entry["term"])
+            if not term:
+                continue
+            variants = [normalize_term(t) for t in entry.get("translations") or [] if t.strip()]
+            self.terms.append(term)
+            self.translations.append(entry.get("translations") or [])
+            self._expected.append({variant_indices.setdefault(v, len(variant_indices)) for v in variants})
+        self.approved = sum(1 for expected in self._expected if expected)
+        self.source_automaton = TermAutomaton(self.terms)
+        self.target_automaton = TermAutomaton(variant_indices)
+
+    def source_terms(self, text: str) -> Set[int]:
+        return find_words(self.source_automaton, normalize_term(text), whole=True)
+
+    def check_unit(self, source: str, target: str) -> List[int]:
+        """Индексы терминов из source, у которых в target нет ни одного утвержденного перевода."""
+        found = [t for t in self.source_terms(source) if self._expected[t]]
+        if not found:
+            return []
+        present = find_words(self.target_automaton, normalize_term(target), whole=False)
+        return sorted(t for t in found if not self._expected[t] & present)
+
+    def check_items(self, items: Iterable[Dict[str, Any]]) -> List[TermIssue]:
+        """Проверяет переведенные единицы JSON (непереведенные, где значение == исходник, пропускаются)."""
+        issues = []
+        for item in items:
+            for field, index, source, current in iter_translatable_units(item):
+                if current == source:
+                    continue
+                column = field if index is None else f"{field}:{index}"
+                for t in self.check_unit(source, current):
+                    issues.append(TermIssue(item.get("_row_number", 0), item.get("id", '').strip(), column,
+                                            self.terms[t], self.translations[t]))
+        return issues
+
+def glossary_seed(json_filepath: str, glossary_filepath: str, ids_dir: str = DEFAULT_IDS_DIR,
+                  classes: Iterable[str] = SEED_CLASSES, json_encoding: str = JSON_ENCODING) -> int:
+    """
+    Добавляет в глоссарий термины из ids, которые встречаются в исходном тексте
+    json_filepath. Уже записанные термины и их переводы не меняются; у всех
+    обновляется число вхождений "count". Возвращает число новых терминов.
+    """
+    try:
+        terms = load_glossary(glossary_filepath)
+    except FileNotFoundError:
+        terms = []
+    known = {normalize_term(entry["term"]) for entry in terms}
+    seeded = [entry for entry in seed_terms(ids_dir, classes) if entry["term"] not in known]
+    checker = GlossaryChecker(terms + seeded)
+    counts = [0] * len(checker.terms)
+    for item in iter_json_array(json_filepath, json_encoding):
+        for _, _, source, _ in iter_translatable_units(item):
+            for t in checker.source_terms(source):
+                counts[t] += 1
+    by_term = dict(zip(checker.terms, counts))
+    added = [entry for entry in seeded if by_term.get(entry["term"])]
+    for entry in terms + added:
+        entry["count"] = by_term.get(normalize_term(entry["term"]), 0)
+    save_glossary(glossary_filepath, terms + sorted(added, key=lambda e: -e["count"]))
+    logger.info(f"Glossary {glossary_filepath}: {len(added)} terms added from {ids_dir} "
+                f"({len(seeded) - len(added)} never used in the text), {len(terms) + len(added)} total.")
+    return len(added)
+
+def check_glossary(json_filepath: str, glossary_filepath: str,
+                   json_encoding: str = JSON_ENCODING) -> List[TermIssue]:
+    """Проверяет переведенный JSON по глоссарию и пишет найденное в лог."""
+    checker = GlossaryChecker(load_glossary(glossary_filepath))
+    logger.info(f"Checking {json_filepath} against {checker.approved} glossary terms with approved translations.")
+    issues = checker.check_items(iter_json_array(json_filepath, json_encoding))
+    name = os.path.basename(json_filepath)
+    for issue in issues:
+        logger.warning(f"{name}:{issue.row_number} [{issue.key}] {issue.column}: '{issue.term}' "
+                       f"not translated as {' / '.join(issue.expected)}")
+    if issues:
+        logger.warning(f"Glossary check found {len(issues)} problem(s).")
+    else:
+        logger.info("Glossary check passed.")
+    return issues
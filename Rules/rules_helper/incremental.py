@@ -0,0 +1,142 @@
+"""
+Инкрементальный экспорт.
+
+Индекс отпечатков хранит для каждой строки ключ (id + номер повтора), _row_number
+и хэш содержимого fields. По нему csv_to_json_delta выгружает только новые и
+измененные строки, а merge_delta возвращает уже переведенные строки на место.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .csvio import iter_csv_rows
+from .files import CSV_ENCODING, JSON_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter, iter_json_array
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_INDEX_VERSION: int = 1
+
+def fingerprint_fields(fields: List[str]) -> str:
+    """Хэш содержимого строки CSV (все поля, включая пустые)."""
+    data = '\x1f'.join(fields).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def iter_row_keys(items: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Отдает (ключ, объект) для каждой строки. Ключ - значение первой колонки (id,
+    для комментариев - сам текст комментария); повторяющиеся id получают суффикс
+    с номером повтора, чтобы ключ не зависел от сдвига _row_number.
+    """
+    seen: Dict[str, int] = {}
+    for item in items:
+        fields = item.get("fields") or ['']
+        base = fields[0].strip()
+        n = seen.get(base, 0) + 1
+        seen[base] = n
+        yield (base if n == 1 else f"{base}\x00{n}"), item
+
+def build_fingerprint_index(csv_filepath, encoding: str = CSV_ENCODING) -> Dict[str, List[Any]]:
+    """Строит индекс {ключ: [_row_number, хэш]} по CSV файлу."""
+    index = {}
+    for key, row_obj in iter_row_keys(iter_csv_rows(csv_filepath, encoding)):
+        index[key] = [row_obj["_row_number"], fingerprint_fields(row_obj["fields"])]
+    return index
+
+def load_fingerprint_index(index_filepath) -> Optional[Dict[str, List[Any]]]:
+    """Загружает индекс отпечатков; None, если файла нет или версия не совпадает."""
+    try:
+        with open(index_filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    if data.get("version") != FINGERPRINT_INDEX_VERSION:
+        logger.warning(f"Warning: Fingerprint index {index_filepath} has unsupported version, ignoring it.")
+        return None
+    return data["rows"]
+
+def save_fingerprint_index(index_filepath, index: Dict[str, List[Any]], source: str = ''):
+    """Атомарно сохраняет индекс отпечатков."""
+    with atomic_write(index_filepath, 'utf-8') as f:
+        json.dump({"version": FINGERPRINT_INDEX_VERSION, "source": source, "rows": index},
+                  f, ensure_ascii=False, separators=(',', ':'))
+
+def create_fingerprint_index(csv_filepath, index_filepath, encoding: str = CSV_ENCODING) -> int:
+    """Сохраняет индекс для CSV, которому соответствует текущий переведенный JSON."""
+    logger.info(f"Building fingerprint index for {csv_filepath}")
+    index = build_fingerprint_index(csv_filepath, encoding)
+    save_fingerprint_index(index_filepath, index, os.path.basename(csv_filepath))
+    logger.info(f"Fingerprint index written: {index_filepath} ({len(index)} rows).")
+    return len(index)
+
+def csv_to_json_delta(csv_filepath, delta_json_filepath, index_filepath,
+                      csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING) -> int:
+    """
+    Выгружает в JSON только строки, которых нет в индексе или чье содержимое
+    изменилось. Каждый объект дополнительно получает _key и _change ('new'/'changed').
+    Возвращает число выгруженных строк.
+    """
+    index = load_fingerprint_index(index_filepath)
+    if index is None:
+        logger.warning(f"Warning: No fingerprint index at {index_filepath}. All rows will be exported.")
+        index = {}
+    logger.info(f"Streaming changed rows of {csv_filepath} -> {delta_json_filepath}")
+    total = 0
+    with open(delta_json_filepath, 'w', encoding=json_encoding) as jsonfile:
+        writer = JsonArrayWriter(jsonfile)
+        for key, row_obj in iter_row_keys(iter_csv_rows(csv_filepath, csv_encoding)):
+            total += 1
+            known = index.get(key)
+            if known is not None and known[1] == fingerprint_fields(row_obj["fields"]):
+                continue
+            row_obj["_key"] = key
+            row_obj["_change"] = "new" if known is None else "changed"
+            writer.write(row_obj)
+        writer.close()
+    logger.info(f"Delta export successful. {writer.count} of {total} rows are new or changed.")
+    return writer.count
+
+def merge_delta(csv_filepath, json_filepath, delta_json_filepath, index_filepath,
+                csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING) -> Dict[str, int]:
+    """
+    Собирает полный JSON для нового CSV: неизмененные строки берутся из уже
+    переведенного json_filepath, новые и измененные - из переведенного delta JSON.
+    JSON и индекс отпечатков перезаписываются атомарно. Возвращает статистику.
+    """
+    index = load_fingerprint_index(index_filepath)
+    if index is None:
+        raise FileNotFoundError(f"Fingerprint index not found at {index_filepath}. Run 'fingerprint' first.")
+    translated_by_row = {item.get("_row_number"): item for item in iter_json_array(json_filepath, json_encoding)}
+    delta_by_key = {item["_key"]: item for item in iter_json_array(delta_json_filepath, json_encoding)
+                    if "_key" in item}
+
+    logger.info(f"Merging {delta_json_filepath} into {json_filepath} for {csv_filepath}")
+    new_index = {}
+    stats = {"kept": 0, "delta": 0, "untranslated": 0}
+    with atomic_write(json_filepath, json_encoding) as jsonfile:
+        writer = JsonArrayWriter(jsonfile)
+        for key, row_obj in iter_row_keys(iter_csv_rows(csv_filepath, csv_encoding)):
+            fingerprint = fingerprint_fields(row_obj["fields"])
+            new_index[key] = [row_obj["_row_number"], fingerprint]
+            known = index.get(key)
+            item = delta_by_key.get(key)
+            if item is not None:
+                item = {k: v for k, v in item.items() if k not in ("_key", "_change")}
+                stats["delta"] += 1
+            elif known is not None and known[1] == fingerprint and known[0] in translated_by_row:
+                item = translated_by_row[known[0]]
+                stats["kept"] += 1
+            else:
+                logger.warning(f"Warning: Row {row_obj['_row_number']} ({key!r}) changed but is missing "
+                               f"from delta. Keeping source text.")
+                item = row_obj
+                stats["untranslated"] += 1
+            item["_row_number"] = row_obj["_row_number"]
+            writer.write(item)
+        writer.close()
+    save_fingerprint_index(index_filepath, new_index, os.path.basename(csv_filepath))
+    logger.info(f"Merge successful. {stats['kept']} rows kept, {stats['delta']} taken from delta, "
+                f"{stats['untranslated']} left untranslated.")
+    return stats
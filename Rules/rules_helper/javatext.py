@@ -0,0 +1,197 @@
+"""
+Видимый игроку текст в исходниках Java (api/**/*.java).
+
+Кроме rules.csv, интерфейс игры пишет текст прямо из кода: tooltip.addPara("..."),
+addTitle, addSectionHeading, options.addOption и т.п. Строковые литералы,
+переданные этим методам напрямую, выносятся в JSON того же вида, что
+csv_to_json (колонки DEFAULT_HEADER), так что с ним работают tm-fill, mt,
+glossary-check, split и db-import:
+
+    id      - путь:строка:столбец литерала
+    trigger - имя метода (addPara)
+    text    - литерал как есть, без разбора escape-последовательностей
+    notes   - номер аргумента ("arg 2" - выделение %s у addPara)
+
+Перед литералами каждого файла идет строка-комментарий "# путь", поэтому split
+не разрывает файл между частями.
+
+Файлы разбираются на пуле процессов. Результат по каждому файлу кэшируется по
+пути, размеру и mtime; если mtime изменился, а хэш содержимого нет, файл не
+разбирается заново.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .csvio import DEFAULT_HEADER, make_row_object
+from .encoding import AUTO, resolve_encoding
+from .files import JSON_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter
+
+logger = logging.getLogger(__name__)
+
+JAVA_TEXT_CACHE_VERSION: int = 1
+DEFAULT_API_DIR: str = os.path.join('..', 'api')
+JAVA_TEXT_FILE: str = 'java_strings_for_translation.json'
+JAVA_TEXT_CACHE_FILE: str = 'java_strings_cache.json'
+POOL_CHUNK_FILES: int = 16
+# Методы с текстом и номера аргументов, которые текстом не являются (data/id опции)
+DISPLAY_METHODS: Dict[str, frozenset] = {
+    'addPara': frozenset(),
+    'addParaWithMarkup': frozenset(),
+    'addTitle': frozenset(),
+    'addSectionHeading': frozenset(),
+    'setTitle': frozenset(),
+    'addOption': frozenset((1,)),
+    'addButton': frozenset((1,)),
+}
+
+_JAVA_TOKEN = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+                         r'|\.(' + '|'.join(DISPLAY_METHODS) + r')\s*\(|[(),]', re.S)
+_LETTER_PATTERN = re.compile(r"[^\W\d_]")
+# Переменные формата (%s, %d) буквами не считаются
+_FORMAT_PATTERN = re.compile(r"%(?:\d+\$)?[-+#0]*\d*(?:\.\d+)?[a-zA-Z]")
+
+# (строка, столбец, метод, аргумент, текст)
+JavaUnit = Tuple[int, int, str, int, str]
+
+def _has_text(literal: str) -> bool:
+    return bool(_LETTER_PATTERN.search(_FORMAT_PATTERN.sub('', literal)))
+
+def extract_java_strings(source: str) -> List[JavaUnit]:
+    """
+    Литералы, переданные методам DISPLAY_METHODS непосредственно аргументом
+    (или частью конкатенации); литералы во вложенных вызовах не берутся.
+    """
+    units: List[JavaUnit] = []
+    # Открытые вызовы: [глубина скобок внутри вызова, метод, номер аргумента]
+    calls: List[List[Any]] = []
+    depth = 0
+    line, line_start, scanned = 1, 0, 0
+    for match in _JAVA_TOKEN.finditer(source):
+        token = match.group()
+        first = token[0]
+        if first == '/' or first == "'":
+            continue
+        if first == '.':
+            depth += 1
+            calls.append([depth, match.group(1), 0])
+        elif first == '(':
+            depth += 1
+        elif first == ')':
+            if calls and calls[-1][0] == depth:
+                calls.pop()
+            depth -= 1
+        elif first == ',':
+            if calls and calls[-1][0] == depth:
+                calls[-1][2] += 1
+        elif calls and calls[-1][0] == depth:
+            method, arg = calls[-1][1], calls[-1][2]
+            if arg in DISPLAY_METHODS[method] or not _has_text(token[1:-1]):
+                continue
+            start = match.start()
+            newlines = source.count('\n', scanned, start)
+            if newlines:
+                line += newlines
+                line_start = source.rfind('\n', scanned, start) + 1
+            scanned = start
+            units.append((line, start - line_start + 1, method, arg, token[1:-1]))
+    return units
+
+def _scan_file_task(args) -> Tuple[str, str, Optional[List[JavaUnit]]]:
+    """Задача пула: (путь, хэш, литералы или None, если хэш совпал с кэшем)."""
+    filepath, relpath, cached_hash = args
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == cached_hash:
+        return relpath, digest, None
+    encoding, bom_length = resolve_encoding(data, AUTO)
+    return relpath, digest, extract_java_strings(data[bom_length:].decode(encoding, errors='replace'))
+
+def list_java_files(api_dir: str) -> List[Tuple[str, str]]:
+    """(путь, путь относительно api_dir через /) всех .java по порядку."""
+    files = []
+    for root, dirs, names in os.walk(api_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith('.java'):
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, api_dir).replace(os.sep, '/')))
+    return files
+
+def load_java_text_cache(cache_filepath: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if not cache_filepath:
+        return {}
+    try:
+        with open(cache_filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if data.get("version") != JAVA_TEXT_CACHE_VERSION:
+        return {}
+    return data["files"]
+
+def scan_java_tree(api_dir: str = DEFAULT_API_DIR, cache_filepath: Optional[str] = JAVA_TEXT_CACHE_FILE,
+                   workers: Optional[int] = None) -> Dict[str, List[JavaUnit]]:
+    """
+    {относительный путь: литералы} для всех .java под api_dir. Файлы с тем же
+    размером и mtime берутся из кэша без чтения, остальные читаются на пуле.
+    """
+    files = list_java_files(api_dir)
+    if not files:
+        raise FileNotFoundError(f"No .java files found under {api_dir}.")
+    cache = load_java_text_cache(cache_filepath)
+    entries: Dict[str, Dict[str, Any]] = {}
+    tasks = []
+    for path, relpath in files:
+        st = os.stat(path)
+        cached = cache.get(relpath)
+        stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        if cached is not None and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            entries[relpath] = cached
+        else:
+            entries[relpath] = dict(cached or {}, **stamp)
+            tasks.append((path, relpath, cached["hash"] if cached else None))
+
+    changed = 0
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for relpath, digest, units in executor.map(_scan_file_task, tasks, chunksize=POOL_CHUNK_FILES):
+                entry = entries[relpath]
+                entry["hash"] = digest
+                if units is not None:
+                    entry["units"] = units
+                    changed += 1
+    logger.info(f"Java sources: {len(files)} files, {len(files) - len(tasks)} unchanged by mtime, "
+                f"{len(tasks) - changed} touched but same content, {changed} parsed.")
+    if cache_filepath and (tasks or len(cache) != len(entries)):
+        with atomic_write(cache_filepath, 'utf-8') as f:
+            json.dump({"version": JAVA_TEXT_CACHE_VERSION, "files": entries}, f, ensure_ascii=False)
+    return {relpath: [tuple(unit) for unit in entry["units"]] for relpath, entry in entries.items()}
+
+def java_strings_to_json(api_dir: str = DEFAULT_API_DIR, json_filepath: str = JAVA_TEXT_FILE,
+                         cache_filepath: Optional[str] = JAVA_TEXT_CACHE_FILE, workers: Optional[int] = None,
+                         json_encoding: str = JSON_ENCODING) -> int:
+    """Пишет литералы всех файлов в JSON для перевода. Возвращает число литералов."""
+    found = scan_java_tree(api_dir, cache_filepath, workers)
+    width = len(DEFAULT_HEADER)
+    total = 0
+    with atomic_write(json_filepath, json_encoding) as f:
+        writer = JsonArrayWriter(f)
+        for relpath, units in found.items():
+            if not units:
+                continue
+            writer.write(make_row_object(DEFAULT_HEADER, [f"# {relpath}"] + [''] * (width - 1), writer.count + 2))
+            for line, column, method, arg, text in units:
+                fields = [f"{relpath}:{line}:{column}", method, '', '', text, '', f"arg {arg}"]
+                writer.write(make_row_object(DEFAULT_HEADER, fields, writer.count + 2))
+            total += len(units)
+        writer.close()
+    files = sum(1 for units in found.values() if units)
+    logger.info(f"Java strings written: {json_filepath} ({total} strings from {files} files).")
+    return total
@@ -0,0 +1,101 @@
+"""Потоковое чтение и запись JSON-массива строк в формате json.dump(..., indent=2)."""
+import json
+from typing import Any, Iterator
+
+from .files import JSON_ENCODING, PathOrStream, open_text
+
+JSON_READ_CHUNK_SIZE: int = 64 * 1024
+
+def iter_json_array(json_source: PathOrStream, encoding: str = JSON_ENCODING,
+                    chunk_size: int = JSON_READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Инкрементально читает JSON-массив верхнего уровня и отдает его элементы по одному.
+    В памяти держится только текущий элемент и кусок непрочитанного текста.
+    """
+    decoder = json.JSONDecoder()
+    with open_text(json_source, 'r', encoding) as jsonfile:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = jsonfile.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> bool:
+            # Пропускает пробелы; False, если файл закончился
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(buf):
+                    return True
+                if not fill():
+                    return False
+
+        if not skip_ws() or buf[pos] != '[':
+            raise json.JSONDecodeError("Expected '[' at start of JSON array", buf, pos)
+        pos += 1
+        expect_value = True
+        first = True
+        while True:
+            if not skip_ws():
+                raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+            ch = buf[pos]
+            if ch == ']' and (first or not expect_value):
+                pos += 1
+                break
+            if not expect_value:
+                if ch != ',':
+                    raise json.JSONDecodeError("Expected ',' or ']'", buf, pos)
+                pos += 1
+                expect_value = True
+                continue
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # Число на краю буфера могло быть обрезано - дочитываем
+                    if end < len(buf) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    value, end = decoder.raw_decode(buf, pos)
+                    break
+            pos = end
+            first = False
+            expect_value = False
+            yield value
+
+def write_json_array_item(jsonfile, item: Any, index: int):
+    """Пишет очередной элемент массива в том же виде, что дает json.dump(..., indent=2)."""
+    text = json.dumps(item, ensure_ascii=False, indent=2)
+    jsonfile.write('[\n  ' if index == 0 else ',\n  ')
+    jsonfile.write(text.replace('\n', '\n  '))
+
+def finish_json_array(jsonfile, count: int):
+    """Закрывает массив, начатый write_json_array_item."""
+    jsonfile.write('\n]' if count else '[]')
+
+class JsonArrayWriter:
+    """Обертка над write_json_array_item/finish_json_array, считающая элементы."""
+
+    def __init__(self, jsonfile):
+        self.jsonfile = jsonfile
+        self.count = 0
+
+    def write(self, item: Any):
+        write_json_array_item(self.jsonfile, item, self.count)
+        self.count += 1
+
+    def close(self):
+        finish_json_array(self.jsonfile, self.count)
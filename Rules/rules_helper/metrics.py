@@ -0,0 +1,250 @@
+"""
+Метрики этапов конвертации и профилирование.
+
+Функции конвертации оборачивают свои этапы (чтение CSV, запись JSON и т.д.)
+в METRICS.stage(...): для этапа копятся время, число строк, байты на входе и
+выходе и число строк по типам (comment/empty_separator/data). Замер идет на
+уровне этапа, а не строки, поэтому почти ничего не стоит и включен всегда.
+Пик памяти этапа известен только под tracemalloc (--profile tracemalloc);
+максимальный RSS процесса - показатель всего процесса, а не этапа, и
+выгружается отдельно. Накопленное выгружается в JSON или текстовый формат
+Prometheus.
+
+profile_stages разбирает один CSV по отдельным шагам (декодирование,
+csv.reader, parse_options_string, сборка объектов, json.dumps), чтобы было
+видно, какой из них тормозит на конкретном файле. run_profiled выполняет
+функцию под cProfile или tracemalloc и пишет текстовый отчет.
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .csvio import DEFAULT_HEADER, make_row_object
+from .encoding import resolve_encoding
+from .files import CSV_ENCODING, PathOrStream, atomic_write, is_stream
+from .options import parse_options_string
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_PREFIX: str = 'rules_helper'
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+PROFILE_TOP: int = 40
+
+def file_size(path_or_stream: PathOrStream) -> int:
+    """Размер файла в байтах (0 для потоков и несуществующих путей)."""
+    if is_stream(path_or_stream):
+        return 0
+    try:
+        return os.path.getsize(path_or_stream)
+    except OSError:
+        return 0
+
+def _traced_peak() -> Optional[int]:
+    """Пик памяти с последнего reset_peak по tracemalloc; None, если он выключен."""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    return None
+
+def process_max_rss() -> int:
+    """Максимальный RSS процесса за все время его работы (0, если неизвестен)."""
+    if resource is not None:
+        # ru_maxrss в килобайтах на Linux и в байтах на macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+    return 0
+
+def _max_peak(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    return a if b is None else max(a, b)
+
+class StageMetrics:
+    """Накопленные показатели одного этапа (по всем его вызовам)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # None - этап шел без tracemalloc
+        self.peak_memory: Optional[int] = None
+        self.row_types: Counter = Counter()
+
+    def count_row(self, row_obj: Dict[str, Any]):
+        self.row_types[row_obj.get("_type", "unknown")] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / self.seconds, 1) if self.seconds else 0.0,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_memory_bytes": self.peak_memory,
+            "row_types": dict(sorted(self.row_types.items())),
+        }
+
+class MetricsRegistry:
+    """Набор этапов по именам. Один общий экземпляр - METRICS."""
+
+    def __init__(self):
+        self.stages: Dict[str, StageMetrics] = {}
+        # Пики вложенных этапов для каждого открытого этапа: их reset_peak сбивает замер внешнего
+        self._inner_peaks: List[Optional[int]] = []
+
+    def reset(self):
+        self.stages.clear()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, bytes_in: int = 0) -> Iterator[StageMetrics]:
+        """
+        Замеряет этап. Внутри блока можно дописать rows, bytes_out и типы строк
+        в отдаваемый объект; время и пик памяти добавляются при выходе.
+        """
+        current = StageMetrics()
+        current.bytes_in = bytes_in
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._inner_peaks.append(None)
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds = time.perf_counter() - start
+            current.peak_memory = _max_peak(_traced_peak(), self._inner_peaks.pop())
+            if self._inner_peaks:
+                self._inner_peaks[-1] = _max_peak(self._inner_peaks[-1], current.peak_memory)
+            total = self.stages.setdefault(name, StageMetrics())
+            total.calls += 1
+            total.seconds += current.seconds
+            total.rows += current.rows
+            total.bytes_in += current.bytes_in
+            total.bytes_out += current.bytes_out
+            total.peak_memory = _max_peak(total.peak_memory, current.peak_memory)
+            total.row_types.update(current.row_types)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"process": {"max_rss_bytes": process_max_rss()},
+                "stages": {name: stage.to_dict() for name, stage in self.stages.items()}}
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus."""
+        gauges = (
+            ("stage_calls_total", "counter", "Number of times the stage ran", lambda s: s.calls),
+            ("stage_seconds_total", "counter", "Wall time spent in the stage", lambda s: round(s.seconds, 6)),
+            ("stage_rows_total", "counter", "Rows processed by the stage", lambda s: s.rows),
+            ("stage_bytes_in_total", "counter", "Bytes read by the stage", lambda s: s.bytes_in),
+            ("stage_bytes_out_total", "counter", "Bytes written by the stage", lambda s: s.bytes_out),
+            ("stage_peak_memory_bytes", "gauge", "Peak traced memory during the stage (tracemalloc only)",
+             lambda s: s.peak_memory),
+        )
+        lines = [
+            f"# HELP {METRICS_PREFIX}_process_max_rss_bytes Maximum resident set size of the whole process",
+            f"# TYPE {METRICS_PREFIX}_process_max_rss_bytes gauge",
+            f"{METRICS_PREFIX}_process_max_rss_bytes {process_max_rss()}",
+        ]
+        for metric, kind, help_text, value in gauges:
+            lines.append(f"# HELP {METRICS_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{metric} {kind}")
+            for name, stage in self.stages.items():
+                if value(stage) is not None:
+                    lines.append(f'{METRICS_PREFIX}_{metric}{{stage="{name}"}} {value(stage)}')
+        lines.append(f"# HELP {METRICS_PREFIX}_stage_row_types_total Rows by type")
+        lines.append(f"# TYPE {METRICS_PREFIX}_stage_row_types_total counter")
+        for name, stage in self.stages.items():
+            for row_type, count in sorted(stage.row_types.items()):
+                lines.append(f'{METRICS_PREFIX}_stage_row_types_total{{stage="{name}",type="{row_type}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, filepath: str, fmt: Optional[str] = None):
+        """Пишет метрики в файл: 'prometheus' для .prom/.txt, иначе JSON."""
+        if fmt is None:
+            fmt = 'prometheus' if filepath.endswith(('.prom', '.txt')) else 'json'
+        with atomic_write(filepath, 'utf-8') as f:
+            if fmt == 'prometheus':
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+                f.write('\n')
+
+METRICS = MetricsRegistry()
+
+def profile_stages(csv_filepath: str, encoding: str = CSV_ENCODING,
+                   registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """
+    Разбирает CSV по шагам, каждый отдельным этапом: decode, csv_reader,
+    parse_options, make_row_objects, json_dumps. Весь файл держится в памяти.
+    """
+    registry = registry or MetricsRegistry()
+    with open(csv_filepath, 'rb') as f:
+        data = f.read()
+    with registry.stage('decode', bytes_in=len(data)) as st:
+        enc, bom_length = resolve_encoding(data, encoding)
+        text = data[bom_length:].decode(enc)
+        st.bytes_out = len(text)
+    del data
+    with registry.stage('csv_reader', bytes_in=len(text)) as st:
+        records = list(csv.reader(io.StringIO(text, newline='')))
+        st.rows = len(records)
+    del text
+    header, records = records[0], records[1:]
+    options_idx = DEFAULT_HEADER.index('options')
+    with registry.stage('parse_options') as st:
+        for row in records:
+            if len(row) > options_idx and row[options_idx]:
+                st.bytes_in += len(row[options_idx])
+                parse_options_string(row[options_idx])
+                st.rows += 1
+    with registry.stage('make_row_objects') as st:
+        rows = [make_row_object(header, row, i + 2) for i, row in enumerate(records)]
+        st.rows = len(rows)
+        for row_obj in rows:
+            st.count_row(row_obj)
+    with registry.stage('json_dumps') as st:
+        st.rows = len(rows)
+        st.bytes_out = len(json.dumps(rows, ensure_ascii=False, indent=2))
+    return registry
+
+def run_profiled(func: Callable[[], Any], mode: str, report_filepath: str) -> Any:
+    """Выполняет func под cProfile или tracemalloc и пишет текстовый отчет. Возвращает результат func."""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(PROFILE_MODES)}.")
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            with atomic_write(report_filepath, 'utf-8') as f:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+                stats.sort_stats('tottime').print_stats(PROFILE_TOP)
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(10)
+    try:
+        return func()
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+        with atomic_write(report_filepath, 'utf-8') as f:
+            f.write(f"Peak traced memory: {peak / 1e6:.1f} MB, still allocated: {current / 1e6:.1f} MB\n\n")
+            f.write(f"Top {PROFILE_TOP} allocation sites still alive at the end:\n")
+            for stat in snapshot.statistics('lineno')[:PROFILE_TOP]:
+                f.write(f"{stat}\n")
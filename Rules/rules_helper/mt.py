@@ -0,0 +1,302 @@
+"""
+Машинный перевод JSON для перевода через локальный MT-сервер.
+
+Непереведенные единицы (text, options[].text и script_strings - см.
+tm.iter_translatable_units) собираются без повторов, упаковываются в пакеты
+ограниченного размера и отправляются параллельно через asyncio с ограничением
+числа одновременных запросов и частоты. Готовые пакеты сразу дописываются в
+кэш (JSON Lines, ключ - tm_hash исходника), поэтому прерванный прогон
+продолжается с места остановки, а повторный не делает запросов вовсе.
+Результат пишется в тот же формат JSON, который читает json_to_csv.
+
+Токены ($переменные, %s, разделители \\nOR\\n - validate.find_tokens) перед
+отправкой заменяются заглушками {0}, {1}, ..., а в ответе подставляются
+обратно. Перевод, в котором заглушки потерялись, размножились или токены после
+подстановки не совпали с исходником, отбрасывается: строка остается
+непереведенной и в кэш не попадает.
+
+Сервер по умолчанию - HTTP API в стиле LibreTranslate: POST {"q": [...],
+"source", "target", "format": "text"} -> {"translatedText": [...]}. Другой
+сервер подключается подклассом MTBackend.
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .files import JSON_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter, iter_json_array
+from .tm import iter_translatable_units, set_unit_value, tm_hash
+from .validate import find_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+MT_CACHE_FILE: str = 'mt_cache.jsonl'
+DEFAULT_MT_URL: str = 'http://localhost:5000/translate'
+DEFAULT_SOURCE_LANG: str = 'en'
+DEFAULT_TARGET_LANG: str = 'ru'
+DEFAULT_BATCH_CHARS: int = 4000
+DEFAULT_BATCH_ITEMS: int = 32
+DEFAULT_CONCURRENCY: int = 4
+DEFAULT_RATE: float = 10.0
+MT_RETRIES: int = 3
+# Пауза перед первым повтором, дальше удваивается
+MT_RETRY_DELAY: float = 1.0
+# HTTP-коды, при которых запрос имеет смысл повторить
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Заглушка токена вместе с пробелами вокруг (разделителю вариантов они не нужны)
+_PLACEHOLDER_PATTERN = re.compile(r"([ \t\r\n]*)\{(\d+)\}([ \t\r\n]*)")
+
+class MTError(RuntimeError):
+    pass
+
+def mask_tokens(text: str) -> Tuple[str, List[str]]:
+    """
+    Заменяет токены заглушками {0}, {1}, ... Возвращает (текст для MT, токены).
+    Разделитель вариантов остается на отдельной строке, чтобы MT не склеил варианты.
+    """
+    tokens: List[str] = []
+    parts = []
+    end = 0
+    for match in find_tokens(text):
+        token = match.group()
+        placeholder = f"{{{len(tokens)}}}"
+        parts.append(text[end:match.start()])
+        parts.append(f"\n{placeholder}\n" if token[0] in '\r\n' else placeholder)
+        tokens.append(token)
+        end = match.end()
+    if not tokens:
+        return text, tokens
+    parts.append(text[end:])
+    return ''.join(parts), tokens
+
+def unmask_tokens(translated: str, tokens: List[str], source: str) -> Optional[str]:
+    """
+    Подставляет токены на место заглушек. None, если каждая заглушка не
+    встретилась ровно один раз или токены результата не совпали с source.
+    """
+    if not tokens:
+        return translated if tokenize(translated) == tokenize(source) else None
+    seen = set()
+
+    def replace(match: re.Match) -> str:
+        index = int(match.group(2))
+        if index >= len(tokens) or index in seen:
+            raise ValueError(index)
+        seen.add(index)
+        token = tokens[index]
+        if token[0] in '\r\n':
+            return token
+        return match.group(1) + token + match.group(3)
+
+    try:
+        restored = _PLACEHOLDER_PATTERN.sub(replace, translated)
+    except ValueError:
+        return None
+    if len(seen) != len(tokens) or tokenize(restored) != tokenize(source):
+        return None
+    return restored
+
+class MTBackend(abc.ABC):
+    """Интерфейс сервера перевода: один пакет строк -> список переводов того же размера."""
+
+    @abc.abstractmethod
+    async def translate(self, texts: List[str]) -> List[str]:
+        ...
+
+class HttpBackend(MTBackend):
+    """JSON API в стиле LibreTranslate. Запрос выполняется в потоке, чтобы не блокировать цикл событий."""
+
+    def __init__(self, url: str = DEFAULT_MT_URL, source_lang: str = DEFAULT_SOURCE_LANG,
+                 target_lang: str = DEFAULT_TARGET_LANG, api_key: Optional[str] = None, timeout: float = 60.0):
+        self.url = url
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _post(self, texts: List[str]) -> List[str]:
+        payload = {"q": texts, "source": self.source_lang, "target": self.target_lang, "format": "text"}
+        if self.api_key:
+            payload["api_key"] = self.api_key
+        request = urllib.request.Request(self.url, data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                                         headers={"Content-Type": "application/json"}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        translated = data.get("translatedText") if isinstance(data, dict) else None
+        if isinstance(translated, str):
+            translated = [translated]
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            raise MTError(f"MT server returned {type(translated).__name__} for a batch of {len(texts)} strings.")
+        return translated
+
+    async def translate(self, texts: List[str]) -> List[str]:
+        return await asyncio.to_thread(self._post, texts)
+
+class RateLimiter:
+    """Не больше rate запросов в секунду: запросы разносятся по времени равномерно."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class MTCache:
+    """Кэш машинного перевода: tm_hash исходника -> перевод, файл только дописывается."""
+
+    def __init__(self, filepath: Optional[str] = MT_CACHE_FILE):
+        self.filepath = filepath
+        self.entries: Dict[str, str] = {}
+        if filepath and os.path.exists(filepath):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Оборванная последняя строка после прерванного прогона
+                        logger.warning(f"Warning: skipping damaged line {line_no} of {filepath}.")
+                        continue
+                    self.entries[entry["hash"]] = entry["target"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, source: str) -> Optional[str]:
+        return self.entries.get(tm_hash(source))
+
+    def add_batch(self, sources: List[str], targets: List[str]):
+        lines = []
+        for source, target in zip(sources, targets):
+            key = tm_hash(source)
+            self.entries[key] = target
+            lines.append(json.dumps({"hash": key, "source": source, "target": target}, ensure_ascii=False) + '\n')
+        if self.filepath:
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+
+def make_batches(texts: List[str], max_chars: int = DEFAULT_BATCH_CHARS,
+                 max_items: int = DEFAULT_BATCH_ITEMS) -> Iterator[List[str]]:
+    """Пакеты по порядку: не больше max_items строк и max_chars символов (длинная строка - отдельно)."""
+    batch: List[str] = []
+    size = 0
+    for text in texts:
+        if batch and (len(batch) >= max_items or size + len(text) > max_chars):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        yield batch
+
+def collect_untranslated(json_filepath, json_encoding: str = JSON_ENCODING) -> Dict[str, str]:
+    """Уникальные непереведенные исходники {tm_hash: текст} в порядке первого появления."""
+    unique: Dict[str, str] = {}
+    for item in iter_json_array(json_filepath, json_encoding):
+        for _, _, source, current in iter_translatable_units(item):
+            if current == source:
+                unique.setdefault(tm_hash(source), source)
+    return unique
+
+async def translate_batches(texts: List[str], backend: MTBackend, cache: MTCache,
+                            concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                            max_chars: int = DEFAULT_BATCH_CHARS,
+                            max_items: int = DEFAULT_BATCH_ITEMS) -> Dict[str, int]:
+    """
+    Переводит строки пакетами и складывает результаты в кэш. Возвращает
+    статистику; rejected - переводы, отброшенные из-за потерянных токенов.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    stats = {"batches": 0, "translated": 0, "failed": 0, "rejected": 0}
+
+    async def run(batch: List[str]):
+        masked = [mask_tokens(source) for source in batch]
+        async with semaphore:
+            for attempt in range(MT_RETRIES + 1):
+                await limiter.wait()
+                try:
+                    targets = await backend.translate([text for text, _ in masked])
+                    break
+                except urllib.error.HTTPError as e:
+                    error = f"HTTP {e.code}"
+                    retry = e.code in _RETRY_STATUSES
+                except (urllib.error.URLError, OSError, asyncio.TimeoutError) as e:
+                    error, retry = str(e), True
+                except (MTError, ValueError) as e:
+                    error, retry = str(e), False
+                if not retry or attempt == MT_RETRIES:
+                    logger.warning(f"Warning: MT batch of {len(batch)} strings failed: {error}")
+                    stats["failed"] += len(batch)
+                    return
+                await asyncio.sleep(MT_RETRY_DELAY * 2 ** attempt)
+        sources, restored = [], []
+        for source, (_, tokens), target in zip(batch, masked, targets):
+            target = unmask_tokens(target, tokens, source)
+            if target is None:
+                logger.warning(f"Warning: MT result for {source[:60]!r} lost or changed tokens, discarded.")
+                stats["rejected"] += 1
+                continue
+            sources.append(source)
+            restored.append(target)
+        cache.add_batch(sources, restored)
+        stats["batches"] += 1
+        stats["translated"] += len(sources)
+        if stats["batches"] % 10 == 0:
+            logger.info(f"MT progress: {stats['translated']}/{len(texts)} strings.")
+
+    await asyncio.gather(*(run(batch) for batch in make_batches(texts, max_chars, max_items)))
+    return stats
+
+def mt_translate(json_filepath, output_json_filepath, backend: Optional[MTBackend] = None,
+                 cache_filepath: Optional[str] = MT_CACHE_FILE, concurrency: int = DEFAULT_CONCURRENCY,
+                 rate: float = DEFAULT_RATE, max_chars: int = DEFAULT_BATCH_CHARS,
+                 max_items: int = DEFAULT_BATCH_ITEMS, json_encoding: str = JSON_ENCODING) -> Dict[str, int]:
+    """
+    Машинный перевод непереведенных единиц JSON. Строки из кэша не отправляются;
+    неудавшиеся пакеты остаются непереведенными и уйдут при следующем запуске.
+    """
+    backend = backend or HttpBackend()
+    cache = MTCache(cache_filepath)
+    unique = collect_untranslated(json_filepath, json_encoding)
+    pending = [source for source in unique.values() if cache.get(source) is None]
+    logger.info(f"Machine translation: {len(unique)} unique untranslated strings, "
+                f"{len(unique) - len(pending)} cached, {len(pending)} to send.")
+    stats = {"batches": 0, "translated": 0, "failed": 0, "rejected": 0}
+    if pending:
+        stats = asyncio.run(translate_batches(pending, backend, cache, concurrency, rate, max_chars, max_items))
+
+    stats["filled"] = 0
+    with atomic_write(output_json_filepath, json_encoding) as jsonfile:
+        writer = JsonArrayWriter(jsonfile)
+        for item in iter_json_array(json_filepath, json_encoding):
+            for field, option_index, source, current in iter_translatable_units(item):
+                if current != source:
+                    continue
+                target = cache.get(source)
+                if target is not None:
+                    set_unit_value(item, field, option_index, target)
+                    stats["filled"] += 1
+            writer.write(item)
+        writer.close()
+    logger.info(f"Machine translation finished. {stats['translated']} strings translated in {stats['batches']} "
+                f"batches, {stats['filled']} units filled, {stats['failed']} failed, "
+                f"{stats['rejected']} rejected for broken tokens.")
+    if stats["failed"]:
+        logger.warning(f"Warning: {stats['failed']} strings were not translated; rerun to retry them.")
+    return stats
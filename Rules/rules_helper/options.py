@@ -0,0 +1,115 @@
+"""Разбор и сборка многострочного поля 'options' (Priority:ID:Text или ID:Text)."""
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Исходная грамматика строки опции. Сам разбор сделан через str.partition за один
+# проход и дает ровно те же группы, что последовательное применение этих выражений.
+OPTION_PATTERN_PRIO = re.compile(r"^(?P<priority>\d+):(?P<id>[^:]+):(?P<text>.*)$")
+OPTION_PATTERN_NO_PRIO = re.compile(r"^(?P<id>[^:]+):(?P<text>.*)$")
+
+class OptionRecord(NamedTuple):
+    """Одна строка поля options. Для нераспознанных/пустых строк заполнен только raw."""
+    priority: Optional[str]
+    id: Optional[str]
+    text: Optional[str]
+    raw: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.raw is not None:
+            return {"raw": self.raw}
+        if self.priority is not None:
+            return {"priority": self.priority, "id": self.id, "text": self.text}
+        return {"id": self.id, "text": self.text}
+
+    @classmethod
+    def from_dict(cls, option_data: Dict[str, Any]) -> Optional['OptionRecord']:
+        """Обратное к to_dict; None для объектов, которые build_options_string пропускает."""
+        if "raw" in option_data:
+            raw = option_data["raw"]
+            return cls(None, None, None, str(raw)) if raw or isinstance(raw, str) else None
+        if "id" not in option_data or "text" not in option_data:
+            return None
+        priority = option_data.get("priority")
+        return cls(None if "priority" not in option_data else str(priority),
+                   str(option_data["id"]), str(option_data["text"]))
+
+def parse_option_records(options_str: str) -> List[OptionRecord]:
+    """Разбирает поле 'options' в список OptionRecord (кортежи, без словарей на строку)."""
+    records = []
+    if not options_str:
+        return records
+    append = records.append
+    for line in options_str.split('\n'):
+        head, sep, rest = line.partition(':')
+        if head:
+            # \d+ в OPTION_PATTERN_PRIO - это str.isdecimal
+            if head.isdecimal():
+                option_id, sep2, text = rest.partition(':')
+                if sep2 and option_id:
+                    append(OptionRecord(head, option_id, text))
+                    continue
+            if sep:
+                append(OptionRecord(None, head, rest))
+                continue
+        append(OptionRecord(None, None, None, line))
+    return records
+
+def build_option_records(records: List[OptionRecord]) -> str:
+    """Собирает OptionRecord обратно в строку; parse -> build дает исходную строку побайтно."""
+    if not records:
+        return ''
+    if len(records) == 1:
+        # Большинство непустых ячеек - одна строка: без списка и join
+        priority, option_id, text, raw = records[0]
+        if raw is not None:
+            return raw
+        return f"{option_id}:{text}" if priority is None else f"{priority}:{option_id}:{text}"
+    lines = []
+    append = lines.append
+    for priority, option_id, text, raw in records:
+        if raw is not None:
+            append(raw)
+        elif priority is None:
+            append(f"{option_id}:{text}")
+        else:
+            append(f"{priority}:{option_id}:{text}")
+    return '\n'.join(lines)
+
+def parse_options_string(options_str: str) -> List[Dict[str, Any]]:
+    """Разбирает поле 'options' в список объектов, сохраняя пустые/пробельные строки как raw."""
+    parsed_options = []
+    if not options_str:
+        return parsed_options
+    append = parsed_options.append
+    for line in options_str.split('\n'):
+        # Пустая/пробельная строка не содержит ':' и попадает в raw
+        head, sep, rest = line.partition(':')
+        if head:
+            if head.isdecimal():
+                option_id, sep2, text = rest.partition(':')
+                if sep2 and option_id:
+                    append({"priority": head, "id": option_id, "text": text})
+                    continue
+            if sep:
+                append({"id": head, "text": rest})
+                continue
+        append({"raw": line})
+    return parsed_options
+
+def build_options_string(options_list: List[Dict[str, Any]]) -> str:
+    """Собирает список объектов опций обратно в многострочную строку."""
+    if not options_list:
+        return ''
+    lines = []
+    append = lines.append
+    for option_data in options_list:
+        if "raw" in option_data:
+            raw = option_data["raw"]
+            if raw or isinstance(raw, str):
+                append(str(raw))
+        elif "id" in option_data and "text" in option_data:
+            if "priority" in option_data:
+                append(f"{option_data['priority']}:{option_data['id']}:{option_data['text']}")
+            else:
+                append(f"{option_data['id']}:{option_data['text']}")
+    return '\n'.join(lines)
@@ -0,0 +1,173 @@
+"""
+Индекс записей CSV для произвольного доступа.
+
+Хранит байтовые смещения каждой записи rules.csv (с учетом многострочных полей
+в кавычках) и значения id/trigger. Запись читается через mmap по смещению и
+разбирается отдельно - без разбора остального файла. Индекс сохраняется рядом
+с CSV и перестраивается, если размер или время изменения CSV не совпадают.
+"""
+import codecs
+import csv
+import json
+import logging
+import mmap
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from .batch import find_record_boundaries
+from .csvio import make_row_object
+from .encoding import resolve_encoding
+from .files import CSV_ENCODING, atomic_write
+
+logger = logging.getLogger(__name__)
+
+RECORD_INDEX_VERSION: int = 1
+ID_COLUMN: int = 0
+TRIGGER_COLUMN: int = 1
+
+def _file_stamp(csv_filepath) -> List[int]:
+    st = os.stat(csv_filepath)
+    return [st.st_size, st.st_mtime_ns]
+
+def _column(row: List[str], idx: int) -> str:
+    return row[idx].strip() if len(row) > idx else ''
+
+class RecordIndex:
+    """
+    Индекс записей одного CSV: offsets[k]..offsets[k+1] - байты записи с
+    _row_number = k + 2 (заголовок - строка 1, как в csv_to_json).
+    """
+
+    def __init__(self, csv_filepath, encoding: str, header: List[str], offsets: List[int],
+                 ids: List[str], triggers: List[str], stamp: Optional[List[int]] = None):
+        self.csv_filepath = csv_filepath
+        self.encoding = encoding
+        self.header = header
+        self.offsets = offsets
+        self.ids = ids
+        self.triggers = triggers
+        self.stamp = stamp or _file_stamp(csv_filepath)
+        self._by_id: Dict[str, List[int]] = {}
+        self._by_trigger: Dict[str, List[int]] = {}
+        for k, (rule_id, trigger) in enumerate(zip(ids, triggers)):
+            self._by_id.setdefault(rule_id, []).append(k + 2)
+            if trigger:
+                self._by_trigger.setdefault(trigger, []).append(k + 2)
+        self._mm = None
+        self._file = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, csv_filepath, encoding: str = CSV_ENCODING) -> 'RecordIndex':
+        """Один проход по файлу: границы записей (кавычки - как у csv.reader), затем id и trigger."""
+        stamp = _file_stamp(csv_filepath)
+        with open(csv_filepath, 'rb') as f:
+            data = f.read()
+        encoding, bom_length = resolve_encoding(data, encoding)
+        if codecs.lookup(encoding).name in ('utf-16', 'utf-32'):
+            raise ValueError(f"Record index does not support {encoding} files: {csv_filepath}")
+        boundaries = find_record_boundaries(data, 0, bom_length)
+        if len(boundaries) < 2:
+            raise ValueError(f"CSV file {csv_filepath} is empty or has no header.")
+        # csv.reader принимает любую последовательность строк; каждая строка здесь -
+        # целая запись, так что многострочные поля в кавычках разбираются верно
+        records = (data[boundaries[k]:boundaries[k + 1]].decode(encoding)
+                   for k in range(len(boundaries) - 1))
+        reader = csv.reader(records)
+        header = next(reader)
+        ids, triggers = [], []
+        for row in reader:
+            ids.append(_column(row, ID_COLUMN))
+            triggers.append(_column(row, TRIGGER_COLUMN))
+        if len(ids) != len(boundaries) - 2:
+            raise ValueError(f"Record boundaries of {csv_filepath} do not match the CSV parser "
+                             f"({len(boundaries) - 2} vs {len(ids)}); is a quote unbalanced?")
+        return cls(csv_filepath, encoding, header, boundaries[1:], ids, triggers, stamp)
+
+    @classmethod
+    def load(cls, index_filepath, csv_filepath) -> Optional['RecordIndex']:
+        """Загружает индекс; None, если файла нет, версия другая или CSV изменился."""
+        try:
+            with open(index_filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("version") != RECORD_INDEX_VERSION:
+            logger.warning(f"Warning: Record index {index_filepath} has unsupported version, ignoring it.")
+            return None
+        if data.get("stamp") != _file_stamp(csv_filepath):
+            logger.info(f"Record index {index_filepath} is out of date.")
+            return None
+        return cls(csv_filepath, data["encoding"], data["header"], data["offsets"],
+                   data["ids"], data["triggers"], data["stamp"])
+
+    def save(self, index_filepath):
+        """Атомарно сохраняет индекс."""
+        with atomic_write(index_filepath, 'utf-8') as f:
+            json.dump({"version": RECORD_INDEX_VERSION, "source": os.path.basename(self.csv_filepath),
+                       "stamp": self.stamp, "encoding": self.encoding, "header": self.header,
+                       "offsets": self.offsets, "ids": self.ids, "triggers": self.triggers},
+                      f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def open(cls, csv_filepath, index_filepath, encoding: str = CSV_ENCODING) -> 'RecordIndex':
+        """Свежий индекс с диска или построенный заново (и сохраненный)."""
+        index = cls.load(index_filepath, csv_filepath)
+        if index is None:
+            logger.info(f"Building record index for {csv_filepath}")
+            index = cls.build(csv_filepath, encoding)
+            index.save(index_filepath)
+            logger.info(f"Record index written: {index_filepath} ({len(index)} records).")
+        return index
+
+    def _map(self):
+        if self._mm is None:
+            self._file = open(self.csv_filepath, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def __enter__(self) -> 'RecordIndex':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def row_numbers(self, rule_id: Optional[str] = None, trigger: Optional[str] = None) -> List[int]:
+        """Номера строк по id и/или trigger (при обоих условиях - пересечение)."""
+        if rule_id is None and trigger is None:
+            return list(range(2, len(self) + 2))
+        found = None
+        if rule_id is not None:
+            found = self._by_id.get(rule_id.strip(), [])
+        if trigger is not None:
+            by_trigger = self._by_trigger.get(trigger.strip(), [])
+            found = by_trigger if found is None else sorted(set(found) & set(by_trigger))
+        return list(found)
+
+    def record_bytes(self, row_number: int) -> bytes:
+        """Сырые байты записи (вместе с завершающим переводом строки)."""
+        k = row_number - 2
+        if not 0 <= k < len(self):
+            raise ValueError(f"Row {row_number} is out of range 2..{len(self) + 1}.")
+        if _file_stamp(self.csv_filepath) != self.stamp:
+            raise RuntimeError(f"{self.csv_filepath} changed since the record index was built.")
+        return self._map()[self.offsets[k]:self.offsets[k + 1]]
+
+    def get_row(self, row_number: int) -> Dict[str, Any]:
+        """Объект строки в том же виде, что выдает csv_to_json."""
+        text = self.record_bytes(row_number).decode(self.encoding)
+        row = next(csv.reader([text]), [])
+        return make_row_object(self.header, row, row_number)
+
+    def iter_rows(self, rule_id: Optional[str] = None,
+                  trigger: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        for row_number in self.row_numbers(rule_id, trigger):
+            yield self.get_row(row_number)
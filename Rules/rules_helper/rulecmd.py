@@ -0,0 +1,113 @@
+"""
+Таблица сигнатур команд rules.csv (колонка script), построенная по исходникам
+api/impl/campaign/rulecmd/*.java.
+
+Для каждой команды запоминаются номера параметров с видимым игроку текстом:
+параметры, читаемые через getStringWithTokenReplacement (текст с подстановкой
+$переменных), и строковые параметры, сохраняемые в переменные вида text/desc/
+title/tooltip. Циклы "for (int i = K; i < params.size(); i++)" с подстановкой
+дают переменное число текстовых параметров начиная с K. Наследники (Highlight
+extends SetTextHighlights) получают сигнатуру родителя.
+
+Разбор Java идет один раз: таблица кэшируется в JSON и перестраивается только
+при изменении набора или времени изменения .java файлов.
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from .files import atomic_write
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_TABLE_VERSION: int = 1
+DEFAULT_RULECMD_DIR: str = os.path.join('..', 'api', 'impl', 'campaign', 'rulecmd')
+SIGNATURE_CACHE_FILE: str = 'rulecmd_signatures.json'
+
+_CLASS_PATTERN = re.compile(r"\bclass\s+(\w+)(?:\s+extends\s+(\w+))?")
+_PARAM_ASSIGN_PATTERN = re.compile(r"(\w+)\s*=\s*params\.get\((\d+)\)\.(\w+)")
+_PARAM_REPLACED_PATTERN = re.compile(r"params\.get\((\d+)\)\.getStringWithTokenReplacement")
+_VARIADIC_PATTERN = re.compile(r"for\s*\(\s*int\s+(\w+)\s*=\s*(\d+)\s*;\s*\1\s*<\s*params\.size\(\)\s*;\s*\1\+\+\s*\)"
+                               r"[^}]*?params\.get\(\1\)\.getStringWithTokenReplacement", re.S)
+_TEXT_VARIABLE_PATTERN = re.compile(r"(?:^|[a-z])(?:[Tt]ext|[Dd]esc|[Dd]escription|[Tt]itle|[Tt]ooltip)$")
+_ID_VARIABLE_PATTERN = re.compile(r"^id$|[a-z]Id$")
+_LINE_COMMENT_PATTERN = re.compile(r"//[^\n]*")
+_BLOCK_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.S)
+_STRING_METHODS = frozenset(('getString', 'string', 'getStringWithTokenReplacement'))
+
+def parse_command_source(source: str) -> Optional[Dict[str, Any]]:
+    """Сигнатура одной команды по тексту .java (None, если класс не найден)."""
+    code = _LINE_COMMENT_PATTERN.sub('', _BLOCK_COMMENT_PATTERN.sub('', source))
+    match = _CLASS_PATTERN.search(code)
+    if not match:
+        return None
+    text_params = set(int(i) for i in _PARAM_REPLACED_PATTERN.findall(code))
+    for name, index, method in _PARAM_ASSIGN_PATTERN.findall(code):
+        if method in _STRING_METHODS and _TEXT_VARIABLE_PATTERN.search(name):
+            text_params.add(int(index))
+        elif method == 'getStringWithTokenReplacement' and _ID_VARIABLE_PATTERN.search(name):
+            # Подстановка в идентификатор (BeginConversation <person id>) - не текст
+            text_params.discard(int(index))
+    variadic = [int(m.group(2)) for m in _VARIADIC_PATTERN.finditer(code)]
+    return {
+        "extends": match.group(2),
+        "text_params": sorted(text_params),
+        "variadic_from": min(variadic) if variadic else None,
+    }
+
+def _sources_stamp(java_dir: str) -> List[Any]:
+    names = sorted(n for n in os.listdir(java_dir) if n.endswith('.java'))
+    mtime = max((os.stat(os.path.join(java_dir, n)).st_mtime_ns for n in names), default=0)
+    return [len(names), mtime]
+
+def build_signature_table(java_dir: str = DEFAULT_RULECMD_DIR) -> Dict[str, Dict[str, Any]]:
+    """Разбирает все команды каталога. В таблицу попадают только команды с текстовыми параметрами."""
+    parsed: Dict[str, Dict[str, Any]] = {}
+    for name in sorted(os.listdir(java_dir)):
+        if not name.endswith('.java'):
+            continue
+        with open(os.path.join(java_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+            signature = parse_command_source(f.read())
+        if signature is not None:
+            parsed[name[:-5]] = signature
+
+    table = {}
+    for command, signature in parsed.items():
+        resolved, seen = signature, {command}
+        # Команда без своих параметров наследует сигнатуру родителя
+        while (not resolved["text_params"] and resolved["variadic_from"] is None
+               and resolved["extends"] in parsed and resolved["extends"] not in seen):
+            seen.add(resolved["extends"])
+            resolved = parsed[resolved["extends"]]
+        if resolved["text_params"] or resolved["variadic_from"] is not None:
+            table[command] = {"text_params": resolved["text_params"], "variadic_from": resolved["variadic_from"]}
+    return table
+
+def load_signature_table(java_dir: str = DEFAULT_RULECMD_DIR,
+                         cache_filepath: Optional[str] = SIGNATURE_CACHE_FILE) -> Dict[str, Dict[str, Any]]:
+    """Таблица из кэша, если исходники не менялись; иначе строит и сохраняет заново."""
+    if not os.path.isdir(java_dir):
+        raise FileNotFoundError(f"rulecmd sources not found: {java_dir}")
+    stamp = _sources_stamp(java_dir)
+    if cache_filepath:
+        try:
+            with open(cache_filepath, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("version") == SIGNATURE_TABLE_VERSION and cached.get("stamp") == stamp:
+                return cached["commands"]
+        except FileNotFoundError:
+            pass
+    logger.info(f"Building command signature table from {java_dir}")
+    table = build_signature_table(java_dir)
+    if cache_filepath:
+        with atomic_write(cache_filepath, 'utf-8') as f:
+            json.dump({"version": SIGNATURE_TABLE_VERSION, "stamp": stamp, "commands": table},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+        logger.info(f"Command signature table written: {cache_filepath} ({len(table)} commands with text).")
+    return table
+
+def is_text_param(signature: Dict[str, Any], index: int) -> bool:
+    variadic_from = signature.get("variadic_from")
+    return index in signature["text_params"] or (variadic_from is not None and index >= variadic_from)
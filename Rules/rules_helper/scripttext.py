@@ -0,0 +1,118 @@
+"""
+Видимый игроку текст в колонке script (AddText "...", SetTooltip ... "..." и т.п.).
+
+Строка скрипта делится на токены так же, как это делает игра: слова через
+пробел, строки в двойных кавычках - один токен. Какие параметры команды
+являются текстом, берется из таблицы сигнатур rulecmd. Такие литералы
+выносятся в JSON отдельным списком script_strings и при json2csv
+подставляются обратно на свое место; остальной скрипт не трогается.
+
+Текст литерала хранится как есть, без разбора escape-последовательностей:
+\\n и \\" в нем остаются двумя символами, что и видит переводчик.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from .rulecmd import is_text_param
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT_TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"|[^\s"]+')
+# $переменные и числа текстом не считаются - для перевода нужен хотя бы один буквенный символ вне них
+_VARIABLE_PATTERN = re.compile(r"\$[\w.]+")
+_LETTER_PATTERN = re.compile(r"[^\W\d_]")
+_UNESCAPED_QUOTE = re.compile(r'(?<!\\)"')
+
+def _line_tokens(line: str) -> List[re.Match]:
+    return list(_SCRIPT_TOKEN.finditer(line))
+
+def script_tokens(line: str) -> List[str]:
+    """Токены строки скрипта или условия: слова и литералы в кавычках (с кавычками)."""
+    return _SCRIPT_TOKEN.findall(line)
+
+def _is_literal(token: str) -> bool:
+    return len(token) >= 2 and token[0] == '"' and token[-1] == '"'
+
+def _has_text(literal: str) -> bool:
+    return bool(_LETTER_PATTERN.search(_VARIABLE_PATTERN.sub('', literal)))
+
+def extract_script_strings(script: str, signatures: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Текстовые литералы скрипта: [{"line", "param", "command", "text"}], где line -
+    номер строки скрипта, param - номер параметра команды (с нуля).
+    """
+    units = []
+    if not script or '"' not in script:
+        return units
+    for line_no, line in enumerate(script.split('\n')):
+        stripped = line.strip()
+        if not stripped or stripped[0] in '#$':
+            continue
+        tokens = _line_tokens(line)
+        if not tokens:
+            continue
+        signature = signatures.get(tokens[0].group())
+        if signature is None:
+            continue
+        for param, match in enumerate(tokens[1:]):
+            token = match.group()
+            if _is_literal(token) and is_text_param(signature, param) and _has_text(token[1:-1]):
+                units.append({"line": line_no, "param": param, "command": tokens[0].group(),
+                              "text": token[1:-1]})
+    return units
+
+def script_literal_at(script: str, line: int, param: int) -> Optional[str]:
+    """Содержимое литерала в позиции (строка, параметр) или None, если там не литерал."""
+    lines = script.split('\n')
+    if not 0 <= line < len(lines):
+        return None
+    tokens = _line_tokens(lines[line])
+    if param + 1 >= len(tokens) or not _is_literal(tokens[param + 1].group()):
+        return None
+    return tokens[param + 1].group()[1:-1]
+
+def _escape_literal(text: str) -> str:
+    # Переводы строк внутри литерала в игре записываются как \n
+    text = text.replace('\r\n', '\\n').replace('\n', '\\n')
+    return _UNESCAPED_QUOTE.sub('\\\\"', text)
+
+def splice_script_strings(script: str, units: List[Dict[str, Any]]) -> str:
+    """
+    Подставляет тексты units обратно в скрипт. Неизмененные литералы остаются
+    байт в байт; если позиция из units в скрипте не литерал, единица пропускается с предупреждением.
+    """
+    if not units:
+        return script
+    lines = script.split('\n')
+    by_line: Dict[int, List[Dict[str, Any]]] = {}
+    for unit in units:
+        by_line.setdefault(unit.get("line", -1), []).append(unit)
+    for line_no, line_units in by_line.items():
+        if not 0 <= line_no < len(lines):
+            logger.warning(f"Warning: script string at line {line_no} is out of range, skipped.")
+            continue
+        line = lines[line_no]
+        tokens = _line_tokens(line)
+        # С конца строки, чтобы замены не сдвигали позиции следующих литералов
+        for unit in sorted(line_units, key=lambda u: u.get("param", -1), reverse=True):
+            index = unit.get("param", -1) + 1
+            if not 0 < index < len(tokens) or not _is_literal(tokens[index].group()):
+                logger.warning(f"Warning: script string {unit.get('command', '')} param {index - 1} "
+                               f"at line {line_no} no longer matches the script, skipped.")
+                continue
+            match = tokens[index]
+            text = unit.get("text", '')
+            if text == match.group()[1:-1]:
+                continue
+            line = line[:match.start()] + '"' + _escape_literal(text) + '"' + line[match.end():]
+        lines[line_no] = line
+    return '\n'.join(lines)
+
+def add_script_strings(item: Dict[str, Any], signatures: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Добавляет строке data список script_strings, если в ее скрипте есть текст."""
+    if item.get("_type") == "data" and item.get("script"):
+        units = extract_script_strings(item["script"], signatures)
+        if units:
+            item["script_strings"] = units
+    return item
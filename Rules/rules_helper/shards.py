@@ -0,0 +1,189 @@
+"""
+Деление JSON для перевода на N частей, сбалансированных по объему текста, и сборка обратно.
+
+Единица деления - раздел: строка-комментарий и все строки после нее до
+следующего комментария, так что разделы файла не разрываются. Вес раздела -
+число символов в переводимых единицах (tm.iter_translatable_units). Части
+идут подряд по файлу; границы подбираются двоичным поиском по максимальному
+весу части, что дает наименьший возможный максимум при сохранении порядка.
+
+Рядом с частями пишется манифест: диапазон _row_number, число строк и хэш
+исходных fields каждой части. merge читает части по порядку за один проход,
+проверяет по манифесту, что строки не потеряны, не переставлены и исходный
+текст в fields не изменен, и пишет единый JSON для json_to_csv.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .files import JSON_ENCODING, atomic_write
+from .incremental import fingerprint_fields
+from .jsonio import JsonArrayWriter, iter_json_array
+from .tm import iter_translatable_units
+
+logger = logging.getLogger(__name__)
+
+SHARD_MANIFEST_VERSION: int = 1
+
+def item_weight(item: Dict[str, Any]) -> int:
+    """Объем перевода в строке: символы исходного текста переводимых единиц."""
+    return sum(len(source) for _, _, source, _ in iter_translatable_units(item))
+
+def section_weights(items: Iterable[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """(число строк, вес) для каждого раздела подряд; новый раздел начинается с комментария."""
+    sections: List[Tuple[int, int]] = []
+    rows = weight = 0
+    for item in items:
+        if item.get("_type") == "comment" and rows:
+            sections.append((rows, weight))
+            rows = weight = 0
+        rows += 1
+        weight += item_weight(item)
+    if rows:
+        sections.append((rows, weight))
+    return sections
+
+def _parts_needed(weights: List[int], limit: int) -> int:
+    parts, load = 1, 0
+    for w in weights:
+        if load + w > limit and load:
+            parts += 1
+            load = 0
+        load += w
+    return parts
+
+def partition_sections(weights: List[int], shards: int) -> List[int]:
+    """
+    Индексы разделов, с которых начинается каждая часть (первая - 0). Наибольший
+    вес части минимален среди всех разбиений на не больше чем shards отрезков подряд.
+    """
+    if not weights:
+        return [0]
+    low, high = max(weights), sum(weights)
+    while low < high:
+        middle = (low + high) // 2
+        if _parts_needed(weights, middle) <= shards:
+            high = middle
+        else:
+            low = middle + 1
+    starts, load = [0], 0
+    for i, w in enumerate(weights):
+        # Оставшимся частям должно хватить хотя бы по разделу
+        remaining_sections = len(weights) - i
+        remaining_parts = shards - len(starts)
+        if load and (load + w > low or remaining_sections <= remaining_parts):
+            starts.append(i)
+            load = 0
+        load += w
+    return starts
+
+class _ShardHash:
+    """Хэш исходных fields части: цепочка fingerprint_fields по порядку строк."""
+
+    def __init__(self):
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def add(self, item: Dict[str, Any]):
+        self._hash.update(fingerprint_fields(item.get("fields") or []).encode('ascii'))
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+def shard_paths(json_filepath: str, shards: int, output_dir: Optional[str] = None) -> Tuple[str, List[str]]:
+    """(манифест, файлы частей) рядом с входным файлом или в output_dir."""
+    base = os.path.splitext(os.path.basename(json_filepath))[0]
+    directory = output_dir if output_dir is not None else os.path.dirname(json_filepath)
+    width = max(2, len(str(shards)))
+    parts = [os.path.join(directory, f"{base}.shard{i + 1:0{width}d}.json") for i in range(shards)]
+    return os.path.join(directory, f"{base}.shards.json"), parts
+
+def split_json(json_filepath: str, shards: int, output_dir: Optional[str] = None,
+               json_encoding: str = JSON_ENCODING) -> str:
+    """Делит JSON на части и пишет манифест. Возвращает путь манифеста."""
+    if shards < 1:
+        raise ValueError("Number of shards must be at least 1.")
+    sections = section_weights(iter_json_array(json_filepath, json_encoding))
+    starts = partition_sections([w for _, w in sections], shards)
+    # Границы частей в строках
+    row_limits: List[int] = []
+    for k, start in enumerate(starts):
+        end = starts[k + 1] if k + 1 < len(starts) else len(sections)
+        row_limits.append(sum(rows for rows, _ in sections[start:end]))
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    manifest_path, part_paths = shard_paths(json_filepath, len(row_limits), output_dir)
+
+    entries = []
+    items = iter_json_array(json_filepath, json_encoding)
+    for path, limit in zip(part_paths, row_limits):
+        digest = _ShardHash()
+        first = last = None
+        weight = 0
+        with atomic_write(path, json_encoding) as f:
+            writer = JsonArrayWriter(f)
+            for _ in range(limit):
+                item = next(items)
+                first = item.get("_row_number") if first is None else first
+                last = item.get("_row_number")
+                weight += item_weight(item)
+                digest.add(item)
+                writer.write(item)
+            writer.close()
+        entries.append({"file": os.path.basename(path), "first_row": first, "last_row": last,
+                        "rows": limit, "chars": weight, "hash": digest.hexdigest()})
+        logger.info(f"Shard {path}: rows {first}-{last}, {limit} objects, {weight} characters.")
+    if next(items, None) is not None:
+        raise RuntimeError(f"{json_filepath} changed while it was being split.")
+
+    with atomic_write(manifest_path, 'utf-8') as f:
+        json.dump({"version": SHARD_MANIFEST_VERSION, "source": os.path.basename(json_filepath),
+                   "rows": sum(row_limits), "shards": entries}, f, ensure_ascii=False, indent=2)
+    heaviest = max(e["chars"] for e in entries)
+    logger.info(f"Split into {len(entries)} shards; heaviest {heaviest} characters. Manifest: {manifest_path}")
+    return manifest_path
+
+def _iter_checked_shards(manifest: Dict[str, Any], directory: str,
+                         json_encoding: str) -> Iterator[Dict[str, Any]]:
+    expected_row = None
+    for entry in manifest["shards"]:
+        path = os.path.join(directory, entry["file"])
+        digest = _ShardHash()
+        count = 0
+        for item in iter_json_array(path, json_encoding):
+            row_number = item.get("_row_number")
+            if count == 0 and row_number != entry["first_row"]:
+                raise ValueError(f"{entry['file']}: starts at row {row_number}, manifest says {entry['first_row']}.")
+            if expected_row is not None and row_number != expected_row:
+                raise ValueError(f"{entry['file']}: expected row {expected_row}, found {row_number} "
+                                 f"(rows lost, duplicated or reordered).")
+            expected_row = row_number + 1 if isinstance(row_number, int) else None
+            digest.add(item)
+            count += 1
+            yield item
+        if count != entry["rows"]:
+            raise ValueError(f"{entry['file']}: {count} objects, manifest says {entry['rows']}.")
+        if digest.hexdigest() != entry["hash"]:
+            raise ValueError(f"{entry['file']}: source text in 'fields' differs from the split input.")
+
+def merge_shards(manifest_filepath: str, output_json_filepath: str,
+                 json_encoding: str = JSON_ENCODING) -> int:
+    """
+    Собирает части по манифесту в один JSON, проверяя целостность на лету.
+    При ошибке выходной файл не создается. Возвращает число объектов.
+    """
+    with open(manifest_filepath, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise ValueError(f"{manifest_filepath}: unsupported shard manifest version {manifest.get('version')}.")
+    directory = os.path.dirname(manifest_filepath)
+    with atomic_write(output_json_filepath, json_encoding) as f:
+        writer = JsonArrayWriter(f)
+        for item in _iter_checked_shards(manifest, directory, json_encoding):
+            writer.write(item)
+        if writer.count != manifest["rows"]:
+            raise ValueError(f"Merged {writer.count} objects, manifest says {manifest['rows']}.")
+        writer.close()
+    logger.info(f"Merged {len(manifest['shards'])} shards into {output_json_filepath} ({writer.count} objects).")
+    return writer.count
@@ -0,0 +1,414 @@
+"""
+Офлайн-симулятор выбора правил (аналог RulesAPI.getBestMatching).
+
+Правила индексируются по trigger, а внутри триггера - по первому условию вида
+"$var == значение" (у DialogOptionSelected это $option), так что на шаг
+проверяются только правила-кандидаты. Условия компилируются в замыкания
+один раз при загрузке. Счет правила - сумма счетов строк условий (1 или
+score:N); побеждает наибольший, при равенстве - случайный, как в игре.
+Кандидаты перебираются по убыванию счета, и перебор останавливается, как
+только счет становится меньше найденного.
+
+Память задается плоским словарем без "$": {"option": "defaultLeave",
+"global.numGatesScanned": 3, "tag": ["gate"]} (вложенные словари
+разворачиваются через точку). Команды в условиях (RepGTE, Call и т.п.)
+требуют кода игры: их результат берется из словаря commands, остальные
+считаются ложными.
+
+Скрипт выполняется приближенно: присваивания $var, ++/--, unset, FireBest/
+FireAll, AddOption/RemoveOption, AddText/AddTextSmall, EndConversation и DismissDialog;
+прочие команды только записываются в результат шага.
+"""
+import heapq
+import logging
+import random
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .files import CSV_ENCODING, JSON_ENCODING, PathOrStream
+from .scripttext import script_tokens, splice_script_strings
+from .validate import OR_SEPARATOR, iter_rule_items
+
+logger = logging.getLogger(__name__)
+
+MAX_FIRE_DEPTH: int = 20
+DEFAULT_START_TRIGGER: str = 'OpenInteractionDialog'
+OPTION_TRIGGER: str = 'DialogOptionSelected'
+
+_SCORE_PATTERN = re.compile(r"\s+score:(-?\d+)\s*$")
+_COMPARE_PATTERN = re.compile(r"^(!?)\$([\w.:]+)\s*(==|!=|>=|<=|>|<)\s*(.+?)$")
+_TRUTH_PATTERN = re.compile(r"^(!?)\$([\w.:]+)$")
+_INCREMENT_PATTERN = re.compile(r"^\$([\w.:]+)\s*(\+\+|--)$")
+_ASSIGN_PATTERN = re.compile(r"^\$([\w.:]+)\s*=\s*(.+?)$")
+_COMMAND_PATTERN = re.compile(r"^(!?)(\w+)\s*(.*)$")
+_TEXT_TOKEN_PATTERN = re.compile(r"\$([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)")
+
+Memory = Dict[str, Any]
+Condition = Callable[[Memory], bool]
+CommandResult = Union[bool, Callable[[List[str], Memory], bool]]
+
+def flatten_memory(memory: Dict[str, Any], prefix: str = '') -> Memory:
+    """{"global": {"x": 1}} -> {"global.x": 1}; ведущий "$" у ключей убирается."""
+    flat: Memory = {}
+    for key, value in memory.items():
+        name = prefix + key.lstrip('$')
+        if isinstance(value, dict):
+            flat.update(flatten_memory(value, name + '.'))
+        else:
+            flat[name] = value
+    return flat
+
+def lookup(memory: Memory, name: str) -> Any:
+    """Значение переменной; "$tag:gate" проверяет членство gate в коллекции memory["tag"]."""
+    if name in memory:
+        return memory[name]
+    base, sep, member = name.partition(':')
+    if sep:
+        container = memory.get(base)
+        return container is not None and member in container
+    return None
+
+def is_true(value: Any) -> bool:
+    if isinstance(value, str):
+        return value not in ('', 'false', '0')
+    return bool(value)
+
+def _literal(token: str) -> Any:
+    if len(token) >= 2 and token[0] == '"' and token[-1] == '"':
+        return token[1:-1]
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _as_string(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def compare(left: Any, op: str, right: Any) -> bool:
+    a, b = _as_number(left), _as_number(right)
+    if a is not None and b is not None:
+        return {'==': a == b, '!=': a != b, '>': a > b, '<': a < b, '>=': a >= b, '<=': a <= b}[op]
+    if op == '==':
+        return _as_string(left) == _as_string(right)
+    if op == '!=':
+        return _as_string(left) != _as_string(right)
+    return False
+
+def compile_condition(line: str, commands: Dict[str, CommandResult]) -> Tuple[Optional[Condition], int]:
+    """
+    (проверка, счет) для одной строки conditions. Пустые строки и строки "#..."
+    дают (None, 0) - они не проверяются и не добавляют счета.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None, 0
+    score = 1
+    match = _SCORE_PATTERN.search(line)
+    if match:
+        score = int(match.group(1))
+        line = line[:match.start()].strip()
+
+    match = _COMPARE_PATTERN.match(line)
+    if match:
+        negate, name, op, operand = match.group(1) == '!', match.group(2), match.group(3), match.group(4)
+        if operand.startswith('$'):
+            ref = operand[1:]
+            check = lambda m: compare(lookup(m, name), op, lookup(m, ref))
+        else:
+            value = _literal(operand)
+            check = lambda m: compare(lookup(m, name), op, value)
+        return ((lambda m: not check(m)) if negate else check), score
+    match = _TRUTH_PATTERN.match(line)
+    if match:
+        name = match.group(2)
+        if match.group(1):
+            return (lambda m: not is_true(lookup(m, name))), score
+        return (lambda m: is_true(lookup(m, name))), score
+    if _INCREMENT_PATTERN.match(line):
+        # Изменение памяти в условиях игра выполняет при проверке; здесь оно всегда "истинно"
+        return (lambda m: True), score
+    match = _COMMAND_PATTERN.match(line)
+    if not match:
+        return (lambda m: False), score
+    negate, command = match.group(1) == '!', match.group(2)
+    params = script_tokens(match.group(3))
+    result = commands.get(line.lstrip('!'), commands.get(command, False))
+    if callable(result):
+        check = lambda m: bool(result(params, m))
+    else:
+        value = bool(result)
+        check = lambda m: value
+    return ((lambda m: not check(m)) if negate else check), score
+
+class Rule:
+    """Скомпилированное правило."""
+    __slots__ = ('id', 'trigger', 'row_number', 'conditions', 'score', 'key', 'script', 'text', 'options', 'order')
+
+    def __init__(self, item: Dict[str, Any], commands: Dict[str, CommandResult], order: int):
+        self.id = item.get('id', '').strip()
+        self.trigger = item.get('trigger', '').strip()
+        self.row_number = item.get('_row_number', 0)
+        # В JSON перевода литералы скрипта (AddText "...") переведены в script_strings
+        self.script = splice_script_strings(item.get('script', ''), item.get('script_strings') or [])
+        self.text = item.get('text', '')
+        self.options = [(opt['id'], opt.get('text', '')) for opt in item.get('options') or [] if 'id' in opt]
+        self.order = order
+        self.conditions: List[Condition] = []
+        self.score = 0
+        self.key: Optional[Tuple[str, str]] = None
+        for line in (item.get('conditions') or '').split('\n'):
+            check, score = compile_condition(line, commands)
+            if check is None:
+                continue
+            self.conditions.append(check)
+            self.score += score
+            if self.key is None:
+                match = _COMPARE_PATTERN.match(_SCORE_PATTERN.sub('', line.strip()))
+                if match and not match.group(1) and match.group(3) == '==' and not match.group(4).startswith('$'):
+                    self.key = (match.group(2), _as_string(_literal(match.group(4))))
+
+    def matches(self, memory: Memory) -> bool:
+        for check in self.conditions:
+            if not check(memory):
+                return False
+        return True
+
+class DialogStep:
+    """Итог одного шага: сработавшие правила, текст, опции и прочие команды скрипта."""
+
+    def __init__(self):
+        self.rules: List[str] = []
+        self.texts: List[str] = []
+        self.options: List[Tuple[str, str]] = []
+        self.commands: List[str] = []
+        self.ended = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rules": self.rules, "text": '\n\n'.join(self.texts),
+                "options": [{"id": i, "text": t} for i, t in self.options],
+                "commands": self.commands, "ended": self.ended}
+
+class _TriggerIndex:
+    """Правила одного триггера: без ключа и по значению ключевой переменной, каждый список - по убыванию счета."""
+    __slots__ = ('unkeyed', 'keyed')
+
+    def __init__(self):
+        self.unkeyed: List[Rule] = []
+        self.keyed: Dict[str, Dict[str, List[Rule]]] = {}
+
+    def candidate_lists(self, memory: Memory) -> List[List[Rule]]:
+        lists = [self.unkeyed] if self.unkeyed else []
+        for name, by_value in self.keyed.items():
+            found = by_value.get(_as_string(lookup(memory, name)))
+            if found:
+                lists.append(found)
+        return lists
+
+class RuleSimulator:
+    """Загруженные правила с индексом по trigger."""
+
+    def __init__(self, items: Iterable[Dict[str, Any]], commands: Optional[Dict[str, CommandResult]] = None,
+                 seed: Optional[int] = None):
+        self.commands = commands or {}
+        self.random = random.Random(seed)
+        self.triggers: Dict[str, _TriggerIndex] = {}
+        self.rules: Dict[str, Rule] = {}
+        count = 0
+        for item in items:
+            if item.get('_type') != 'data':
+                continue
+            rule = Rule(item, self.commands, count)
+            count += 1
+            self.rules.setdefault(rule.id, rule)
+            index = self.triggers.setdefault(rule.trigger, _TriggerIndex())
+            if rule.key is None:
+                index.unkeyed.append(rule)
+            else:
+                index.keyed.setdefault(rule.key[0], {}).setdefault(rule.key[1], []).append(rule)
+        for index in self.triggers.values():
+            index.unkeyed.sort(key=lambda r: -r.score)
+            for by_value in index.keyed.values():
+                for rules in by_value.values():
+                    rules.sort(key=lambda r: -r.score)
+        logger.info(f"Rule simulator loaded {count} rules for {len(self.triggers)} triggers.")
+
+    @classmethod
+    def load(cls, source: PathOrStream, csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING,
+             **kwargs) -> 'RuleSimulator':
+        """Правила из CSV или JSON (для JSON перевода берется переведенный текст)."""
+        return cls(iter_rule_items(source, csv_encoding, json_encoding), **kwargs)
+
+    def _iter_matching(self, trigger: str, memory: Memory) -> Iterator[Rule]:
+        index = self.triggers.get(trigger)
+        if index is None:
+            return
+        lists = index.candidate_lists(memory)
+        candidates = lists[0] if len(lists) == 1 else heapq.merge(*lists, key=lambda r: -r.score)
+        for rule in candidates:
+            if rule.matches(memory):
+                yield rule
+
+    def all_matching(self, trigger: str, memory: Memory) -> List[Rule]:
+        """Все подходящие правила по убыванию счета (порядок файла при равном счете)."""
+        return sorted(self._iter_matching(trigger, memory), key=lambda r: (-r.score, r.order))
+
+    def best_matching(self, trigger: str, memory: Memory) -> Optional[Rule]:
+        best: List[Rule] = []
+        for rule in self._iter_matching(trigger, memory):
+            if best and rule.score < best[0].score:
+                break
+            best.append(rule)
+        if not best:
+            return None
+        return best[0] if len(best) == 1 else self.random.choice(best)
+
+    def render_text(self, text: str, memory: Memory) -> str:
+        """Один вариант из "\\nOR\\n" и подстановка известных $переменных."""
+        if not text:
+            return ''
+        variants = text.replace('\r\n', '\n').split(OR_SEPARATOR)
+        text = variants[0] if len(variants) == 1 else self.random.choice(variants)
+
+        def replace(match: re.Match) -> str:
+            name = match.group(1)
+            value = lookup(memory, name)
+            if value is None:
+                value = lookup(memory, name[0].lower() + name[1:])
+                if value is None:
+                    return match.group()
+                value = _as_string(value)
+                return value[:1].upper() + value[1:] if name[0].isupper() else value
+            return _as_string(value)
+        return _TEXT_TOKEN_PATTERN.sub(replace, text)
+
+    def _apply(self, rule: Rule, memory: Memory, step: DialogStep, replace_options: bool, depth: int):
+        step.rules.append(rule.id)
+        if rule.text:
+            step.texts.append(self.render_text(rule.text, memory))
+        if rule.options:
+            if replace_options:
+                step.options.clear()
+            step.options.extend(rule.options)
+        for line in rule.script.split('\n'):
+            self._run_script_line(line.strip(), memory, step, depth)
+
+    def _run_script_line(self, line: str, memory: Memory, step: DialogStep, depth: int):
+        if not line or line.startswith('#'):
+            return
+        match = _INCREMENT_PATTERN.match(line)
+        if match:
+            value = _as_number(lookup(memory, match.group(1))) or 0
+            memory[match.group(1)] = value + (1 if match.group(2) == '++' else -1)
+            return
+        match = _ASSIGN_PATTERN.match(line)
+        if match:
+            # "$x = true 0": третий токен - срок жизни переменной, здесь не нужен
+            tokens = script_tokens(match.group(2))
+            value = tokens[0] if tokens else ''
+            memory[match.group(1)] = lookup(memory, value[1:]) if value.startswith('$') else (
+                True if value == 'true' else False if value == 'false' else _literal(value))
+            return
+        tokens = script_tokens(line)
+        if not tokens:
+            return
+        command, params = tokens[0], tokens[1:]
+        if command == 'unset' and params:
+            memory.pop(params[0].lstrip('$'), None)
+        elif command in ('FireBest', 'FireAll') and params:
+            if depth >= MAX_FIRE_DEPTH:
+                logger.warning(f"Warning: {command} {params[0]} exceeded depth {MAX_FIRE_DEPTH}, stopped.")
+                return
+            if command == 'FireBest':
+                rule = self.best_matching(params[0], memory)
+                if rule is not None:
+                    self._apply(rule, memory, step, True, depth + 1)
+            else:
+                for rule in self.all_matching(params[0], memory):
+                    self._apply(rule, memory, step, False, depth + 1)
+        elif command == 'AddOption' and len(params) >= 2:
+            step.options.append((params[0], params[1].strip('"')))
+        elif command == 'RemoveOption' and params:
+            step.options = [opt for opt in step.options if opt[0] != params[0]]
+        elif command in ('AddText', 'AddTextSmall') and params:
+            step.texts.append(self.render_text(params[0].strip('"'), memory))
+        elif command in ('EndConversation', 'DismissDialog'):
+            step.ended = True
+            step.commands.append(line)
+        else:
+            step.commands.append(line)
+
+    def step(self, trigger: str, memory: Memory, options: Optional[List[Tuple[str, str]]] = None) -> DialogStep:
+        """Срабатывание триггера: лучшее правило применяется к memory (она меняется)."""
+        result = DialogStep()
+        if options:
+            result.options.extend(options)
+        rule = self.best_matching(trigger, memory)
+        if rule is not None:
+            self._apply(rule, memory, result, True, 0)
+        return result
+
+    def choose_option(self, option_id: str, memory: Memory,
+                      options: Optional[List[Tuple[str, str]]] = None) -> DialogStep:
+        memory['option'] = option_id
+        return self.step(OPTION_TRIGGER, memory, options)
+
+class DialogPath(NamedTuple):
+    choices: Tuple[str, ...]
+    rules: Tuple[str, ...]
+    end: str
+
+def walk_paths(simulator: RuleSimulator, memory: Memory, start_trigger: str = DEFAULT_START_TRIGGER,
+               max_depth: int = 8, max_paths: int = 10000) -> Iterator[DialogPath]:
+    """
+    Обходит диалог в глубину, выбирая по очереди каждую опцию. Путь заканчивается
+    на EndConversation, без опций, без подходящего правила, на повторе опции или
+    на глубине max_depth.
+    """
+    start_memory = dict(memory)
+    first = simulator.step(start_trigger, start_memory)
+    if not first.rules:
+        yield DialogPath((), (), 'no rule')
+        return
+    stack = [((), tuple(first.rules), first, start_memory)]
+    produced = 0
+    while stack and produced < max_paths:
+        choices, rules, step, state = stack.pop()
+        end = None
+        if step.ended:
+            end = 'ended'
+        elif not step.options:
+            end = 'no options'
+        elif len(choices) >= max_depth:
+            end = 'max depth'
+        if end:
+            produced += 1
+            yield DialogPath(choices, rules, end)
+            continue
+        for option_id, _ in reversed(step.options):
+            if option_id in choices:
+                produced += 1
+                yield DialogPath(choices + (option_id,), rules, 'loop')
+                continue
+            branch = dict(state)
+            nxt = simulator.choose_option(option_id, branch, list(step.options))
+            if not nxt.rules:
+                produced += 1
+                yield DialogPath(choices + (option_id,), rules, 'no rule')
+                continue
+            stack.append((choices + (option_id,), rules + tuple(nxt.rules), nxt, branch))
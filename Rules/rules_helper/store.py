@@ -0,0 +1,281 @@
+"""
+База проекта перевода в SQLite с полнотекстовым поиском FTS5.
+
+В базу импортируются строки csv_to_json (из JSON для перевода или прямо из
+CSV) одного или нескольких файлов правил. Таблица rows хранит объект строки
+целиком (JSON), а units - переводимые единицы (tm.iter_translatable_units):
+исходник из fields и текущий перевод. Индекс FTS5 строится по обеим
+колонкам units, так что фразу можно искать по всем файлам на любом языке.
+
+Правка одной единицы - одна транзакция над одной строкой rows и одной units,
+без перезаписи всего JSON. json2csv и выгрузка JSON идут курсором по rows в
+порядке _row_number, в памяти держится одна строка.
+"""
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .convert import split_header, write_csv_rows
+from .files import CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter
+from .tm import iter_translatable_units, set_unit_value
+from .validate import iter_rule_items
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION: int = 1
+SEARCH_COLUMNS = ('source', 'target')
+DEFAULT_SEARCH_LIMIT: int = 50
+# Маркеры совпадения в результатах поиска
+HIGHLIGHT_OPEN: str = '['
+HIGHLIGHT_CLOSE: str = ']'
+
+_SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    header TEXT NOT NULL
+);
+CREATE TABLE rows (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    row_number INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (file_id, row_number)
+) WITHOUT ROWID;
+CREATE TABLE units (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    row_number INTEGER NOT NULL,
+    rule_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    idx INTEGER,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX units_row ON units (file_id, row_number);
+CREATE VIRTUAL TABLE units_fts USING fts5(
+    source, target, content='units', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER units_ai AFTER INSERT ON units BEGIN
+    INSERT INTO units_fts (rowid, source, target) VALUES (new.id, new.source, new.target);
+END;
+CREATE TRIGGER units_ad AFTER DELETE ON units BEGIN
+    INSERT INTO units_fts (units_fts, rowid, source, target) VALUES ('delete', old.id, old.source, old.target);
+END;
+CREATE TRIGGER units_au AFTER UPDATE ON units BEGIN
+    INSERT INTO units_fts (units_fts, rowid, source, target) VALUES ('delete', old.id, old.source, old.target);
+    INSERT INTO units_fts (rowid, source, target) VALUES (new.id, new.source, new.target);
+END;
+"""
+
+class SearchHit(NamedTuple):
+    file: str
+    row_number: int
+    rule_id: str
+    field: str
+    index: Optional[int]
+    source: str
+    target: str
+    translated: bool
+
+def fts_phrase(text: str) -> str:
+    """Запрос FTS5, который ищет text как фразу (кавычки и операторы внутри не действуют)."""
+    return '"' + text.replace('"', '""') + '"'
+
+def _dump_item(item: Dict[str, Any]) -> str:
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+class ProjectStore:
+    """Открытая база проекта. Закрывается через close() или with."""
+
+    def __init__(self, connection: sqlite3.Connection, db_filepath: str):
+        self.conn = connection
+        self.db_filepath = db_filepath
+
+    @classmethod
+    def open(cls, db_filepath: str) -> 'ProjectStore':
+        """Открывает базу, при необходимости создавая схему."""
+        # Транзакции открываются явно (_transaction), а не модулем sqlite3
+        conn = sqlite3.connect(db_filepath, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0:
+                try:
+                    conn.executescript("BEGIN;" + _SCHEMA + f"PRAGMA user_version={STORE_VERSION}; COMMIT;")
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    if 'fts5' in str(e):
+                        raise RuntimeError("This Python's SQLite is built without FTS5; "
+                                           "the project store needs it.") from e
+                    raise
+            elif version != STORE_VERSION:
+                raise ValueError(f"{db_filepath}: unsupported project store version {version}.")
+        except BaseException:
+            conn.close()
+            raise
+        return cls(conn, db_filepath)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'ProjectStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE: блокировка записи берется сразу, до чтения строки, которую правим
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _file_id(self, name: str) -> int:
+        row = self.conn.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"{self.db_filepath}: no file named {name!r} in the project store.")
+        return row[0]
+
+    def file_names(self) -> List[str]:
+        return [name for name, in self.conn.execute("SELECT name FROM files ORDER BY name")]
+
+    def import_items(self, name: str, items: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Загружает строки файла name, заменяя прежнее содержимое этого файла.
+        Все одной транзакцией. Возвращает (число строк, число переводимых единиц).
+        """
+        header, items = split_header(items)
+        rows = units = 0
+        with self._transaction() as conn:
+            old = conn.execute("SELECT id FROM files WHERE name = ?", (name,)).fetchone()
+            if old is not None:
+                conn.execute("DELETE FROM units WHERE file_id = ?", old)
+                conn.execute("DELETE FROM rows WHERE file_id = ?", old)
+                conn.execute("DELETE FROM files WHERE id = ?", old)
+            file_id = conn.execute("INSERT INTO files (name, header) VALUES (?, ?)",
+                                   (name, json.dumps(header))).lastrowid
+            for item in items:
+                row_number = item.get("_row_number")
+                if not isinstance(row_number, int):
+                    raise ValueError(f"{name}: object without _row_number after row {rows + 1}.")
+                try:
+                    conn.execute("INSERT INTO rows (file_id, row_number, type, item) VALUES (?, ?, ?, ?)",
+                                 (file_id, row_number, item.get("_type", ''), _dump_item(item)))
+                except sqlite3.IntegrityError as e:
+                    raise ValueError(f"{name}: duplicate _row_number {row_number}.") from e
+                rule_id = item.get("id", '').strip()
+                item_units = [(file_id, row_number, rule_id, field, index, source, current)
+                              for field, index, source, current in iter_translatable_units(item)]
+                conn.executemany("INSERT INTO units (file_id, row_number, rule_id, field, idx, source, target) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", item_units)
+                units += len(item_units)
+                rows += 1
+        logger.info(f"Imported {name} into {self.db_filepath}: {rows} rows, {units} translatable units.")
+        return rows, units
+
+    def search(self, query: str, column: Optional[str] = None, file: Optional[str] = None,
+               limit: int = DEFAULT_SEARCH_LIMIT, phrase: bool = True) -> List[SearchHit]:
+        """
+        Ищет по исходнику и переводу (или только по column из SEARCH_COLUMNS).
+        С phrase=True query ищется как фраза, иначе это выражение FTS5
+        (AND/OR/NOT, префиксы "word*"). Найденное в source и target обрамлено
+        HIGHLIGHT_OPEN/CLOSE; translated - перевод отличается от исходника.
+        """
+        if column is not None and column not in SEARCH_COLUMNS:
+            raise ValueError(f"Unknown search column {column!r}, expected one of {', '.join(SEARCH_COLUMNS)}.")
+        match = fts_phrase(query) if phrase else query
+        if column is not None:
+            match = f"{column} : ({match})"
+        sql = ("SELECT files.name, units.row_number, units.rule_id, units.field, units.idx, "
+               "highlight(units_fts, 0, ?, ?), highlight(units_fts, 1, ?, ?), units.source != units.target "
+               "FROM units_fts JOIN units ON units.id = units_fts.rowid JOIN files ON files.id = units.file_id "
+               "WHERE units_fts MATCH ?")
+        params: List[Any] = [HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, match]
+        if file is not None:
+            sql += " AND files.name = ?"
+            params.append(file)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        try:
+            return [SearchHit(*row[:7], bool(row[7])) for row in self.conn.execute(sql, params)]
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Bad search query {query!r}: {e}") from e
+
+    def set_translation(self, file: str, row_number: int, field: str, index: Optional[int], text: str):
+        """
+        Меняет перевод одной единицы (field/index как в iter_translatable_units)
+        в объекте строки и в поисковом индексе одной транзакцией.
+        """
+        file_id = self._file_id(file)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT item FROM rows WHERE file_id = ? AND row_number = ?",
+                               (file_id, row_number)).fetchone()
+            if row is None:
+                raise ValueError(f"{file}: no row {row_number}.")
+            unit = conn.execute("SELECT id FROM units WHERE file_id = ? AND row_number = ? AND field = ? "
+                                "AND idx IS ?", (file_id, row_number, field, index)).fetchone()
+            if unit is None:
+                where = field if index is None else f"{field}[{index}]"
+                raise ValueError(f"{file}: row {row_number} has no translatable {where}.")
+            item = json.loads(row[0])
+            set_unit_value(item, field, index, text)
+            conn.execute("UPDATE rows SET item = ? WHERE file_id = ? AND row_number = ?",
+                         (_dump_item(item), file_id, row_number))
+            conn.execute("UPDATE units SET target = ? WHERE id = ?", (text, unit[0]))
+
+    def get_item(self, file: str, row_number: int) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT item FROM rows WHERE file_id = ? AND row_number = ?",
+                                (self._file_id(file), row_number)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_items(self, file: str) -> Iterator[Dict[str, Any]]:
+        """Объекты строк файла по порядку _row_number, по одному из курсора."""
+        cursor = self.conn.execute("SELECT item FROM rows WHERE file_id = ? ORDER BY row_number",
+                                   (self._file_id(file),))
+        for item, in cursor:
+            yield json.loads(item)
+
+    def header(self, file: str) -> List[str]:
+        row = self.conn.execute("SELECT header FROM files WHERE id = ?", (self._file_id(file),)).fetchone()
+        return json.loads(row[0])
+
+    def export_csv(self, file: str, csv_filepath: str, csv_encoding: str = OUTPUT_CSV_ENCODING) -> int:
+        """Пишет переведенный CSV прямо из базы (как json2csv). Возвращает число строк."""
+        header = self.header(file)
+        with atomic_write(csv_filepath, csv_encoding, newline='') as outfile:
+            written = write_csv_rows(self.iter_items(file), header, outfile)
+        logger.info(f"Exported {file} from {self.db_filepath} to {csv_filepath}: {written} rows.")
+        return written
+
+    def export_json(self, file: str, json_filepath: str, json_encoding: str = JSON_ENCODING) -> int:
+        """Выгружает JSON в формате csv_to_json (с текущими переводами). Возвращает число объектов."""
+        with atomic_write(json_filepath, json_encoding) as f:
+            writer = JsonArrayWriter(f)
+            for item in self.iter_items(file):
+                writer.write(item)
+            writer.close()
+        logger.info(f"Exported {file} from {self.db_filepath} to {json_filepath}: {writer.count} objects.")
+        return writer.count
+
+def import_files(db_filepath: str, sources: Iterable[str], csv_encoding: str = CSV_ENCODING,
+                 json_encoding: str = JSON_ENCODING) -> int:
+    """Импортирует CSV/JSON в базу под их именами файлов. Возвращает число строк."""
+    total = 0
+    with ProjectStore.open(db_filepath) as store:
+        for source in sources:
+            rows, _ = store.import_items(os.path.basename(source),
+                                         iter_rule_items(source, csv_encoding, json_encoding))
+            total += rows
+    return total
@@ -0,0 +1,261 @@
+"""
+Память переводов (translation memory).
+
+Точные совпадения ищутся по хэшу нормализованной строки, нечеткие - через
+MinHash-подписи n-грамм и LSH-корзины. Сам файл памяти хранит только пары
+исходник/перевод, нечеткий индекс строится в памяти при загрузке.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .csvio import DEFAULT_HEADER
+from .files import JSON_ENCODING, atomic_write
+from .jsonio import JsonArrayWriter, iter_json_array
+from .options import parse_options_string
+from .scripttext import script_literal_at
+
+logger = logging.getLogger(__name__)
+
+TM_VERSION: int = 1
+TM_MINHASH_PERMUTATIONS: int = 32
+TM_LSH_BANDS: int = 8
+DEFAULT_FUZZY_THRESHOLD: float = 0.75
+_TM_MERSENNE_PRIME = (1 << 61) - 1
+_TM_WS_PATTERN = re.compile(r"[ \t]+")
+_TM_QUOTES_TABLE = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+def normalize_tm_text(text: str) -> str:
+    """Нормализация для точного поиска: кавычки, переводы строк и пробелы."""
+    text = text.replace('\r\n', '\n').translate(_TM_QUOTES_TABLE)
+    return '\n'.join(_TM_WS_PATTERN.sub(' ', line).strip() for line in text.strip().split('\n'))
+
+def tm_hash(text: str) -> str:
+    """Ключ точного совпадения: хэш нормализованной строки."""
+    return hashlib.blake2b(normalize_tm_text(text).encode('utf-8'), digest_size=12).hexdigest()
+
+def _tm_shingles(text: str) -> set:
+    """Словесные биграммы для длинных строк, символьные триграммы для коротких."""
+    norm = normalize_tm_text(text).lower()
+    words = norm.split()
+    if len(words) >= 4:
+        return {words[i] + ' ' + words[i + 1] for i in range(len(words) - 1)}
+    padded = f" {norm} "
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+def _shingle_hash(shingle: str) -> int:
+    """64-битный хэш шингла, одинаковый во всех процессах (встроенный hash() рандомизирован)."""
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class TranslationMemory:
+    """Хранилище пар исходник -> перевод с точным и нечетким поиском."""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        rnd = random.Random(0x5EED)
+        self._perms = [(rnd.randrange(1, _TM_MERSENNE_PRIME), rnd.randrange(0, _TM_MERSENNE_PRIME))
+                       for _ in range(TM_MINHASH_PERMUTATIONS)]
+        self._rows_per_band = TM_MINHASH_PERMUTATIONS // TM_LSH_BANDS
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [_shingle_hash(s) for s in _tm_shingles(text)]
+        return tuple(min([(a * h + b) % _TM_MERSENNE_PRIME for h in hashes]) for a, b in self._perms)
+
+    def _bands(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        r = self._rows_per_band
+        for band in range(TM_LSH_BANDS):
+            yield band, signature[band * r:(band + 1) * r]
+
+    def add(self, source: str, target: str) -> bool:
+        """Добавляет (или обновляет) перевод. Возвращает True, если строка новая."""
+        if not source.strip() or not target.strip():
+            return False
+        key = tm_hash(source)
+        is_new = key not in self.entries
+        self.entries[key] = {"source": source, "target": target}
+        if is_new:
+            signature = self._signature(source)
+            self._signatures[key] = signature
+            for band_key in self._bands(signature):
+                self._buckets.setdefault(band_key, []).append(key)
+        return is_new
+
+    def lookup_exact(self, source: str) -> Optional[str]:
+        entry = self.entries.get(tm_hash(source))
+        return entry["target"] if entry else None
+
+    def lookup_fuzzy(self, source: str, threshold: float) -> Optional[Tuple[str, str, float]]:
+        """
+        Лучшее нечеткое совпадение: (исходник из памяти, перевод, оценка сходства)
+        или None. Сходство - доля совпавших значений MinHash-подписи (оценка Жаккара).
+        """
+        if not source.strip():
+            return None
+        signature = self._signature(source)
+        candidates = set()
+        for band_key in self._bands(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        best = None
+        for key in candidates:
+            other = self._signatures[key]
+            score = sum(1 for x, y in zip(signature, other) if x == y) / TM_MINHASH_PERMUTATIONS
+            if score >= threshold and (best is None or score > best[2]):
+                entry = self.entries[key]
+                best = (entry["source"], entry["target"], score)
+        return best
+
+    @classmethod
+    def load(cls, tm_filepath) -> 'TranslationMemory':
+        tm = cls()
+        try:
+            with open(tm_filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return tm
+        if data.get("version") != TM_VERSION:
+            logger.warning(f"Warning: Translation memory {tm_filepath} has unsupported version, starting empty.")
+            return tm
+        for entry in data["entries"]:
+            tm.add(entry["source"], entry["target"])
+        return tm
+
+    def save(self, tm_filepath):
+        with atomic_write(tm_filepath, 'utf-8') as f:
+            json.dump({"version": TM_VERSION, "entries": list(self.entries.values())},
+                      f, ensure_ascii=False, indent=1)
+
+def iter_translatable_units(item: Dict[str, Any]) -> Iterator[Tuple[str, Optional[int], str, str]]:
+    """
+    Отдает переводимые единицы строки data: (поле, индекс опции/литерала скрипта или None,
+    исходный текст из fields, текущее значение). Исходник всегда берется из
+    fields, поэтому работает и для уже частично переведенного JSON.
+    """
+    if item.get("_type") != "data" or "fields" not in item:
+        return
+    fields = item["fields"]
+    if len(fields) != len(DEFAULT_HEADER):
+        return
+    text_idx = DEFAULT_HEADER.index('text')
+    options_idx = DEFAULT_HEADER.index('options')
+    script_idx = DEFAULT_HEADER.index('script')
+    if fields[text_idx].strip():
+        yield 'text', None, fields[text_idx], item.get('text', '')
+    source_options = parse_options_string(fields[options_idx])
+    current_options = item.get('options', [])
+    if len(source_options) == len(current_options):
+        for i, (src, cur) in enumerate(zip(source_options, current_options)):
+            if "text" in src and src["text"].strip():
+                yield 'options', i, src["text"], cur.get("text", '')
+    for i, unit in enumerate(item.get('script_strings') or []):
+        source = script_literal_at(fields[script_idx], unit.get("line", -1), unit.get("param", -1))
+        if source is not None:
+            yield 'script_strings', i, source, unit.get("text", '')
+
+def set_unit_value(item: Dict[str, Any], field: str, option_index: Optional[int], value: str):
+    if option_index is None:
+        item[field] = value
+    else:
+        item[field][option_index]["text"] = value
+
+def tm_learn(json_filepath, tm_filepath, json_encoding: str = JSON_ENCODING) -> int:
+    """Пополняет память переводов парами из переведенного JSON (значение != исходник)."""
+    tm = TranslationMemory.load(tm_filepath)
+    added = 0
+    for item in iter_json_array(json_filepath, json_encoding):
+        for _, _, source, current in iter_translatable_units(item):
+            if current != source and tm.add(source, current):
+                added += 1
+    tm.save(tm_filepath)
+    logger.info(f"Translation memory updated: {added} new entries, {len(tm)} total.")
+    return added
+
+def tm_export_unique(json_filepath, tm_filepath, unique_json_filepath,
+                     fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+                     json_encoding: str = JSON_ENCODING) -> int:
+    """
+    Выгружает только уникальные непереведенные строки, которых нет в памяти.
+    Для каждой указывается число повторов и, если есть, нечеткая подсказка.
+    """
+    tm = TranslationMemory.load(tm_filepath)
+    unique: Dict[str, Dict[str, Any]] = {}
+    total = 0
+    for item in iter_json_array(json_filepath, json_encoding):
+        for _, _, source, current in iter_translatable_units(item):
+            if current != source:
+                continue
+            total += 1
+            key = tm_hash(source)
+            if key in tm.entries:
+                continue
+            entry = unique.get(key)
+            if entry is None:
+                unique[key] = {"hash": key, "source": source, "target": "", "count": 1}
+            else:
+                entry["count"] += 1
+
+    for entry in unique.values():
+        match = tm.lookup_fuzzy(entry["source"], fuzzy_threshold)
+        if match:
+            entry["fuzzy"] = {"source": match[0], "target": match[1], "score": round(match[2], 3)}
+
+    with open(unique_json_filepath, 'w', encoding=json_encoding) as f:
+        json.dump(list(unique.values()), f, ensure_ascii=False, indent=2)
+    logger.info(f"Unique strings exported: {len(unique)} to translate out of {total} untranslated units.")
+    return len(unique)
+
+def tm_import_unique(unique_json_filepath, tm_filepath, json_encoding: str = JSON_ENCODING) -> int:
+    """Заносит в память переводы из файла уникальных строк (пустые target пропускаются)."""
+    tm = TranslationMemory.load(tm_filepath)
+    added = 0
+    with open(unique_json_filepath, 'r', encoding=json_encoding) as f:
+        for entry in json.load(f):
+            if entry.get("target", "").strip() and tm.add(entry["source"], entry["target"]):
+                added += 1
+    tm.save(tm_filepath)
+    logger.info(f"Translation memory updated: {added} new entries, {len(tm)} total.")
+    return added
+
+def tm_fill(json_filepath, tm_filepath, output_json_filepath,
+            fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+            json_encoding: str = JSON_ENCODING) -> Dict[str, int]:
+    """
+    Предварительный проход: подставляет точные совпадения из памяти в непереведенные
+    единицы. Нечеткие совпадения не подставляются, а кладутся подсказкой в _tm_fuzzy.
+    """
+    tm = TranslationMemory.load(tm_filepath)
+    logger.info(f"Filling {json_filepath} from translation memory ({len(tm)} entries) -> {output_json_filepath}")
+    stats = {"exact": 0, "fuzzy": 0, "missing": 0}
+    with atomic_write(output_json_filepath, json_encoding) as jsonfile:
+        writer = JsonArrayWriter(jsonfile)
+        for item in iter_json_array(json_filepath, json_encoding):
+            suggestions = []
+            for field, option_index, source, current in iter_translatable_units(item):
+                if current != source:
+                    continue
+                target = tm.lookup_exact(source)
+                if target is not None:
+                    set_unit_value(item, field, option_index, target)
+                    stats["exact"] += 1
+                    continue
+                match = tm.lookup_fuzzy(source, fuzzy_threshold) if fuzzy_threshold < 1 else None
+                if match:
+                    suggestions.append({"field": field, "option": option_index, "source": match[0],
+                                        "target": match[1], "score": round(match[2], 3)})
+                    stats["fuzzy"] += 1
+                else:
+                    stats["missing"] += 1
+            if suggestions:
+                item["_tm_fuzzy"] = suggestions
+            writer.write(item)
+        writer.close()
+    logger.info(f"Translation memory fill successful. {stats['exact']} exact, {stats['fuzzy']} fuzzy suggestions, "
+                f"{stats['missing']} without match.")
+    return stats
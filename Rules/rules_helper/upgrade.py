@@ -0,0 +1,222 @@
+"""
+Перенос перевода на новую версию rules.csv (трехстороннее слияние).
+
+Берутся старый оригинал, новый оригинал и старый перевод. Строки нового
+оригинала сопоставляются со старыми хэш-соединением по уникальному id; строки
+с пустым или повторяющимся id (комментарии, разделители, дубли) выравниваются
+по содержимому в порядке следования. Дальше слияние идет по колонкам (для
+options - по id опции): если английский текст не менялся, берется перевод,
+если менялся - новый английский текст, а строка попадает в список конфликтов.
+"""
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .csvio import CsvWriter, item_to_fields, read_csv_header
+from .convert import find_header
+from .files import CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, atomic_write, describe
+from .incremental import fingerprint_fields, iter_row_keys
+from .jsonio import JsonArrayWriter
+from .options import build_options_string, parse_options_string
+from .validate import iter_rule_items
+
+logger = logging.getLogger(__name__)
+
+def _same(a: str, b: str) -> bool:
+    """Сравнение без учета \\r\\n/\\n - перевод мог сохраниться с другими переводами строк."""
+    return a == b or a.replace('\r\n', '\n') == b.replace('\r\n', '\n')
+
+def _unique_ids(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """{id: индекс строки} для строк data, чей id непуст и встречается ровно один раз."""
+    seen: Dict[str, int] = {}
+    duplicated = set()
+    for i, item in enumerate(items):
+        if item.get("_type") != "data":
+            continue
+        rule_id = item["fields"][0].strip()
+        if not rule_id:
+            continue
+        if rule_id in seen:
+            duplicated.add(rule_id)
+        seen[rule_id] = i
+    return {rule_id: i for rule_id, i in seen.items() if rule_id not in duplicated}
+
+def align_rows(old_items: List[Dict[str, Any]], new_items: List[Dict[str, Any]]) -> List[Optional[int]]:
+    """
+    Для каждой новой строки - индекс соответствующей старой строки или None.
+    Сначала хэш-соединение по уникальному id, затем для остальных строк -
+    первая по порядку свободная старая строка с тем же содержимым, затем (для
+    строк data) с тем же содержимым без id - переименованное правило, затем
+    ключ с номером повтора.
+    """
+    old_ids = _unique_ids(old_items)
+    new_ids = _unique_ids(new_items)
+    matches: List[Optional[int]] = [None] * len(new_items)
+    used = set()
+    for rule_id, new_i in new_ids.items():
+        old_i = old_ids.get(rule_id)
+        if old_i is not None:
+            matches[new_i] = old_i
+            used.add(old_i)
+
+    # Очередь свободных старых строк на каждое содержимое: занятые снимаются с головы
+    by_content: Dict[str, deque] = {}
+    by_body: Dict[str, deque] = {}
+    by_key: Dict[str, int] = {}
+    for (key, item), old_i in zip(iter_row_keys(old_items), range(len(old_items))):
+        if old_i in used:
+            continue
+        by_content.setdefault(fingerprint_fields(item["fields"]), deque()).append(old_i)
+        if item.get("_type") == "data":
+            by_body.setdefault(fingerprint_fields(item["fields"][1:]), deque()).append(old_i)
+        by_key[key] = old_i
+
+    def take(queues: Dict[str, deque], fingerprint: str) -> Optional[int]:
+        candidates = queues.get(fingerprint)
+        # Строка могла быть занята другим сопоставлением
+        while candidates and candidates[0] in used:
+            candidates.popleft()
+        return candidates.popleft() if candidates else None
+
+    for (key, item), new_i in zip(iter_row_keys(new_items), range(len(new_items))):
+        if matches[new_i] is not None:
+            continue
+        old_i = take(by_content, fingerprint_fields(item["fields"]))
+        if old_i is None and item.get("_type") == "data":
+            old_i = take(by_body, fingerprint_fields(item["fields"][1:]))
+        if old_i is None:
+            old_i = by_key.get(key)
+            if old_i in used:
+                old_i = None
+        if old_i is not None:
+            matches[new_i] = old_i
+            used.add(old_i)
+    return matches
+
+def _merge_options(old_src: str, new_src: str, old_tr: str) -> Tuple[str, List[str]]:
+    """Слияние колонки options по id опций. Возвращает (значение, id опций с конфликтом)."""
+    old_options = parse_options_string(old_src)
+    new_options = parse_options_string(new_src)
+    tr_options = parse_options_string(old_tr)
+    if any("id" not in opt for opt in old_options + new_options + tr_options):
+        return new_src, ['*']
+    old_text = {opt["id"]: opt["text"] for opt in old_options}
+    tr_text = {opt["id"]: opt["text"] for opt in tr_options}
+    merged, conflicts = [], []
+    for opt in new_options:
+        opt = dict(opt)
+        src_text = old_text.get(opt["id"])
+        translated = tr_text.get(opt["id"])
+        if src_text is not None and translated is not None:
+            if _same(src_text, opt["text"]):
+                opt["text"] = translated
+            elif not _same(translated, src_text):
+                conflicts.append(opt["id"])
+        merged.append(opt)
+    return build_options_string(merged), conflicts
+
+def merge_row(header: List[str], old_src: List[str], new_src: List[str],
+              old_tr: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Трехстороннее слияние одной строки по колонкам. Возвращает (поля, колонки
+    с конфликтом): колонка конфликтует, если английский изменился, а старый
+    перевод отличался от старого английского.
+    """
+    merged, conflicts = [], []
+    for c, new_value in enumerate(new_src):
+        old_value = old_src[c] if c < len(old_src) else ''
+        tr_value = old_tr[c] if c < len(old_tr) else old_value
+        if _same(old_value, new_value):
+            merged.append(tr_value)
+        elif _same(tr_value, old_value):
+            merged.append(new_value)
+        elif c < len(header) and header[c] == 'options':
+            value, option_conflicts = _merge_options(old_value, new_value, tr_value)
+            merged.append(value)
+            conflicts.extend(f"options:{opt_id}" for opt_id in option_conflicts)
+        else:
+            merged.append(new_value)
+            conflicts.append(header[c] if c < len(header) else f"field_{c}")
+    return merged, conflicts
+
+def _translation_fields(old_items: List[Dict[str, Any]], tr_items: List[Dict[str, Any]],
+                        header: List[str]) -> List[Optional[List[str]]]:
+    """
+    Поля перевода для каждой старой строки. Перевод сохраняет раскладку оригинала,
+    поэтому строки сопоставляются по _row_number; при расхождении id - по ключу.
+    """
+    tr_by_row = {item.get("_row_number"): item for item in tr_items}
+    tr_by_key = dict(iter_row_keys(tr_items))
+    result: List[Optional[List[str]]] = []
+    for key, item in iter_row_keys(old_items):
+        tr_item = tr_by_row.get(item.get("_row_number"))
+        if tr_item is None or (item.get("_type") == "data" and
+                               tr_item["fields"][0].strip() != item["fields"][0].strip()):
+            tr_item = tr_by_key.get(key) if item.get("_type") == "data" else None
+        result.append(item_to_fields(tr_item, header) if tr_item is not None else None)
+    return result
+
+def upgrade_translation(old_source, new_source, old_translation, output_csv, conflicts_json,
+                        csv_encoding: str = CSV_ENCODING, output_encoding: str = OUTPUT_CSV_ENCODING,
+                        json_encoding: str = JSON_ENCODING) -> Dict[str, int]:
+    """
+    Переносит перевод на новый оригинал. Входы - CSV или JSON (по расширению).
+    Пишет переведенный CSV для новой версии и JSON-список конфликтов; возвращает статистику.
+    """
+    logger.info(f"Upgrading translation {describe(old_translation)}: "
+                f"{describe(old_source)} -> {describe(new_source)}")
+    old_items = list(iter_rule_items(old_source, csv_encoding, json_encoding))
+    new_items = list(iter_rule_items(new_source, csv_encoding, json_encoding))
+    tr_items = list(iter_rule_items(old_translation, csv_encoding, json_encoding))
+    if describe(new_source).lower().endswith('.json'):
+        header = find_header(new_items)
+    else:
+        header = read_csv_header(new_source, csv_encoding)
+    if not header:
+        raise ValueError(f"Cannot determine the header of {describe(new_source)}.")
+
+    translations = _translation_fields(old_items, tr_items, header)
+    matches = align_rows(old_items, new_items)
+    stats = {"unchanged": 0, "merged": 0, "conflicts": 0, "new": 0, "removed": 0}
+
+    with atomic_write(output_csv, output_encoding, newline='') as outfile, \
+            atomic_write(conflicts_json, json_encoding) as jsonfile:
+        conflict_writer = JsonArrayWriter(jsonfile)
+        with CsvWriter(outfile) as writer:
+            writer.writerow(header)
+            for new_item, old_i in zip(new_items, matches):
+                new_fields = new_item["fields"]
+                old_tr = translations[old_i] if old_i is not None else None
+                if old_tr is None:
+                    writer.writerow(new_fields)
+                    stats["new"] += 1
+                    continue
+                old_fields = old_items[old_i]["fields"]
+                if fingerprint_fields(old_fields) == fingerprint_fields(new_fields):
+                    writer.writerow(old_tr)
+                    stats["unchanged"] += 1
+                    continue
+                merged, conflicts = merge_row(header, old_fields, new_fields, old_tr)
+                writer.writerow(merged)
+                if not conflicts:
+                    stats["merged"] += 1
+                    continue
+                stats["conflicts"] += 1
+                conflict_writer.write({
+                    "_row_number": new_item["_row_number"],
+                    "_old_row_number": old_items[old_i]["_row_number"],
+                    "id": new_fields[0].strip(),
+                    "columns": conflicts,
+                    "old_source": old_fields,
+                    "new_source": new_fields,
+                    "old_translation": old_tr,
+                })
+        conflict_writer.close()
+    stats["removed"] = len(old_items) - sum(1 for m in matches if m is not None)
+
+    logger.info(f"Upgrade successful. {stats['unchanged']} rows carried over, {stats['merged']} merged, "
+                f"{stats['conflicts']} conflicts, {stats['new']} new, {stats['removed']} removed.")
+    if stats["conflicts"]:
+        logger.warning(f"Warning: {stats['conflicts']} rows changed in English after translation; "
+                       f"see {describe(conflicts_json)}.")
+    return stats
@@ -0,0 +1,171 @@
+"""
+Проверка круговой конвертации: json_to_csv(csv_to_json(x)) должен дать x.
+
+Обе стороны читаются потоково, запись за записью: исходный CSV и то, что из
+него получится после JSON и обратной сборки (или готовый JSON, или второй
+CSV). Записи сравниваются по хэшам содержимого (incremental.fingerprint_fields);
+при первом расхождении ищутся колонка и смещение первого отличающегося символа,
+и проверка останавливается. Память не зависит от размера файлов.
+
+Сравниваются значения полей после разбора CSV, а не байты квотирования:
+игре важно содержимое ячеек, а лишние кавычки вокруг поля его не меняют.
+Хэши записей можно сохранить и потом сверять файл с ними без исходника.
+"""
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .convert import split_header
+from .csvio import format_csv_line, item_to_fields, iter_csv_rows
+from .files import CSV_ENCODING, JSON_ENCODING, PathOrStream, atomic_write, describe, open_text
+from .incremental import fingerprint_fields
+from .jsonio import JsonArrayWriter, iter_json_array
+
+logger = logging.getLogger(__name__)
+
+# Сколько символов вокруг расхождения показывать в отчете
+MISMATCH_CONTEXT: int = 30
+END_OF_FILE: str = '<end of file>'
+
+Record = Tuple[int, List[str]]
+
+class Mismatch(NamedTuple):
+    row_number: int
+    column: str
+    offset: int
+    expected: str
+    actual: str
+
+def iter_csv_records(csv_source: PathOrStream, encoding: str = CSV_ENCODING) -> Iterator[Record]:
+    """(_row_number, поля) для каждой записи CSV, включая заголовок (строка 1)."""
+    with open_text(csv_source, 'r', encoding, newline='') as csvfile:
+        for i, row in enumerate(csv.reader(csvfile)):
+            yield i + 1, row
+
+def iter_output_records(items: Iterable[Dict[str, Any]]) -> Iterator[Record]:
+    """
+    Записи, которые json_to_csv собрал бы из объектов items: поля проходят через
+    item_to_fields и ручное квотирование и разбираются обратно как CSV.
+    """
+    header, items = split_header(items)
+    yield 1, list(header)
+    row_number = 1
+    for item in items:
+        fields = item_to_fields(item, header)
+        if fields is None:
+            continue
+        row_number += 1
+        yield row_number, next(csv.reader(io.StringIO(format_csv_line(fields), newline='')), [])
+
+def iter_round_trip_records(csv_source: PathOrStream, encoding: str = CSV_ENCODING) -> Iterator[Record]:
+    """Записи после csv_to_json и json_to_csv, без промежуточных файлов."""
+    items = (json.loads(json.dumps(row_obj, ensure_ascii=False))
+             for row_obj in iter_csv_rows(csv_source, encoding))
+    return iter_output_records(items)
+
+def _snippet(value: str, offset: int) -> str:
+    start = max(0, offset - MISMATCH_CONTEXT // 2)
+    return value[start:start + MISMATCH_CONTEXT]
+
+def locate_difference(row_number: int, header: List[str], expected: Optional[List[str]],
+                      actual: Optional[List[str]]) -> Mismatch:
+    """Колонка и смещение первого отличия двух записей (None - запись отсутствует)."""
+    if expected is None or actual is None:
+        present = expected if expected is not None else actual
+        shown = repr(','.join(present))[:MISMATCH_CONTEXT * 2]
+        return Mismatch(row_number, END_OF_FILE, 0,
+                        shown if expected is not None else '', shown if actual is not None else '')
+    for c in range(max(len(expected), len(actual))):
+        a = expected[c] if c < len(expected) else None
+        b = actual[c] if c < len(actual) else None
+        if a == b:
+            continue
+        column = header[c] if c < len(header) else f"field_{c}"
+        if a is None or b is None:
+            return Mismatch(row_number, column, 0, repr(a), repr(b))
+        offset = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+        return Mismatch(row_number, column, offset, repr(_snippet(a, offset)), repr(_snippet(b, offset)))
+    raise ValueError(f"Records at row {row_number} are equal.")
+
+def compare_records(expected: Iterable[Record], actual: Iterable[Record]) -> Tuple[int, Optional[Mismatch]]:
+    """
+    Сравнивает два потока записей по хэшам. Возвращает (число совпавших записей,
+    первое расхождение или None).
+    """
+    expected, actual = iter(expected), iter(actual)
+    header: List[str] = []
+    matched = 0
+    while True:
+        a = next(expected, None)
+        b = next(actual, None)
+        if a is None and b is None:
+            return matched, None
+        row_number = (a or b)[0]
+        a_fields = a[1] if a is not None else None
+        b_fields = b[1] if b is not None else None
+        if (a_fields is None or b_fields is None
+                or fingerprint_fields(a_fields) != fingerprint_fields(b_fields)):
+            return matched, locate_difference(row_number, header, a_fields, b_fields)
+        if row_number == 1:
+            header = a_fields
+        matched += 1
+
+def write_record_hashes(records: Iterable[Record], hashes_target: PathOrStream,
+                        encoding: str = JSON_ENCODING) -> int:
+    """Сохраняет хэши записей JSON-массивом (по одному на запись, по порядку)."""
+    with atomic_write(hashes_target, encoding) as f:
+        writer = JsonArrayWriter(f)
+        for _, fields in records:
+            writer.write(fingerprint_fields(fields))
+        writer.close()
+    return writer.count
+
+def compare_with_hashes(records: Iterable[Record], hashes_source: PathOrStream,
+                        encoding: str = JSON_ENCODING) -> Tuple[int, Optional[Mismatch]]:
+    """Сверяет записи с сохраненными хэшами. Колонку по хэшу определить нельзя - она '*'."""
+    hashes = iter_json_array(hashes_source, encoding)
+    matched = 0
+    for row_number, fields in records:
+        expected = next(hashes, None)
+        actual = fingerprint_fields(fields)
+        if expected != actual:
+            return matched, Mismatch(row_number, '*' if expected is not None else END_OF_FILE, 0,
+                                     expected or '', actual)
+        matched += 1
+    extra = next(hashes, None)
+    if extra is not None:
+        return matched, Mismatch(matched + 1, END_OF_FILE, 0, extra, '')
+    return matched, None
+
+def verify_round_trip(csv_source: PathOrStream, json_source: Optional[PathOrStream] = None,
+                      against: Optional[PathOrStream] = None, hashes: Optional[PathOrStream] = None,
+                      csv_encoding: str = CSV_ENCODING, json_encoding: str = JSON_ENCODING) -> Optional[Mismatch]:
+    """
+    Проверяет csv_source. По умолчанию - круговой прогон через JSON в памяти;
+    с json_source - сборку CSV из этого JSON; с against - второй CSV; с hashes -
+    сохраненные хэши записей. Возвращает первое расхождение или None.
+    """
+    name = describe(csv_source)
+    if hashes is not None:
+        target = describe(hashes)
+        matched, mismatch = compare_with_hashes(iter_csv_records(csv_source, csv_encoding), hashes, json_encoding)
+    else:
+        if json_source is not None:
+            target = describe(json_source)
+            actual = iter_output_records(iter_json_array(json_source, json_encoding))
+        elif against is not None:
+            target = describe(against)
+            actual = iter_csv_records(against, csv_encoding)
+        else:
+            target = 'JSON round trip'
+            actual = iter_round_trip_records(csv_source, csv_encoding)
+        matched, mismatch = compare_records(iter_csv_records(csv_source, csv_encoding), actual)
+    if mismatch is None:
+        logger.info(f"Verified {name} against {target}: {matched} records identical.")
+    else:
+        logger.warning(f"{name} differs from {target} at row {mismatch.row_number}, column {mismatch.column}, "
+                       f"offset {mismatch.offset}: expected {mismatch.expected}, got {mismatch.actual} "
+                       f"({matched} records matched before it).")
+    return mismatch
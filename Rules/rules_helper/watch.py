@@ -0,0 +1,193 @@
+"""
+Режим наблюдения: пересборка переведенного CSV при сохранении JSON.
+
+Процесс держит в памяти объекты строк последнего JSON и готовые строки CSV
+для каждого из них. Изменение файла замечается опросом размера и mtime (без
+внешних зависимостей, одинаково на всех ОС). После сохранения JSON читается
+заново, объекты сравниваются с прежними, и через item_to_fields/
+format_csv_line проходят только изменившиеся строки; CSV собирается из
+готовых строк и заменяется атомарно (atomic_write), так что игра никогда не
+видит наполовину записанный файл. Результат побайтно равен json_to_csv.
+
+Измененные строки сразу проверяются на целостность токенов (validate). Если
+меняется исходный rules.csv (обновление игры), выводится, сколько строк в
+нем разошлось с fields перевода - это повод запустить upgrade.
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .convert import split_header
+from .csvio import format_csv_line, item_to_fields, iter_csv_rows
+from .files import CSV_ENCODING, JSON_ENCODING, OUTPUT_CSV_ENCODING, atomic_write
+from .incremental import fingerprint_fields, iter_row_keys
+from .validate import validate_items
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL: float = 0.2
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class CsvRebuilder:
+    """Строки CSV, закэшированные по объектам строк JSON."""
+
+    def __init__(self):
+        self.header: Optional[List[str]] = None
+        self._header_line = ''
+        # _row_number (или позиция, если его нет) -> (объект, строка CSV или None)
+        self._rows: Dict[Any, Tuple[Dict[str, Any], Optional[str]]] = {}
+        self._order: List[Any] = []
+
+    def update(self, items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Обновляет кэш по новому списку объектов. Возвращает (изменившиеся или
+        новые объекты, нужно ли переписать CSV) - второе верно и тогда, когда
+        строки только удалены или переставлены.
+        """
+        header, items = split_header(items)
+        items = list(items)
+        header_changed = header != self.header
+        if header_changed:
+            self.header = header
+            self._header_line = format_csv_line(header)
+            self._rows = {}
+        row_numbers = [item.get("_row_number") for item in items]
+        # Повторяющиеся или отсутствующие _row_number перезаписали бы друг друга - тогда ключ - позиция
+        by_row_number = None not in row_numbers and len(set(row_numbers)) == len(row_numbers)
+        rows: Dict[Any, Tuple[Dict[str, Any], Optional[str]]] = {}
+        order = []
+        changed = []
+        for position, item in enumerate(items):
+            key = row_numbers[position] if by_row_number else ('position', position)
+            cached = self._rows.get(key)
+            if cached is not None and cached[0] == item:
+                rows[key] = cached
+            else:
+                fields = item_to_fields(item, header)
+                rows[key] = (item, format_csv_line(fields) if fields is not None else None)
+                changed.append(item)
+            order.append(key)
+        reordered = order != self._order
+        self._rows = rows
+        self._order = order
+        return changed, bool(changed) or reordered or header_changed
+
+    def write(self, csv_filepath: str, csv_encoding: str = OUTPUT_CSV_ENCODING) -> int:
+        """Пишет весь CSV из кэша атомарно. Возвращает число строк данных."""
+        lines = [self._rows[key][1] for key in self._order]
+        lines = [line for line in lines if line is not None]
+        with atomic_write(csv_filepath, csv_encoding, newline='') as f:
+            f.write(self._header_line)
+            f.write(''.join(lines))
+        return len(lines)
+
+def source_drift(source_csv: str, items: List[Dict[str, Any]], csv_encoding: str = CSV_ENCODING) -> Dict[str, int]:
+    """Сколько строк rules.csv изменилось, добавилось и пропало относительно fields перевода."""
+    translated = {key: fingerprint_fields(item.get("fields") or []) for key, item in iter_row_keys(items)}
+    drift = {"changed": 0, "added": 0, "removed": 0}
+    for key, row in iter_row_keys(iter_csv_rows(source_csv, csv_encoding)):
+        fingerprint = translated.pop(key, None)
+        if fingerprint is None:
+            drift["added"] += 1
+        elif fingerprint != fingerprint_fields(row["fields"]):
+            drift["changed"] += 1
+    drift["removed"] = len(translated)
+    return drift
+
+class WatchSession:
+    """Наблюдение за одним JSON (и, если задан, исходным CSV) с пересборкой одного CSV."""
+
+    def __init__(self, json_filepath: str, csv_filepath: str, source_csv: Optional[str] = None,
+                 json_encoding: str = JSON_ENCODING, csv_encoding: str = OUTPUT_CSV_ENCODING,
+                 source_encoding: str = CSV_ENCODING, check_tokens: bool = True):
+        self.json_filepath = json_filepath
+        self.csv_filepath = csv_filepath
+        self.source_csv = source_csv
+        self.json_encoding = json_encoding
+        self.csv_encoding = csv_encoding
+        self.source_encoding = source_encoding
+        self.check_tokens = check_tokens
+        self.rebuilder = CsvRebuilder()
+        self.items: List[Dict[str, Any]] = []
+        self._json_stamp = None
+        self._source_stamp = None
+
+    def _load_json(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self.json_filepath, 'r', encoding=self.json_encoding) as f:
+                items = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # Редактор мог еще не дописать файл - пробуем на следующем опросе
+            logger.warning(f"Warning: {self.json_filepath} is not valid JSON yet ({e}), waiting for the next save.")
+            return None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            logger.warning(f"Warning: {self.json_filepath} is not a JSON array of row objects, "
+                           f"waiting for the next save.")
+            return None
+        return items
+
+    def rebuild(self) -> bool:
+        """Перечитывает JSON и пересобирает CSV. False, если JSON сейчас не читается."""
+        start = time.perf_counter()
+        items = self._load_json()
+        if items is None:
+            return False
+        first = not self.items
+        changed, dirty = self.rebuilder.update(items)
+        self.items = items
+        if not first and not dirty and os.path.exists(self.csv_filepath):
+            logger.info(f"{self.json_filepath} saved without row changes, {self.csv_filepath} left as is.")
+            return True
+        written = self.rebuilder.write(self.csv_filepath, self.csv_encoding)
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"{'Built' if first else 'Rebuilt'} {self.csv_filepath}: "
+                    f"{len(changed)} of {len(items)} rows re-serialized, {written} written, {elapsed:.0f} ms.")
+        if self.check_tokens and not first and changed:
+            for issue in validate_items(changed):
+                logger.warning(f"{os.path.basename(self.json_filepath)}:{issue.row_number} [{issue.key}] "
+                               f"{issue.column}: {issue.message}")
+        return True
+
+    def check_source(self):
+        drift = source_drift(self.source_csv, self.items, self.source_encoding)
+        if any(drift.values()):
+            logger.warning(f"Warning: {self.source_csv} differs from the source text in {self.json_filepath}: "
+                           f"{drift['changed']} changed, {drift['added']} new, {drift['removed']} removed rows. "
+                           f"Run 'upgrade' to carry the translation over.")
+        else:
+            logger.info(f"{self.source_csv} matches the source text of the translation.")
+
+    def poll(self) -> bool:
+        """Один опрос файлов. Возвращает True, если CSV был пересобран."""
+        rebuilt = False
+        stamp = _file_stamp(self.json_filepath)
+        if stamp is not None and stamp != self._json_stamp:
+            # Недописанный JSON повторно не читается: следующая запись все равно сменит stamp
+            self._json_stamp = stamp
+            rebuilt = self.rebuild()
+        if self.source_csv and self.items:
+            source_stamp = _file_stamp(self.source_csv)
+            if source_stamp is not None and source_stamp != self._source_stamp:
+                self._source_stamp = source_stamp
+                self.check_source()
+        return rebuilt
+
+    def run(self, interval: float = DEFAULT_POLL_INTERVAL, max_polls: Optional[int] = None):
+        """Опрашивает файлы, пока не прервут (Ctrl+C) или не пройдет max_polls опросов."""
+        if _file_stamp(self.json_filepath) is None:
+            raise FileNotFoundError(f"No such file: {self.json_filepath}")
+        logger.info(f"Watching {self.json_filepath}" + (f" and {self.source_csv}" if self.source_csv else '')
+                    + f" every {interval:g} s; press Ctrl+C to stop.")
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            self.poll()
+            polls += 1
+            time.sleep(interval)
@@ -0,0 +1,36 @@
+"""Общие заготовки тестов: маленький rules.csv и его JSON для перевода."""
+import json
+
+import pytest
+
+from rules_helper import convert
+
+SAMPLE_CSV = (
+    'id,trigger,conditions,script,text,options,notes\n'
+    '# Beacons,,,,,,\n'
+    'beaconOpen,OpenInteractionDialog,,"AddText ""Hello there""\nSetShortcut defaultLeave ""ESCAPE""",'
+    'A warning beacon drifts here.,defaultLeave:Leave,\n'
+    ',,,,,,\n'
+    'beaconLeave,DialogOptionSelected,$option == defaultLeave,DismissDialog,'
+    'You leave $entity.name behind.,,\n'
+)
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    path = tmp_path / 'rules.csv'
+    path.write_text(SAMPLE_CSV, encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def sample_json(tmp_path, sample_csv):
+    path = tmp_path / 'rules_for_translation.json'
+    convert.csv_to_json(sample_csv, str(path), 'utf-8')
+    return str(path)
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_json(path, items):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rules_helper import batch, convert
+
+HEADER = 'id,trigger,conditions,script,text,options,notes\n'
+
+def _stray_quote_csv(path):
+    rows = [HEADER]
+    for i in range(400):
+        if i == 10:
+            rows.append(f'r{i},OpenInteractionDialog,,,He said 5" long,,\n')
+        else:
+            rows.append(f'r{i},DialogOptionSelected,,,"Line one\nline two, with ""quotes""\nthree",,\n')
+    path.write_text(''.join(rows), encoding='utf-8')
+    return str(path)
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_boundaries_ignore_quotes_inside_unquoted_fields(tmp_path):
+    data = _read(_stray_quote_csv(tmp_path / 'rules.csv'))
+    boundaries = batch.find_record_boundaries(data, 0)
+    assert len(boundaries) == 402
+    for start in boundaries[1:-1]:
+        assert data[start:start + 1] == b'r'
+
+def test_parallel_matches_sequential_with_stray_quote(tmp_path):
+    source = _stray_quote_csv(tmp_path / 'rules.csv')
+    sequential, parallel = str(tmp_path / 'sequential.json'), str(tmp_path / 'parallel.json')
+    assert convert.csv_to_json(source, sequential, 'utf-8') == 400
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        count = batch.csv_to_json_parallel(source, parallel, executor=executor, chunk_size=512,
+                                           csv_encoding='utf-8')
+    assert count == 400
+    assert _read(parallel) == _read(sequential)
+
+def test_parallel_matches_sequential_on_sample(tmp_path, sample_csv):
+    sequential, parallel = str(tmp_path / 'sequential.json'), str(tmp_path / 'parallel.json')
+    convert.csv_to_json(sample_csv, sequential, 'utf-8')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        batch.csv_to_json_parallel(sample_csv, parallel, executor=executor, chunk_size=16, csv_encoding='utf-8')
+    assert _read(parallel) == _read(sequential)
+
+def test_batch_uses_given_encodings(tmp_path):
+    source_dir = tmp_path / 'mods' / 'mod_a'
+    source_dir.mkdir(parents=True)
+    (source_dir / 'rules.csv').write_bytes((HEADER + 'greet,OpenInteractionDialog,,,Привет.,,\n').encode('cp1251'))
+    json_dir, csv_dir = str(tmp_path / 'json'), str(tmp_path / 'csv')
+    assert batch.batch_convert([str(tmp_path / 'mods')], json_dir, 'csv2json', workers=1,
+                               csv_encoding='cp1251', json_encoding='utf-8') == {}
+    json_path = tmp_path / 'json' / 'rules.json'
+    assert 'Привет.' in json_path.read_text(encoding='utf-8')
+    assert batch.batch_convert([str(json_path)], csv_dir, 'json2csv', workers=1,
+                               json_encoding='utf-8', output_encoding='utf-16') == {}
+    assert 'Привет.' in (tmp_path / 'csv' / 'rules.csv').read_text(encoding='utf-16')
+
+class _FailingExecutor:
+    """Отдает первый кусок и падает на втором."""
+
+    def map(self, func, tasks):
+        tasks = list(tasks)
+        yield func(tasks[0])
+        raise RuntimeError("worker died")
+
+def test_failed_chunk_leaves_no_output(tmp_path):
+    source = _stray_quote_csv(tmp_path / 'rules.csv')
+    output = tmp_path / 'rules.json'
+    with pytest.raises(RuntimeError, match="worker died"):
+        batch.csv_to_json_parallel(source, str(output), executor=_FailingExecutor(), chunk_size=512,
+                                   csv_encoding='utf-8')
+    assert not output.exists()
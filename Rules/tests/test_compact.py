@@ -0,0 +1,36 @@
+from rules_helper import compact, convert
+
+from conftest import load_json, save_json
+
+SIGNATURES = {"AddText": {"extends": None, "text_params": [0], "variadic_from": None}}
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_compact_round_trip_matches_json2csv_with_script_strings(tmp_path, sample_csv):
+    json_path = str(tmp_path / 'rules.json')
+    convert.csv_to_json(sample_csv, json_path, 'utf-8', script_signatures=SIGNATURES)
+    items = load_json(json_path)
+    assert items[1]["script_strings"][0]["text"] == "Hello there"
+    items[1]["script_strings"][0]["text"] = "Привет"
+    items[1]["text"] = "Здесь дрейфует маяк."
+    save_json(json_path, items)
+
+    expected = str(tmp_path / 'expected.csv')
+    convert.json_to_csv(json_path, expected)
+    packed = str(tmp_path / 'rules.compact.gz')
+    compact.json_to_compact(json_path, packed)
+    actual = str(tmp_path / 'actual.csv')
+    compact.compact_to_csv(packed, actual)
+    assert 'AddText ""Привет""' in _read(actual).decode('utf-8')
+    assert _read(actual) == _read(expected)
+
+def test_csv_to_compact_matches_json_to_compact(tmp_path, sample_csv):
+    # csv_to_compact не строит объекты строк - результат должен совпадать побайтно
+    json_path = str(tmp_path / 'rules.json')
+    convert.csv_to_json(sample_csv, json_path, 'utf-8')
+    from_csv = str(tmp_path / 'from_csv.compact.json')
+    from_json = str(tmp_path / 'from_json.compact.json')
+    assert compact.csv_to_compact(sample_csv, from_csv, 'utf-8') == compact.json_to_compact(json_path, from_json)
+    assert _read(from_csv) == _read(from_json)
@@ -0,0 +1,34 @@
+import pytest
+
+from rules_helper import convert
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize('mode', [convert.csv_to_json, convert.csv_to_json_stream])
+def test_empty_csv_is_an_error_in_both_modes(tmp_path, mode):
+    source = tmp_path / 'empty.csv'
+    source.write_bytes(b'')
+    output = tmp_path / 'out.json'
+    with pytest.raises(ValueError, match="empty"):
+        mode(str(source), str(output), 'utf-8')
+    assert not output.exists()
+
+def test_header_only_csv_gives_empty_array_in_both_modes(tmp_path):
+    source = tmp_path / 'header.csv'
+    source.write_text('id,trigger,conditions,script,text,options,notes\n', encoding='utf-8')
+    for mode in (convert.csv_to_json, convert.csv_to_json_stream):
+        output = tmp_path / f'{mode.__name__}.json'
+        assert mode(str(source), str(output), 'utf-8') == 0
+        assert output.read_text(encoding='utf-8') == '[]'
+
+def test_stream_and_normal_modes_are_identical(tmp_path, sample_csv):
+    normal, stream = str(tmp_path / 'normal.json'), str(tmp_path / 'stream.json')
+    assert convert.csv_to_json(sample_csv, normal, 'utf-8') == 4
+    assert convert.csv_to_json_stream(sample_csv, stream, 'utf-8') == 4
+    assert _read(normal) == _read(stream)
+    back_normal, back_stream = str(tmp_path / 'normal.csv'), str(tmp_path / 'stream.csv')
+    convert.json_to_csv(normal, back_normal)
+    convert.json_to_csv_stream(stream, back_stream)
+    assert _read(back_normal) == _read(back_stream)
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from rules_helper import coverage
+
+@pytest.fixture(params=['python', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(coverage, 'np', None)
+    else:
+        monkeypatch.setattr(coverage, 'np', pytest.importorskip('numpy'))
+    return request.param
+
+def test_letter_counts(backend):
+    texts = ['Привет, $player.name!', 'Hello, мир', '', '%s 42 ёЁ', 'Z@[`{z']
+    assert coverage.letter_counts(texts) == ([6, 3, 0, 2, 0], [0, 5, 0, 1, 2])
+
+def test_length_z_scores_flags_outlier(backend):
+    source = [10, 10, 10, 10, 10, 10]
+    target = [10, 12, 9, 11, 40, 40]
+    z = coverage.length_z_scores(source, target, [True, True, True, True, True, False])
+    assert z[4] == pytest.approx(9.13, abs=0.01)
+    assert all(abs(v) < coverage.OUTLIER_Z for v in z[:4])
+    assert z[5] == 0.0
+
+def test_length_z_scores_degenerate_inputs(backend):
+    assert coverage.length_z_scores([5, 5], [7, 7], [True, True]) == [0.0, 0.0]
+    assert coverage.length_z_scores([5, 5], [7, 70], [False, False]) == [0.0, 0.0]
+    assert coverage.length_z_scores([], [], []) == []
+
+def test_numpy_and_pure_python_agree(monkeypatch):
+    np = pytest.importorskip('numpy')
+    rng = random.Random(3)
+    alphabet = 'abcXYZабвЁё $.,%sӿЀ\U0001F600'
+    texts = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(300)]
+    source = [rng.randint(0, 200) for _ in range(300)]
+    target = [rng.randint(0, 200) for _ in range(300)]
+    candidates = [rng.random() < 0.7 for _ in range(300)]
+    monkeypatch.setattr(coverage, 'np', np)
+    fast = coverage.letter_counts(texts), coverage.length_z_scores(source, target, candidates)
+    monkeypatch.setattr(coverage, 'np', None)
+    slow = coverage.letter_counts(texts), coverage.length_z_scores(source, target, candidates)
+    assert fast[0] == slow[0]
+    assert fast[1] == pytest.approx(slow[1])
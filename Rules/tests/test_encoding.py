@@ -0,0 +1,63 @@
+import codecs
+
+import pytest
+
+from rules_helper.encoding import DEFAULT_SINGLE_BYTE, detect_encoding, find_encoding_anomalies
+from rules_helper.files import open_text
+
+@pytest.mark.parametrize('text, encoding', [
+    ('Ça va? Élan', 'cp1252'),
+    ('Café au lait, naïve résumé.', 'cp1252'),
+    ('Я в порту, а ты?', 'cp1251'),
+    ('Вы оставляете маяк позади.', 'cp1251'),
+])
+def test_single_byte_letters(text, encoding):
+    guess = detect_encoding(text.encode(encoding))
+    assert guess.encoding == encoding
+    assert 'punctuation' not in guess.reason
+
+def test_punctuation_only_falls_back_to_default():
+    guess = detect_encoding('“Leave” — now…'.encode('cp1252'))
+    assert guess.encoding == DEFAULT_SINGLE_BYTE
+    assert 'punctuation' in guess.reason
+
+def test_utf8_and_bom():
+    assert detect_encoding('Привет'.encode('utf-8')).encoding == 'utf-8'
+    guess = detect_encoding(codecs.BOM_UTF8 + 'Привет'.encode('utf-8'))
+    assert guess.encoding == 'utf-8-sig' and guess.bom
+
+def test_mixed_file_reports_offsets():
+    data = 'Привет, мир. '.encode('utf-8') * 3 + 'Ещё'.encode('cp1251') + b'\n'
+    guess = detect_encoding(data)
+    assert guess.encoding == 'utf-8' and guess.mixed
+    anomalies = find_encoding_anomalies(data, guess.encoding)
+    assert anomalies[0].offset == len('Привет, мир. '.encode('utf-8') * 3)
+    assert anomalies[0].kind == 'invalid'
+
+@pytest.mark.parametrize('encoding', ['cp1251', 'utf-8', 'utf-8-sig', 'utf-16'])
+def test_open_text_auto_reads_file_once(tmp_path, monkeypatch, encoding):
+    path = tmp_path / 'rules.csv'
+    text = 'id,text\r\nbeaconOpen,"Маяк\nмолчит"\r\n'
+    path.write_bytes(text.encode(encoding))
+    opened = []
+    real_open = open
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return real_open(*args, **kwargs)
+    monkeypatch.setattr('builtins.open', counting_open)
+    with open_text(path, 'r', 'auto', newline='') as f:
+        assert f.read() == text
+    assert opened == [path]
+
+def test_open_text_auto_mixed_file_reports_offsets(tmp_path):
+    path = tmp_path / 'rules.csv'
+    path.write_bytes('Привет, мир. '.encode('utf-8') * 3 + 'Ещё'.encode('cp1251'))
+    with pytest.raises(UnicodeDecodeError, match='problem bytes: byte 66'):
+        with open_text(path, 'r', 'auto') as f:
+            f.read()
+
+def test_open_text_auto_empty_file(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_bytes(b'')
+    with open_text(path, 'r', 'auto') as f:
+        assert f.read() == ''
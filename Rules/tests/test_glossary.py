@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from rules_helper.glossary import GlossaryChecker, TermAutomaton, find_words, normalize_term
+
+def _brute_force(patterns, text):
+    return sorted((index, start, start + len(p)) for index, p in enumerate(patterns) if p
+                  for start in range(len(text) - len(p) + 1) if text.startswith(p, start))
+
+def test_automaton_finds_overlapping_matches():
+    patterns = ['he', 'she', 'his', 'hers']
+    automaton = TermAutomaton(patterns)
+    assert sorted(automaton.find('ushers')) == [(0, 2, 4), (1, 1, 4), (3, 2, 6)]
+
+def test_automaton_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        patterns = [''.join(rng.choice('ab') for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 6))]
+        text = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 30)))
+        assert sorted(TermAutomaton(patterns).find(text)) == _brute_force(patterns, text)
+
+@pytest.mark.parametrize('text, expected', [
+    ('pirate raid', {0}),
+    ('two pirates', {0}),
+    ('the luddic churches', {1}),
+    ('piratestation', set()),
+    ('apirate', set()),
+    ('pirated goods', set()),
+    ('luddic church5', set()),
+])
+def test_find_words_whole_word_and_plural(text, expected):
+    automaton = TermAutomaton(['pirate', 'luddic church'])
+    assert find_words(automaton, text, whole=True) == expected
+
+def test_find_words_prefix_for_translation_stems():
+    automaton = TermAutomaton(['пират'])
+    assert find_words(automaton, 'нет пиратов', whole=False) == {0}
+    assert find_words(automaton, 'антипиратский', whole=False) == set()
+
+def test_normalize_term():
+    assert normalize_term('Tri-Tachyon') == normalize_term('tritachyon') == 'tritachyon'
+    assert normalize_term('luddic_church') == 'luddic church'
+    assert normalize_term('Ёж') == 'еж'
+
+def test_check_unit():
+    checker = GlossaryChecker([
+        {"term": "pirates", "translations": ["пират"]},
+        {"term": "Tri-Tachyon", "translations": ["Три-Тахион", "ТриТах"]},
+        {"term": "hegemony", "translations": []},
+    ])
+    assert checker.check_unit('Pirates attack!', 'Атакуют пираты!') == []
+    assert checker.check_unit('Pirates attack!', 'Атакуют разбойники!') == [0]
+    assert checker.check_unit('A tritachyon fleet.', 'Флот тритахиона.') == []
+    assert checker.check_unit('Pirates and Tri-Tachyon.', 'Бандиты и корпорация.') == [0, 1]
+    # Термин без утвержденного перевода не проверяется
+    assert checker.check_unit('The Hegemony fleet.', 'Флот.') == []
+
+def test_check_items_skips_untranslated_units():
+    checker = GlossaryChecker([{"term": "pirate", "translations": ["пират"]}])
+    items = [
+        {"_row_number": 2, "_type": "data", "id": 'a', "text": 'Pirate ahead.', "options": []},
+        {"_row_number": 3, "_type": "data", "id": 'b', "text": 'Впереди бандит.', "options": [],
+         "fields": ['b', '', '', '', 'A pirate ahead.', '', '']},
+    ]
+    issues = checker.check_items(items)
+    assert [(i.row_number, i.key, i.term) for i in issues] == [(3, 'b', 'pirate')]
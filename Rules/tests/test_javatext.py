@@ -0,0 +1,41 @@
+from rules_helper.javatext import extract_java_strings
+
+def _texts(source):
+    return [(method, arg, text) for _, _, method, arg, text in extract_java_strings(source)]
+
+def test_direct_arguments_and_concatenation():
+    source = ('tooltip.addPara("Fleet of " + count + " ships, %s total", pad, h, "" + total);\n'
+              'options.addOption("Leave", "defaultLeave");\n')
+    assert _texts(source) == [
+        ('addPara', 0, 'Fleet of '),
+        ('addPara', 0, ' ships, %s total'),
+        ('addOption', 0, 'Leave'),
+    ]
+
+def test_nested_calls_are_skipped_but_nested_display_methods_found():
+    source = ('tooltip.addPara(String.format("Pay %s credits", Misc.getDGSCredits(x)), pad);\n'
+              'tooltip.addPara(getLabel("Ignored text"), pad, Misc.getHighlightColor(), "Shown text");\n'
+              'panel.addTitle(makeHeader(text.addSectionHeading("Inner heading", align)));\n')
+    assert _texts(source) == [
+        ('addPara', 3, 'Shown text'),
+        ('addSectionHeading', 0, 'Inner heading'),
+    ]
+
+def test_comments_and_char_literals_do_not_confuse_the_scanner():
+    source = ('// tooltip.addPara("commented out");\n'
+              '/* tooltip.addTitle("block\n comment"); */\n'
+              'tooltip.addPara("See http://example.com /* not a comment */", pad);\n'
+              'char c = \'(\'; tooltip.addPara(")" + c, pad); tooltip.addTitle("Title, with comma");\n')
+    assert _texts(source) == [
+        ('addPara', 0, 'See http://example.com /* not a comment */'),
+        ('addTitle', 0, 'Title, with comma'),
+    ]
+
+def test_literals_without_letters_and_escapes():
+    source = ('tooltip.addPara("%s", pad, "%d%%");\n'
+              'tooltip.addPara("Say \\"hi\\"\\n", pad);\n')
+    assert _texts(source) == [('addPara', 0, 'Say \\"hi\\"\\n')]
+
+def test_line_and_column_positions():
+    source = 'class A {\n    void f() {\n        t.addPara(\n            "Line three", 3f);\n    }\n}\n'
+    assert extract_java_strings(source) == [(4, 13, 'addPara', 0, 'Line three')]
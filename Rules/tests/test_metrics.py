@@ -0,0 +1,32 @@
+import tracemalloc
+
+from rules_helper.metrics import MetricsRegistry
+
+def test_stage_without_tracemalloc_has_no_peak():
+    registry = MetricsRegistry()
+    with registry.stage('convert', bytes_in=10) as st:
+        st.rows = 3
+    data = registry.to_dict()
+    assert data["stages"]["convert"]["peak_memory_bytes"] is None
+    assert data["process"]["max_rss_bytes"] >= 0
+    text = registry.to_prometheus()
+    assert 'rules_helper_stage_rows_total{stage="convert"} 3' in text
+    assert 'stage_peak_memory_bytes{' not in text
+    assert 'rules_helper_process_max_rss_bytes ' in text
+
+def test_outer_stage_peak_includes_nested_stages():
+    registry = MetricsRegistry()
+    tracemalloc.start()
+    try:
+        with registry.stage('command'):
+            with registry.stage('read'):
+                block = bytearray(4 * 1024 * 1024)
+                del block
+            with registry.stage('write'):
+                pass
+    finally:
+        tracemalloc.stop()
+    read = registry.stages['read'].peak_memory
+    assert read >= 4 * 1024 * 1024
+    assert registry.stages['write'].peak_memory < read
+    assert registry.stages['command'].peak_memory >= read
@@ -0,0 +1,129 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rules_helper import mt
+
+from conftest import load_json
+
+class FakeMTServer:
+    """LibreTranslate на localhost: переводит строки префиксом "RU:", может отвечать ошибками."""
+
+    def __init__(self):
+        self.requests = []
+        # Коды ответов на первые запросы, дальше - 200
+        self.errors = []
+        # Строки, на которые сервер отвечает 400 (прерванный прогон)
+        self.broken = set()
+        self.translate = lambda text: 'RU:' + text
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+                server.requests.append(payload["q"])
+                if server.errors:
+                    status, body = server.errors.pop(0), {"error": "busy"}
+                elif server.broken & set(payload["q"]):
+                    status, body = 400, {"error": "bad request"}
+                else:
+                    status, body = 200, {"translatedText": [server.translate(q) for q in payload["q"]]}
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/translate"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(mt, 'MT_RETRY_DELAY', 0.0)
+    fake = FakeMTServer()
+    yield fake
+    fake.close()
+
+def _translate(server, sample_json, tmp_path, **kwargs):
+    output = str(tmp_path / 'out.json')
+    stats = mt.mt_translate(sample_json, output, mt.HttpBackend(server.url), str(tmp_path / 'cache.jsonl'),
+                            rate=0, **kwargs)
+    return stats, load_json(output)
+
+def test_batch_is_translated_with_tokens_kept(server, sample_json, tmp_path):
+    stats, items = _translate(server, sample_json, tmp_path)
+    assert stats["failed"] == 0 and stats["rejected"] == 0
+    assert items[1]["text"] == 'RU:A warning beacon drifts here.'
+    assert items[1]["options"][0]["text"] == 'RU:Leave'
+    assert items[3]["text"] == 'RU:You leave $entity.name behind.'
+    # Переменная ушла на сервер заглушкой
+    assert 'You leave {0} behind.' in server.requests[0]
+
+def test_retry_on_429_and_5xx(server, sample_json, tmp_path):
+    server.errors = [429, 503]
+    stats, items = _translate(server, sample_json, tmp_path)
+    assert len(server.requests) == 3
+    assert stats["failed"] == 0
+    assert items[1]["text"].startswith('RU:')
+
+def test_gives_up_after_retries(server, sample_json, tmp_path):
+    server.errors = [500] * (mt.MT_RETRIES + 1)
+    stats, items = _translate(server, sample_json, tmp_path)
+    assert len(server.requests) == mt.MT_RETRIES + 1
+    assert stats["failed"] == 3
+    assert items[1]["text"] == 'A warning beacon drifts here.'
+
+def test_resume_from_cache_after_interruption(server, sample_json, tmp_path):
+    server.broken = {'You leave {0} behind.'}
+    stats, items = _translate(server, sample_json, tmp_path, max_items=1, concurrency=1)
+    assert stats["failed"] == 1 and stats["translated"] == 2
+    assert items[3]["text"] == 'You leave $entity.name behind.'
+
+    server.broken = set()
+    server.requests.clear()
+    stats, items = _translate(server, sample_json, tmp_path, max_items=1, concurrency=1)
+    assert server.requests == [['You leave {0} behind.']]
+    assert stats["filled"] == 3
+    assert items[3]["text"] == 'RU:You leave $entity.name behind.'
+
+def test_result_with_lost_tokens_is_rejected(server, sample_json, tmp_path):
+    server.translate = lambda text: 'RU:' + text.replace('{0}', 'кто-то')
+    stats, items = _translate(server, sample_json, tmp_path)
+    assert stats["rejected"] == 1
+    assert items[3]["text"] == 'You leave $entity.name behind.'
+    assert items[1]["text"] == 'RU:A warning beacon drifts here.'
+
+def test_mask_round_trip_of_variants_and_formats():
+    source = 'Pay %s credits to $person.name?\nOR\nPay up, $playerName.'
+    masked, tokens = mt.mask_tokens(source)
+    assert '$' not in masked and '%s' not in masked
+    translated = masked.replace('Pay up', 'Плати').replace('\n{2}\n', ' {2} ')
+    assert mt.unmask_tokens(translated, tokens, source) == \
+        'Pay %s credits to $person.name?\nOR\nПлати, $playerName.'
+    assert mt.unmask_tokens(masked.replace('{1}', '{0}'), tokens, source) is None
+
+def test_backend_must_implement_translate(sample_json, tmp_path):
+    class Incomplete(mt.MTBackend):
+        pass
+
+    class Upper(mt.MTBackend):
+        async def translate(self, texts):
+            return [text.upper() for text in texts]
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    output = str(tmp_path / 'out.json')
+    mt.mt_translate(sample_json, output, backend=Upper(), cache_filepath=str(tmp_path / 'cache.jsonl'))
+    assert load_json(output)[1]["text"] == 'A WARNING BEACON DRIFTS HERE.'
@@ -0,0 +1,15 @@
+from rules_helper.scripttext import extract_script_strings, splice_script_strings
+
+SIGNATURES = {"AddText": {"extends": None, "text_params": [0], "variadic_from": None}}
+
+def test_extract_skips_lines_without_tokens():
+    script = '"\nAddText "Hello there"'
+    units = extract_script_strings(script, SIGNATURES)
+    assert units == [{"line": 1, "param": 0, "command": "AddText", "text": "Hello there"}]
+
+def test_splice_restores_untouched_script():
+    script = 'AddText "Hello there"\nSetShortcut defaultLeave "ESCAPE"'
+    units = extract_script_strings(script, SIGNATURES)
+    assert splice_script_strings(script, units) == script
+    units[0]["text"] = 'Скажи "да"'
+    assert splice_script_strings(script, units).split('\n')[0] == 'AddText "Скажи \\"да\\""'
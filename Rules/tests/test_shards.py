@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from rules_helper import shards
+from rules_helper.csvio import DEFAULT_HEADER, make_row_object
+
+from conftest import load_json, save_json
+
+def _items(sections=6):
+    """Разделы разного объема: комментарий и несколько строк data."""
+    items, row = [], 2
+    for s in range(sections):
+        fields = [f"# Section {s}"] + [''] * (len(DEFAULT_HEADER) - 1)
+        items.append(make_row_object(DEFAULT_HEADER, fields, row))
+        row += 1
+        for r in range(s + 1):
+            fields = [f"rule{s}_{r}", 'DialogOptionSelected', '', '', f"Line {r} of section {s}. " * (s + 1), '', '']
+            items.append(make_row_object(DEFAULT_HEADER, fields, row))
+            row += 1
+    return items
+
+@pytest.fixture
+def split(tmp_path):
+    source = str(tmp_path / 'rules.json')
+    save_json(source, _items())
+    manifest = shards.split_json(source, 3, str(tmp_path / 'parts'))
+    return source, manifest
+
+def _manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _part(manifest_path, index):
+    return os.path.join(os.path.dirname(manifest_path), _manifest(manifest_path)["shards"][index]["file"])
+
+def test_split_keeps_sections_and_balances(split):
+    source, manifest_path = split
+    manifest = _manifest(manifest_path)
+    assert len(manifest["shards"]) == 3
+    assert sum(e["rows"] for e in manifest["shards"]) == len(load_json(source))
+    for i in range(3):
+        assert load_json(_part(manifest_path, i))[0]["_type"] == "comment"
+    # Самая тяжелая часть не тяжелее последнего (самого большого) раздела вдвое
+    weights = [e["chars"] for e in manifest["shards"]]
+    assert max(weights) < 2 * weights[-1]
+
+def test_merge_round_trip_with_translation(split, tmp_path):
+    source, manifest_path = split
+    part = _part(manifest_path, 1)
+    items = load_json(part)
+    items[1]["text"] = "Перевод."
+    save_json(part, items)
+    merged = str(tmp_path / 'merged.json')
+    assert shards.merge_shards(manifest_path, merged) == len(load_json(source))
+    expected = load_json(source)
+    index = next(i for i, item in enumerate(expected) if item["_row_number"] == items[1]["_row_number"])
+    expected[index]["text"] = "Перевод."
+    assert load_json(merged) == expected
+
+def test_merge_rejects_changed_source_text(split, tmp_path):
+    _, manifest_path = split
+    part = _part(manifest_path, 0)
+    items = load_json(part)
+    items[1]["fields"][4] = "Edited source."
+    save_json(part, items)
+    merged = tmp_path / 'merged.json'
+    with pytest.raises(ValueError, match="source text"):
+        shards.merge_shards(manifest_path, str(merged))
+    assert not merged.exists()
+
+def test_merge_rejects_reordered_rows(split, tmp_path):
+    _, manifest_path = split
+    part = _part(manifest_path, 2)
+    items = load_json(part)
+    items[1], items[2] = items[2], items[1]
+    save_json(part, items)
+    with pytest.raises(ValueError, match="reordered"):
+        shards.merge_shards(manifest_path, str(tmp_path / 'merged.json'))
@@ -0,0 +1,40 @@
+from rules_helper import cli
+from rules_helper.simulate import RuleSimulator
+
+from conftest import save_json
+
+def _rule(row, rule_id, trigger, conditions='', script='', text='', options=None):
+    return {"_row_number": row, "_type": "data", "id": rule_id, "trigger": trigger, "conditions": conditions,
+            "script": script, "text": text, "options": options or [], "notes": ''}
+
+def test_step_runs_script_and_options():
+    simulator = RuleSimulator([
+        _rule(2, 'open', 'OpenInteractionDialog', text='Hello $name.',
+              options=[{"id": "leave", "text": "Leave"}]),
+        _rule(3, 'leave', 'DialogOptionSelected', '$option == leave', 'DismissDialog', 'Bye.'),
+    ])
+    memory = {'name': 'captain'}
+    step = simulator.step('OpenInteractionDialog', memory)
+    assert step.texts == ['Hello captain.']
+    assert step.options == [('leave', 'Leave')]
+    assert simulator.choose_option('leave', memory).rules == ['leave']
+
+def test_script_line_of_only_a_quote_is_ignored():
+    simulator = RuleSimulator([_rule(2, 'open', 'OpenInteractionDialog', script='"\n$seen = true', text='Hi.')])
+    memory = {}
+    step = simulator.step('OpenInteractionDialog', memory)
+    assert step.rules == ['open']
+    assert memory['seen'] is True
+
+def test_cli_walk_summary_is_its_own_option(tmp_path, capsys):
+    rules_path = str(tmp_path / 'rules.json')
+    save_json(rules_path, [
+        _rule(2, 'open', 'OpenInteractionDialog', text='Hi.', options=[{"id": "leave", "text": "Leave"}]),
+        _rule(3, 'leave', 'DialogOptionSelected', '$option == leave', 'DismissDialog', 'Bye.'),
+    ])
+    # Глобальный -q управляет только логированием и пути не скрывает
+    assert cli.main(['-q', 'simulate', rules_path, '--walk']) == 0
+    assert 'leave  [' in capsys.readouterr().out
+    assert cli.main(['-q', 'simulate', rules_path, '--walk', '--summary']) == 0
+    out = capsys.readouterr().out
+    assert 'leave  [' not in out and out.startswith('1 paths: ')
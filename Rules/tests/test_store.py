@@ -0,0 +1,57 @@
+import pytest
+
+from rules_helper import convert, store
+from rules_helper.tm import set_unit_value
+
+from conftest import load_json, save_json
+
+EDITS = [
+    (3, 'text', None, 'Здесь дрейфует предупреждающий маяк.'),
+    (3, 'options', 0, 'Уйти'),
+    (5, 'text', None, 'Вы оставляете $entity.name позади.'),
+]
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_import_edit_export_matches_json2csv(tmp_path, sample_json):
+    db = str(tmp_path / 'project.db')
+    assert store.import_files(db, [sample_json]) == 4
+    name = 'rules_for_translation.json'
+    with store.ProjectStore.open(db) as project:
+        for row_number, field, index, text in EDITS:
+            project.set_translation(name, row_number, field, index, text)
+        exported = str(tmp_path / 'from_store.csv')
+        assert project.export_csv(name, exported) == 4
+        exported_json = str(tmp_path / 'from_store.json')
+        project.export_json(name, exported_json)
+
+    # Те же правки прямо в JSON, затем обычный json2csv
+    items = load_json(sample_json)
+    by_row = {item["_row_number"]: item for item in items}
+    for row_number, field, index, text in EDITS:
+        set_unit_value(by_row[row_number], field, index, text)
+    edited_json = str(tmp_path / 'edited.json')
+    save_json(edited_json, items)
+    expected = str(tmp_path / 'expected.csv')
+    convert.json_to_csv(edited_json, expected)
+
+    assert _read(exported) == _read(expected)
+    assert load_json(exported_json) == items
+
+def test_search_sees_edits_and_rejects_unknown_units(tmp_path, sample_json):
+    db = str(tmp_path / 'project.db')
+    store.import_files(db, [sample_json])
+    name = 'rules_for_translation.json'
+    with store.ProjectStore.open(db) as project:
+        project.set_translation(name, 3, 'options', 0, 'Уйти')
+        hits = project.search('Уйти', column='target')
+        assert [(h.row_number, h.field, h.index, h.translated) for h in hits] == [(3, 'options', 0, True)]
+        assert project.search('warning beacon', column='source')[0].rule_id == 'beaconOpen'
+        with pytest.raises(ValueError):
+            project.set_translation(name, 2, 'text', None, 'комментарий')
+        with pytest.raises(ValueError):
+            project.set_translation(name, 3, 'options', 5, 'нет такой опции')
+        # Неудачная правка не меняет строку
+        assert project.get_item(name, 3)["options"][0]["text"] == 'Уйти'
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+from rules_helper.tm import TranslationMemory, tm_hash
+
+SIGNATURE_SCRIPT = (
+    "from rules_helper.tm import TranslationMemory;"
+    "print(TranslationMemory()._signature('You leave the derelict beacon behind.'))"
+)
+
+def test_exact_lookup_ignores_whitespace_and_quotes():
+    tm = TranslationMemory()
+    assert tm.add('Say "hello"  there.', 'Скажи «привет».')
+    assert tm.lookup_exact('Say “hello” there.\r\n') == 'Скажи «привет».'
+    assert tm_hash('a  b') == tm_hash(' a b ')
+
+def test_fuzzy_lookup_finds_close_source():
+    tm = TranslationMemory()
+    tm.add('You leave the derelict beacon behind and return to your fleet.',
+           'Вы оставляете заброшенный маяк и возвращаетесь к флоту.')
+    found = tm.lookup_fuzzy('You leave the derelict beacon behind and return to your fleets.', 0.5)
+    assert found is not None and found[1].startswith('Вы оставляете')
+    assert tm.lookup_fuzzy('Completely unrelated words about trade goods here.', 0.5) is None
+
+def test_signature_is_stable_across_processes():
+    signatures = set()
+    for seed in ('1', '2'):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        result = subprocess.run([sys.executable, '-c', SIGNATURE_SCRIPT], env=env, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+        signatures.add(result.stdout)
+    assert len(signatures) == 1
@@ -0,0 +1,93 @@
+import csv
+
+import pytest
+
+from rules_helper.csvio import DEFAULT_HEADER, format_csv_line
+from rules_helper.upgrade import upgrade_translation
+
+from conftest import load_json
+
+def _row(rule_id, text, trigger='DialogOptionSelected', options=''):
+    return [rule_id, trigger, '', '', text, options, '']
+
+SEPARATOR = [''] * len(DEFAULT_HEADER)
+
+OLD = [
+    ['# Beacons'] + [''] * 6,
+    _row('beaconOpen', 'A warning beacon drifts here.', 'OpenInteractionDialog', 'defaultLeave:Leave'),
+    SEPARATOR,
+    _row('beaconLeave', 'You leave the beacon behind.'),
+    SEPARATOR,
+    _row('beaconScan', 'Sensors sweep the beacon.'),
+]
+TRANSLATION = {
+    'A warning beacon drifts here.': 'Здесь дрейфует маяк.',
+    'defaultLeave:Leave': 'defaultLeave:Уйти',
+    'You leave the beacon behind.': 'Вы оставляете маяк позади.',
+    'Sensors sweep the beacon.': 'Сенсоры сканируют маяк.',
+    'Duplicate line.': 'Повтор.',
+}
+
+def _translate(rows):
+    return [[TRANSLATION.get(value, value) for value in row] for row in rows]
+
+def _write(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(format_csv_line(DEFAULT_HEADER))
+        for row in rows:
+            f.write(format_csv_line(row))
+    return str(path)
+
+def _upgrade(tmp_path, new_rows, old_rows=OLD):
+    old = _write(tmp_path / 'old.csv', old_rows)
+    new = _write(tmp_path / 'new.csv', new_rows)
+    translation = _write(tmp_path / 'old_ru.csv', _translate(old_rows))
+    output = str(tmp_path / 'new_ru.csv')
+    conflicts = str(tmp_path / 'conflicts.json')
+    stats = upgrade_translation(old, new, translation, output, conflicts, csv_encoding='utf-8',
+                                output_encoding='utf-8', json_encoding='utf-8')
+    with open(output, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    return stats, rows, load_json(conflicts)
+
+def test_unchanged_source_keeps_translation(tmp_path):
+    stats, rows, conflicts = _upgrade(tmp_path, OLD)
+    assert rows == _translate(OLD)
+    assert stats["unchanged"] == len(OLD) and not conflicts
+
+def test_renamed_id_carries_translation(tmp_path):
+    new = list(OLD)
+    new[3] = _row('beaconDepart', 'You leave the beacon behind.')
+    stats, rows, conflicts = _upgrade(tmp_path, new)
+    assert rows[3] == _row('beaconDepart', 'Вы оставляете маяк позади.')
+    assert stats["merged"] == 1 and stats["new"] == 0 and stats["removed"] == 0
+    assert not conflicts
+
+def test_moved_rows_keep_their_translation(tmp_path):
+    new = [OLD[0], OLD[5], OLD[2], OLD[3], OLD[4], OLD[1]]
+    stats, rows, _ = _upgrade(tmp_path, new)
+    assert rows == _translate(new)
+    assert stats["unchanged"] == len(OLD)
+
+def test_rows_added_and_removed_upstream(tmp_path):
+    new = OLD[:3] + [_row('beaconHail', 'The beacon hails you.')] + OLD[4:]
+    stats, rows, _ = _upgrade(tmp_path, new)
+    assert rows[3] == _row('beaconHail', 'The beacon hails you.')
+    assert rows[5] == _translate([OLD[5]])[0]
+    assert stats["new"] == 1 and stats["removed"] == 1
+
+def test_changed_english_of_translated_column_is_a_conflict(tmp_path):
+    new = list(OLD)
+    new[5] = _row('beaconScan', 'Sensors sweep the derelict beacon.')
+    stats, rows, conflicts = _upgrade(tmp_path, new)
+    assert rows[5] == new[5]
+    assert stats["conflicts"] == 1
+    assert conflicts[0]["id"] == 'beaconScan' and conflicts[0]["columns"] == ['text']
+
+@pytest.mark.parametrize('inserted', [0, 2])
+def test_duplicate_identical_rows(tmp_path, inserted):
+    old = OLD + [_row('dup', 'Duplicate line.'), _row('dup', 'Duplicate line.'), SEPARATOR]
+    new = old[:inserted] + [SEPARATOR, SEPARATOR] + old[inserted:]
+    stats, rows, _ = _upgrade(tmp_path, new, old)
+    assert rows == _translate(new)
+    assert stats["unchanged"] == len(old) and stats["new"] == 2 and stats["removed"] == 0
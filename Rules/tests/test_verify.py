@@ -0,0 +1,47 @@
+from rules_helper.verify import END_OF_FILE, iter_csv_records, verify_round_trip, write_record_hashes
+
+from conftest import SAMPLE_CSV
+
+# Кавычки, запятые и \r\n внутри поля
+TRICKY_CSV = SAMPLE_CSV + 'quoteRow,DialogOptionSelected,,,"He said ""no"", twice.\r\nThen left.",,\n'
+
+def test_round_trip_of_sample(sample_csv):
+    assert verify_round_trip(sample_csv, csv_encoding='utf-8') is None
+
+def test_round_trip_of_tricky_fields(tmp_path):
+    path = tmp_path / 'tricky.csv'
+    path.write_bytes(TRICKY_CSV.encode('utf-8'))
+    assert verify_round_trip(str(path), csv_encoding='utf-8') is None
+
+def test_short_row_is_reported_as_padded(tmp_path):
+    path = tmp_path / 'short.csv'
+    path.write_text(SAMPLE_CSV + 'shortRow,OpenInteractionDialog\n', encoding='utf-8')
+    mismatch = verify_round_trip(str(path), csv_encoding='utf-8')
+    assert mismatch.row_number == 6 and mismatch.column == 'conditions'
+
+def test_round_trip_through_json_file(sample_csv, sample_json):
+    assert verify_round_trip(sample_csv, json_source=sample_json, csv_encoding='utf-8',
+                             json_encoding='utf-8') is None
+
+def test_mismatch_reports_column_and_offset(tmp_path, sample_csv):
+    other = tmp_path / 'other.csv'
+    other.write_text(SAMPLE_CSV.replace('drifts here', 'drifts there'), encoding='utf-8')
+    mismatch = verify_round_trip(sample_csv, against=str(other), csv_encoding='utf-8')
+    assert mismatch.row_number == 3
+    assert mismatch.column == 'text'
+    assert mismatch.offset == len('A warning beacon drifts ')
+
+def test_missing_last_row(tmp_path, sample_csv):
+    other = tmp_path / 'other.csv'
+    other.write_text(SAMPLE_CSV.rsplit('beaconLeave', 1)[0], encoding='utf-8')
+    mismatch = verify_round_trip(sample_csv, against=str(other), csv_encoding='utf-8')
+    assert mismatch.row_number == 5 and mismatch.column == END_OF_FILE
+
+def test_saved_hashes(tmp_path, sample_csv):
+    hashes = str(tmp_path / 'hashes.json')
+    assert write_record_hashes(iter_csv_records(sample_csv, 'utf-8'), hashes) == 5
+    assert verify_round_trip(sample_csv, hashes=hashes, csv_encoding='utf-8') is None
+    changed = tmp_path / 'changed.csv'
+    changed.write_text(SAMPLE_CSV.replace('DismissDialog', 'EndConversation'), encoding='utf-8')
+    mismatch = verify_round_trip(str(changed), hashes=hashes, csv_encoding='utf-8')
+    assert mismatch.row_number == 5 and mismatch.column == '*'
@@ -0,0 +1,75 @@
+import os
+
+from rules_helper import convert
+from rules_helper.watch import WatchSession
+
+from conftest import load_json, save_json
+
+def _expected_csv(tmp_path, json_path):
+    expected = str(tmp_path / 'expected.csv')
+    convert.json_to_csv(json_path, expected)
+    with open(expected, 'rb') as f:
+        return f.read()
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _session(tmp_path, json_path):
+    session = WatchSession(json_path, str(tmp_path / 'out.csv'), check_tokens=False)
+    assert session.rebuild()
+    return session
+
+def test_initial_build_matches_json2csv(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    assert _read(session.csv_filepath) == _expected_csv(tmp_path, sample_json)
+
+def test_edited_row_is_rewritten(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    items = load_json(sample_json)
+    items[1]["text"] = "Здесь дрейфует маяк."
+    save_json(sample_json, items)
+    assert session.rebuild()
+    assert "Здесь дрейфует маяк." in _read(session.csv_filepath).decode('utf-8')
+    assert _read(session.csv_filepath) == _expected_csv(tmp_path, sample_json)
+
+def test_removed_row_is_dropped(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    items = load_json(sample_json)
+    del items[2]
+    save_json(sample_json, items)
+    assert session.rebuild()
+    assert _read(session.csv_filepath) == _expected_csv(tmp_path, sample_json)
+
+def test_reordered_rows_are_rewritten(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    items = load_json(sample_json)
+    items[1], items[3] = items[3], items[1]
+    save_json(sample_json, items)
+    assert session.rebuild()
+    assert _read(session.csv_filepath) == _expected_csv(tmp_path, sample_json)
+
+def test_duplicate_row_numbers_keep_both_rows(tmp_path, sample_json):
+    items = load_json(sample_json)
+    items[3]["_row_number"] = items[1]["_row_number"]
+    save_json(sample_json, items)
+    session = _session(tmp_path, sample_json)
+    assert _read(session.csv_filepath) == _expected_csv(tmp_path, sample_json)
+
+def test_non_list_json_is_skipped(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    before = _read(session.csv_filepath)
+    with open(sample_json, 'w', encoding='utf-8') as f:
+        f.write('{"rows": []}')
+    assert not session.rebuild()
+    with open(sample_json, 'w', encoding='utf-8') as f:
+        f.write('[1, 2]')
+    assert not session.rebuild()
+    assert _read(session.csv_filepath) == before
+
+def test_unchanged_save_leaves_csv(tmp_path, sample_json):
+    session = _session(tmp_path, sample_json)
+    mtime = os.stat(session.csv_filepath).st_mtime_ns
+    save_json(sample_json, load_json(sample_json))
+    assert session.rebuild()
+    assert os.stat(session.csv_filepath).st_mtime_ns == mtime